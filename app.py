@@ -2,27 +2,72 @@ import asyncio
 import json
 import os
 import time
-import pyaudio
 import sys
-import boto3
-import sounddevice
 import traceback
-import requests
+import queue
+import threading
 
-from concurrent.futures import ThreadPoolExecutor
-from amazon_transcribe.client import TranscribeStreamingClient
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import NamedTuple
 from amazon_transcribe.handlers import TranscriptResultStreamHandler
 from amazon_transcribe.model import TranscriptEvent, TranscriptResultStream
 
 from config import config, model_id, aws_region
 from logger import logger
+import aws_clients
 from bedrock_agent import BedrockAgent
-from bedrock_models_wrapper import BedrockModelsWrapper
+from bedrock_models_wrapper import BedrockModelsWrapper, model_descriptor
+from stream_codecs import decode_stream
+from audio_output import AudioOutputEngine
+from tts_cache import TTSCache
+from sentence_segmenter import SentenceSegmenter
+from cancellation import CancellationToken
+from voice_activity import VoiceActivityDetector
+from endpointing import Endpointer
+from speculation import SpeculativePreparer, default_stable_ms
+from metrics import metrics, TurnTrace
+
+# Devices and clients are opened on first use, so importing app, or running it headless (benchmarks, the
+# voice server), never loads PortAudio or sets up clients that are not needed.
+audio_output = AudioOutputEngine()
+tts_cache = TTSCache(
+    memory_entries=config['tts_cache']['memory_entries'],
+    # Resolved against the repository rather than the working directory, like the KB cache.
+    disk_dir=config['tts_cache']['disk_dir'] and os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                                              config['tts_cache']['disk_dir']),
+    disk_max_bytes=config['tts_cache']['disk_max_mb'] * 1024 * 1024,
+) if config['tts_cache']['enabled'] else None
+transcribe_streaming = None
+_transcribe_lock = threading.Lock()
+
+
+def transcribe_client():
+    global transcribe_streaming
+    with _transcribe_lock:
+        if transcribe_streaming is None:
+            from amazon_transcribe.client import TranscribeStreamingClient
+            transcribe_streaming = TranscribeStreamingClient(region=config['region'])
+        return transcribe_streaming
+
+
+
+class TurnExecutors(NamedTuple):
+    # Every turn runs on these long-lived pools, so a session uses the same threads however long it runs.
+    # Each session has at most one turn in flight; Polly requests for it are bounded by the TTS lookahead.
+    turn: ThreadPoolExecutor
+    synthesis: ThreadPoolExecutor
+    playback: ThreadPoolExecutor
+
+    @classmethod
+    def for_sessions(cls, sessions=1):
+        return cls(
+            ThreadPoolExecutor(max_workers=sessions, thread_name_prefix='turn'),
+            ThreadPoolExecutor(max_workers=sessions * (config['tts_pipeline']['lookahead'] + 1), thread_name_prefix='polly'),
+            ThreadPoolExecutor(max_workers=sessions, thread_name_prefix='playback'),
+        )
+
 
-p = pyaudio.PyAudio()
-bedrock_runtime = boto3.client(service_name='bedrock-runtime', region_name=config['region'])
-polly = boto3.client('polly', region_name=config['region'])
-transcribe_streaming = TranscribeStreamingClient(region=config['region'])
+executors = TurnExecutors.for_sessions()
 
 
 def printer(text, level):
@@ -33,214 +78,373 @@ def printer(text, level):
 
 
 class UserInputManager:
-    shutdown_executor = False
-    executor = None
-
-    @staticmethod
-    def set_executor(executor):
-        UserInputManager.executor = executor
+    interrupt_handler = None
 
     @staticmethod
-    def start_shutdown_executor():
-        UserInputManager.shutdown_executor = False
-        raise Exception()  # Workaround to shutdown exec, as executor.shutdown() doesn't work as expected.
+    def set_interrupt_handler(handler):
+        UserInputManager.interrupt_handler = handler
 
     @staticmethod
     def start_user_input_loop():
         while True:
             sys.stdin.readline().strip()
-            logger.debug(f'User input to shut down executor...')
-            UserInputManager.shutdown_executor = True
+            logger.debug(f'User input to interrupt the current turn...')
+            UserInputManager.interrupt()
 
     @staticmethod
-    def is_executor_set():
-        return UserInputManager.executor is not None
+    def interrupt():
+        if UserInputManager.interrupt_handler is not None:
+            UserInputManager.interrupt_handler()
 
-    @staticmethod
-    def is_shutdown_scheduled():
-        return UserInputManager.shutdown_executor
 
+def to_audio_generator(text_stream, cancel_token=None, trace=None):
+    # text_stream yields already decoded text pieces of the answer.
+    segmenter = SentenceSegmenter(**config['segmenter'])
 
-def to_audio_generator(bedrock_stream):
-    prefix = ''
+    if text_stream:
+        for text in text_stream:
+            if cancel_token is not None and cancel_token.is_cancelled():
+                # Closing lets the source generator hand over the partial response it collected.
+                text_stream.close()
+                print('\n')
+                return
 
-    if bedrock_stream:
-        for event in bedrock_stream:
-            chunk = BedrockModelsWrapper.get_stream_chunk(event)
-            if chunk:
-                text = BedrockModelsWrapper.get_stream_text(chunk)
+            if trace is not None:
+                trace.mark('first_bedrock_token')
 
-                if '.' in text:
-                    a = text.split('.')[:-1]
-                    to_polly = ''.join([prefix, '.'.join(a), '. '])
-                    prefix = text.split('.')[-1]
-                    print(to_polly, flush=True, end='')
-                    yield to_polly
-                else:
-                    prefix = ''.join([prefix, text])
+            for to_polly in segmenter.feed(text):
+                print(to_polly, flush=True, end=' ')
+                yield to_polly
 
-        if prefix != '':
-            print(prefix, flush=True, end='')
-            yield f'{prefix}.'
+        remainder = segmenter.flush()
+        if remainder:
+            print(remainder, flush=True, end='')
+            yield remainder
 
         print('\n')
 
 
 class BedrockWrapper:
+    # One speaker's turns. The console app has a single one; the voice server creates one per session with
+    # its own agent and audio output, running on the server's shared executors.
 
-    def __init__(self):
+    def __init__(self, bedrock_agent=None, output=None, turn_executors=None):
         self.speaking = False
-        self.bedrock_agent = BedrockAgent(bedrock_runtime)
+        self.audio_output = output or audio_output
+        self.executors = turn_executors or executors
+        self.cancel_token = None
+        self.turn_task = None
+        self.speculation = None
+        if bedrock_agent is None:
+            # Built on the turn thread, so the microphone opens without waiting for boto3, the clients and the
+            # indexes. Turns queue behind it on the same thread; speculation starts once it is ready.
+            self._agent = self.executors.turn.submit(self._create_agent)
+        else:
+            self._agent = Future()
+            self._agent.set_result(self._attach(bedrock_agent))
+
+    @property
+    def bedrock_agent(self):
+        return self._agent.result()
+
+    def _create_agent(self):
+        return self._attach(BedrockAgent(aws_clients.client('bedrock-runtime')))
+
+    def _attach(self, bedrock_agent):
+        if config['speculation']['enabled']:
+            stable_ms = config['speculation']['stable_ms'] or default_stable_ms(config['endpointing']['settings'])
+            self.speculation = SpeculativePreparer(bedrock_agent, stable_ms)
+        return bedrock_agent
 
     def is_speaking(self):
-        return self.speaking
+        # A scheduled turn counts as speaking before its thread gets going, so no second turn starts meanwhile.
+        turn_task = self.turn_task
+        return self.speaking or (turn_task is not None and not turn_task.done())
+
+    def submit_turn(self, text, speculative=None, trace=None):
+        # Runs the turn as an asyncio task; cancelling the task interrupts the turn.
+        self.turn_task = asyncio.get_running_loop().create_task(self._run_turn(text, speculative, trace))
+        return self.turn_task
+
+    async def _run_turn(self, text, speculative, trace):
+        cancel_token = self._start_turn()
+        turn = asyncio.get_running_loop().run_in_executor(
+            self.executors.turn, self.invoke_bedrock_agent, text, speculative, trace, cancel_token)
+        try:
+            await asyncio.shield(turn)
+        except asyncio.CancelledError:
+            cancel_token.cancel()
+            raise
+
+    def interrupt(self):
+        cancel_token = self.cancel_token
+        if cancel_token is not None and not cancel_token.is_cancelled():
+            logger.info('Interrupting the current turn')
+            cancel_token.cancel()
+
+    @staticmethod
+    def _speculative_result(speculative):
+        # A failed speculation costs nothing but time; the turn is simply prepared again.
+        if speculative is None:
+            return None
+        try:
+            return speculative.result()
+        except Exception:
+            logger.exception("Speculative preparation failed, preparing the turn again")
+            return None
+
+    def _start_turn(self):
+        # Cancelling the turn drops whatever audio is still buffered for playback right away.
+        cancel_token = CancellationToken()
+        cancel_token.add_callback(self.audio_output.flush)
+        self.cancel_token = cancel_token
+        return cancel_token
+
+    @staticmethod
+    def _play(reader, audio_gen, cancel_token):
+        # The reader holds a playback worker until it is closed, so it is closed however the answer ends.
+        # A failed answer is cancelled first, which drops its queued sentences instead of playing them out.
+        try:
+            for audio in audio_gen:
+                reader.read(audio)
+        except Exception:
+            cancel_token.cancel()
+            raise
+        finally:
+            reader.close()
 
     def invoke_bedrock(self, text):
         logger.debug('Bedrock generation started')
         self.speaking = True
+        cancel_token = self._start_turn()
 
-        body = BedrockModelsWrapper.define_body(text)
+        model = model_descriptor()
+        body = BedrockModelsWrapper.define_body(text, model=model)
         logger.debug(f"Request body: {body}")
 
         try:
             body_json = json.dumps(body)
-            response = bedrock_runtime.invoke_model_with_response_stream(
+            response = aws_clients.client('bedrock-runtime').invoke_model_with_response_stream(
                 body=body_json,
-                modelId=config['bedrock']['api_request']['modelId'],
-                accept=config['bedrock']['api_request']['accept'],
-                contentType=config['bedrock']['api_request']['contentType']
+                modelId=model.model_id,
+                accept=model.accept,
+                contentType=model.content_type
             )
 
             logger.debug('Capturing Bedrocks response/bedrock_stream')
             bedrock_stream = response.get('body')
+            cancel_token.add_callback(bedrock_stream.close)
 
-            audio_gen = to_audio_generator(bedrock_stream)
+            audio_gen = to_audio_generator(decode_stream(bedrock_stream, model.codec), cancel_token)
             logger.debug('Created bedrock stream to audio generator')
 
-            reader = Reader()
-            for audio in audio_gen:
-                reader.read(audio)
-
-            reader.close()
+            reader = Reader(cancel_token, output=self.audio_output, turn_executors=self.executors)
+            self._play(reader, audio_gen, cancel_token)
 
         except Exception as e:
             logger.error(e)
-            time.sleep(2)
-            self.speaking = False
 
-        time.sleep(1)
         self.speaking = False
         logger.debug('Bedrock generation completed')
 
-    def invoke_bedrock_agent(self, text):
+    def invoke_bedrock_agent(self, text, speculative=None, trace=None, cancel_token=None):
         logger.debug('Bedrock Agent processing started')
         self.speaking = True
+        cancel_token = cancel_token or self._start_turn()
+        trace = trace or TurnTrace(metrics=metrics)
 
         try:
-            response_stream, response_queue = self.bedrock_agent.process(text)
+            prepared = self._speculative_result(speculative) or self.bedrock_agent.prepare(text)
+            trace.add_stages(prepared.timings)
+            trace.mark('prepared')
+            response_stream, response_queue = self.bedrock_agent.process(text, cancel_token=cancel_token, prepared=prepared)
             
             logger.debug('Capturing Bedrock Agent response stream')
             
-            audio_gen = to_audio_generator(response_stream)
+            audio_gen = to_audio_generator(response_stream, cancel_token, trace)
             logger.debug('Created Bedrock Agent response stream to audio generator')
 
-            reader = Reader()
-            for audio in audio_gen:
-                reader.read(audio)
-
-            reader.close()
+            reader = Reader(cancel_token, trace, self.audio_output, self.executors)
+            self._play(reader, audio_gen, cancel_token)
+            trace.finish()
 
             # Get the full response from the queue
             full_response = response_queue.get()
+            if cancel_token.is_cancelled():
+                logger.info(f"Turn interrupted after: {full_response}")
             logger.debug(f"Final question: {text}")
             logger.debug(f"Final response: {full_response}")
-            # Add the full response to the conversation context
-            self.bedrock_agent.context.add_turn("Final Response", "", text, full_response)
+            # Add the full response to the conversation context, with the typo-fixed question as the user's turn
+            self.bedrock_agent.context.add_turn("Final Response", "", prepared.corrected_text, full_response)
 
         except Exception as e:
             logger.exception("An error occurred during Bedrock Agent processing:")
             traceback.print_exc()
-            
+
+            # Only needed to describe the failure, so they are not imported up front. boto3 talks to AWS through
+            # botocore and urllib3, never requests (which is not a dependency), so network errors are botocore's.
+            import boto3
+            from botocore.exceptions import ConnectionError as BotocoreConnectionError
             if isinstance(e, boto3.exceptions.Boto3Error):
                 logger.error("AWS Boto3 related error occurred. Please check your AWS credentials and permissions.")
             elif isinstance(e, json.JSONDecodeError):
                 logger.error("JSON decoding error. The response from Bedrock Agent might be malformed.")
-            elif isinstance(e, requests.exceptions.RequestException):
+            elif isinstance(e, BotocoreConnectionError):
                 logger.error("Network error occurred. Please check your internet connection.")
             else:
                 logger.error(f"An unexpected error occurred: {str(e)}")
-            
-            time.sleep(2)
-            self.speaking = False
 
-        time.sleep(1)
+            # Whatever was already queued for playback is dropped together with the failed turn.
+            self.audio_output.flush()
+
         self.speaking = False
         logger.debug('Bedrock Agent processing completed')
 
 class Reader:
 
-    def __init__(self):
-        self.polly = boto3.client('polly', region_name=config['region'])
-        self.audio = p.open(format=pyaudio.paInt16, channels=1, rate=16000, output=True)
-        self.chunk = 1024
+    def __init__(self, cancel_token, trace=None, output=None, turn_executors=None):
+        self.chunk = 4096
+        self.cancel_token = cancel_token
+        self.trace = trace or TurnTrace()
+        self.audio_output = output or audio_output
+        self.executors = turn_executors or executors
+
+        # Sentences are synthesized up to `lookahead` ahead of the one playing, so the next one is already
+        # buffered when the current one ends. read() blocks once that many requests are in flight.
+        self.pending = queue.Queue(maxsize=config['tts_pipeline']['lookahead'])
+        self.gaps = []
+        self.closed = False
+        self.player = self.executors.playback.submit(self._play_loop)
 
     def read(self, data):
-        response = self.polly.synthesize_speech(
-            Text=data,
+        if self.cancel_token.is_cancelled():
+            return
+
+        future = self.executors.synthesis.submit(self._synthesize, data)
+        # Requests that have not been sent to Polly yet are dropped as soon as the turn is cancelled.
+        self.cancel_token.add_callback(future.cancel)
+        self.pending.put(future)
+
+    def _synthesize(self, text):
+        cache_key, audio = lookup_tts_cache(text)
+        if audio is not None:
+            return cache_key, audio, None
+
+        response = aws_clients.client('polly').synthesize_speech(
+            Text=text,
             Engine=config['polly']['Engine'],
             LanguageCode=config['polly']['LanguageCode'],
             VoiceId=config['polly']['VoiceId'],
             OutputFormat=config['polly']['OutputFormat'],
         )
+        return cache_key, None, response['AudioStream']
 
-        stream = response['AudioStream']
-
+    @staticmethod
+    def _discard(future):
+        def close_stream(done):
+            if not done.cancelled() and done.exception() is None:
+                stream = done.result()[2]
+                if stream is not None:
+                    stream.close()
+
+        if not future.cancel():
+            future.add_done_callback(close_stream)
+
+    def _record_gap(self, previous_sentence_end):
+        # Audible silence: how long the speakers ran dry before this sentence's audio arrived.
+        if previous_sentence_end is not None:
+            self.gaps.append(max(time.monotonic() - previous_sentence_end, 0.0))
+
+    def _play_loop(self):
+        sentence_end = None
         while True:
-            # Check if user signaled to shutdown Bedrock speech
-            # UserInputManager.start_shutdown_executor() will raise Exception. If not ideas but is functional.
-            if UserInputManager.is_executor_set() and UserInputManager.is_shutdown_scheduled():
-                UserInputManager.start_shutdown_executor()
-
-            data = stream.read(self.chunk)
-            self.audio.write(data)
-            if not data:
+            future = self.pending.get()
+            if future is None:
                 break
+            if self.cancel_token.is_cancelled():
+                self._discard(future)
+                continue
+
+            try:
+                cache_key, audio, stream = future.result()
+            except Exception as e:
+                logger.error(f"Polly synthesis failed: {e}")
+                continue
+
+            if audio is not None:
+                self.trace.mark('first_polly_byte')
+                self._record_gap(sentence_end)
+                self.audio_output.write(audio, cancelled=self.cancel_token.is_cancelled)
+                self.trace.mark('first_audio_out')
+            else:
+                chunks = []
+                while not self.cancel_token.is_cancelled():
+                    data = stream.read(self.chunk)
+                    if not data:
+                        break
+                    if not chunks:
+                        self.trace.mark('first_polly_byte')
+                        self._record_gap(sentence_end)
+                    chunks.append(data)
+                    self.audio_output.write(data, cancelled=self.cancel_token.is_cancelled)
+                    self.trace.mark('first_audio_out')
+                else:
+                    chunks = None  # interrupted
+                stream.close()
+                # Interrupted sentences are incomplete and must not end up in the cache.
+                if chunks and cache_key is not None:
+                    tts_cache.put(cache_key, b''.join(chunks))
+            sentence_end = self.audio_output.buffered_until()
 
     def close(self):
-        time.sleep(1)
-        self.audio.stop_stream()
-        self.audio.close()
+        if self.closed:
+            return
+        self.closed = True
+        self.pending.put(None)
+        self.player.result()
+
+        if tts_cache is not None:
+            logger.debug(f"TTS cache stats: {tts_cache.stats()}")
+        if self.gaps:
+            logger.info(f"Sentence gaps: count={len(self.gaps)}, mean={sum(self.gaps) / len(self.gaps) * 1000:.0f}ms, "
+                        f"max={max(self.gaps) * 1000:.0f}ms")
+
+        # Return once the speakers have actually played the last sample, or right away on interruption.
+        while not self.audio_output.wait_drained(timeout=0.05):
+            if self.cancel_token.is_cancelled():
+                return
+        self.trace.mark('drained')
 
 
 def stream_data(stream):
-    chunk = 1024
+    chunk = 4096
     if stream:
-        polly_stream = p.open(
-            format=pyaudio.paInt16,
-            channels=1,
-            rate=16000,
-            output=True,
-        )
-
         while True:
             data = stream.read(chunk)
-            polly_stream.write(data)
 
             # If there's no more data to read, stop streaming
             if not data:
-                time.sleep(0.5)
                 stream.close()
-                polly_stream.stop_stream()
-                polly_stream.close()
+                audio_output.wait_drained()
                 break
+
+            audio_output.write(data)
     else:
         # The stream passed in is empty
         pass
 
 
+def lookup_tts_cache(text):
+    # Returns the cache key to store freshly synthesized audio under, and the cached audio if there is any.
+    if tts_cache is None or len(text) > config['tts_cache']['max_text_length']:
+        return None, None
+    cache_key = TTSCache.key(text, config['polly'])
+    return cache_key, tts_cache.get(cache_key)
+
+
 def aws_polly_tts(polly_text):
     logger.info(f'Character count: {len(polly_text)}')
-    byte_stream_list = []
+    audio_list = []
     polly_text_len = len(polly_text.split('.'))
     logger.debug(f'LEN polly_text_len: {polly_text_len}')
     for i in range(0, polly_text_len, 20):
@@ -248,7 +452,12 @@ def aws_polly_tts(polly_text):
         polly_text_chunk = '. '.join(polly_text.split('. ')[i:i + 20])
         logger.debug(f'polly_text_chunk LEN: {len(polly_text_chunk)}')
 
-        response = polly.synthesize_speech(
+        cache_key, audio = lookup_tts_cache(polly_text_chunk)
+        if audio is not None:
+            audio_list.append((None, audio))
+            continue
+
+        response = aws_clients.client('polly').synthesize_speech(
             Text=polly_text_chunk,
             Engine=config['polly']['Engine'],
             LanguageCode=config['polly']['LanguageCode'],
@@ -256,86 +465,107 @@ def aws_polly_tts(polly_text):
             OutputFormat=config['polly']['OutputFormat'],
         )
         byte_stream = response['AudioStream']
-        byte_stream_list.append(byte_stream)
+        audio_list.append((cache_key, byte_stream))
 
     byte_chunks = []
     chunk = 1024
-    for bs in byte_stream_list:
+    for cache_key, bs in audio_list:
+        if isinstance(bs, bytes):
+            byte_chunks.append(bs)
+            continue
+
+        stream_chunks = []
         while True:
             data = bs.read(chunk)
-            byte_chunks.append(data)
+            stream_chunks.append(data)
 
             if not data:
                 bs.close()
                 break
 
+        audio = b''.join(stream_chunks)
+        if cache_key is not None:
+            tts_cache.put(cache_key, audio)
+        byte_chunks.append(audio)
+
     read_byte_chunks(b''.join(byte_chunks))
 
 
 def read_byte_chunks(data):
-    polly_stream = p.open(format=pyaudio.paInt16, channels=1, rate=16000, output=True)
-    polly_stream.write(data)
-
-    time.sleep(1)
-    polly_stream.stop_stream()
-    polly_stream.close()
-    time.sleep(1)
+    audio_output.write(data)
+    audio_output.wait_drained()
 
 
 class EventHandler(TranscriptResultStreamHandler):
-    text = []
-    last_time = 0
-    sample_count = 0
-    max_sample_counter = 20
 
-    def __init__(self, transcript_result_stream: TranscriptResultStream, bedrock_wrapper):
+    def __init__(self, transcript_result_stream: TranscriptResultStream, bedrock_wrapper, endpointer):
         super().__init__(transcript_result_stream)
         self.bedrock_wrapper = bedrock_wrapper
+        self.endpointer = endpointer
 
     async def handle_transcript_event(self, transcript_event: TranscriptEvent):
         results = transcript_event.transcript.results
         if not self.bedrock_wrapper.is_speaking():
-            if results:
-                for result in results:
-                    EventHandler.sample_count = 0
-                    if not result.is_partial:
-                        for alt in result.alternatives:
-                            logger.info(f"Transcribed: {alt.transcript}")
-                            EventHandler.text.append(alt.transcript)
+            for result in results:
+                transcript = result.alternatives[0].transcript if result.alternatives else ''
+                if not result.is_partial:
+                    logger.info(f"Transcribed: {transcript}")
+                self.endpointer.on_result(result.result_id, transcript, result.is_partial)
 
-            else:
-                EventHandler.sample_count += 1
-                if EventHandler.sample_count == EventHandler.max_sample_counter:
+        self.check_endpoint()
 
-                    if len(EventHandler.text) == 0:
-                        EventHandler.sample_count = 0
-                    else:
-                        input_text = ' '.join(EventHandler.text)
-                        logger.info(f"User input: {input_text}")
+    def check_endpoint(self):
+        # Called for every transcript event and every mic block, so the turn fires as soon as the user stops.
+        if self.bedrock_wrapper.is_speaking():
+            return
 
-                        executor = ThreadPoolExecutor(max_workers=1)
-                        UserInputManager.set_executor(executor)
-                        loop.run_in_executor(
-                            executor,
-                            self.bedrock_wrapper.invoke_bedrock_agent,
-                            input_text
-                        )
+        speculation = self.bedrock_wrapper.speculation
+        if speculation is not None:
+            speculation.poll(self.endpointer.pending_text(), self.endpointer.silent_since())
 
-                    EventHandler.text.clear()
-                    EventHandler.sample_count = 0
+        input_text = self.endpointer.poll()
+        if input_text:
+            logger.info(f"User input: {input_text}")
+            trace = TurnTrace(self.endpointer.last_speech_end, metrics)
+            trace.mark('final_transcript', self.endpointer.last_transcript_at)
+            trace.mark('endpoint')
+            speculative = speculation.take(input_text) if speculation is not None else None
+            self.bedrock_wrapper.submit_turn(input_text, speculative, trace)
 
 
 class MicStream:
 
+    def __init__(self, bedrock_wrapper=None):
+        self.bedrock_wrapper = bedrock_wrapper or BedrockWrapper()
+        self.endpointer = Endpointer(**config['endpointing']['settings'])
+        self.event_handler = None
+        self.barge_in = config['barge_in']['enabled']
+        use_vad = self.barge_in or config['endpointing']['use_vad']
+        self.voice_activity = VoiceActivityDetector(**config['vad']) if use_vad else None
+
+    def _process_voice_activity(self, indata):
+        # Runs on the audio callback thread, so an interruption does not wait for the event loop.
+        if self.voice_activity is None:
+            return
+        onset = self.voice_activity.process(indata)
+        if config['endpointing']['use_vad']:
+            self.endpointer.on_audio(self.voice_activity.silence_ms)
+        if self.barge_in and onset and self.bedrock_wrapper.is_speaking():
+            logger.info('Speech detected while speaking, barging in')
+            self.bedrock_wrapper.interrupt()
+
     async def mic_stream(self):
         loop = asyncio.get_event_loop()
         input_queue = asyncio.Queue()
 
         def callback(indata, frame_count, time_info, status):
-            loop.call_soon_threadsafe(input_queue.put_nowait, (bytes(indata), status))
+            indata = bytes(indata)
+            self._process_voice_activity(indata)
+            loop.call_soon_threadsafe(input_queue.put_nowait, (indata, status))
 
+        import sounddevice  # Loads PortAudio; only the microphone needs it.
         stream = sounddevice.RawInputStream(
-            channels=1, samplerate=16000, callback=callback, blocksize=2048 * 2, dtype="int16")
+            channels=1, samplerate=16000, callback=callback, blocksize=1024, dtype="int16")
         with stream:
             while True:
                 indata, status = await input_queue.get()
@@ -344,23 +574,31 @@ class MicStream:
     async def write_chunks(self, stream):
         async for chunk, status in self.mic_stream():
             await stream.input_stream.send_audio_event(audio_chunk=chunk)
+            if self.event_handler is not None:
+                self.event_handler.check_endpoint()
 
         await stream.input_stream.end_stream()
 
     async def basic_transcribe(self):
-        loop.run_in_executor(ThreadPoolExecutor(max_workers=1), UserInputManager.start_user_input_loop)
+        UserInputManager.set_interrupt_handler(self.bedrock_wrapper.interrupt)
+        # Blocked in readline for the whole session; a daemon thread does not hold up exit.
+        threading.Thread(target=UserInputManager.start_user_input_loop, daemon=True).start()
+        await self.transcribe()
 
-        stream = await transcribe_streaming.start_stream_transcription(
+    async def transcribe(self):
+        stream = await transcribe_client().start_stream_transcription(
             language_code="en-US",
             media_sample_rate_hz=16000,
             media_encoding="pcm",
         )
 
-        handler = EventHandler(stream.output_stream, BedrockWrapper())
-        await asyncio.gather(self.write_chunks(stream), handler.handle_events())
+        self.event_handler = EventHandler(stream.output_stream, self.bedrock_wrapper, self.endpointer)
+        await asyncio.gather(self.write_chunks(stream), self.event_handler.handle_events())
 
 
 if __name__ == "__main__":
+    interrupt_hint = ("Start talking or hit ENTER at any time to interrupt me." if config['barge_in']['enabled']
+                      else "Hit ENTER at any time to interrupt me.")
     info_text = f'''
 *************************************************************
 Welcome to your League of Legends Voice Chat Game Partner!
@@ -373,7 +611,7 @@ To start talking, simply speak into your microphone.
 I'll listen and respond to your questions and comments.
 
 Remember:
-- Hit ENTER at any time to interrupt me if needed.
+- {interrupt_hint}
 - After interrupting, you can continue speaking as normal.
 
 Let's dive into the world of League of Legends together!
@@ -382,6 +620,8 @@ What would you like to talk about?
 '''
     print(info_text)
 
+    metrics.start_exporters(config['metrics'])
+    aws_clients.warm_up()
     loop = asyncio.get_event_loop()
     try:
         loop.run_until_complete(MicStream().basic_transcribe())
@@ -392,7 +632,6 @@ What would you like to talk about?
             logger.error(f"An unexpected error occurred: {str(e)}")
     
         # Cleanup and exit
-        if UserInputManager.is_executor_set():
-            UserInputManager.start_shutdown_executor()
+        UserInputManager.interrupt()
         
         logger.info("Exiting...")
@@ -0,0 +1,200 @@
+import threading
+import time
+from logger import logger
+
+# PyAudio loads PortAudio, so it is imported when the first sound is played rather than with this module.
+pyaudio = None
+
+
+def _pyaudio():
+    global pyaudio
+    if pyaudio is None:
+        import pyaudio as module
+        pyaudio = module
+    return pyaudio
+
+
+class RingBuffer:
+
+    def __init__(self, capacity):
+        self.buffer = bytearray(capacity)
+        self.capacity = capacity
+        self.read_pos = 0
+        self.size = 0
+
+    def free(self):
+        return self.capacity - self.size
+
+    def write(self, data):
+        # Callers make sure len(data) <= free()
+        write_pos = (self.read_pos + self.size) % self.capacity
+        first = min(len(data), self.capacity - write_pos)
+        self.buffer[write_pos:write_pos + first] = data[:first]
+        self.buffer[:len(data) - first] = data[first:]
+        self.size += len(data)
+
+    def read(self, n):
+        n = min(n, self.size)
+        first = min(n, self.capacity - self.read_pos)
+        data = bytes(self.buffer[self.read_pos:self.read_pos + first]) + bytes(self.buffer[:n - first])
+        self.read_pos = (self.read_pos + n) % self.capacity
+        self.size -= n
+        return data
+
+    def clear(self):
+        self.read_pos = 0
+        self.size = 0
+
+
+class AudioOutputEngine:
+    # One long-lived PortAudio output stream for the whole session. PortAudio pulls audio from a ring buffer
+    # through a callback, so writers only copy bytes and never block on the device.
+    # PortAudio and the device are opened on the first write, so creating the engine works on machines without
+    # one. Without `pa`, a PyAudio instance is created at that point.
+
+    def __init__(self, pa=None, rate=16000, channels=1, buffer_seconds=10, frames_per_buffer=512):
+        self.pa = pa
+        self.rate = rate
+        self.channels = channels
+        self.frames_per_buffer = frames_per_buffer
+        self.frame_size = channels * 2  # paInt16
+        self.ring = RingBuffer(rate * self.frame_size * buffer_seconds)
+        self.condition = threading.Condition()
+        self.drained_at = 0.0
+        self.stream = None
+
+    def _start(self):
+        with self.condition:
+            if self.stream is not None:
+                return
+            if self.pa is None:
+                self.pa = _pyaudio().PyAudio()
+            self.stream = self.pa.open(
+                format=_pyaudio().paInt16,
+                channels=self.channels,
+                rate=self.rate,
+                output=True,
+                frames_per_buffer=self.frames_per_buffer,
+                stream_callback=self._callback,
+            )
+            self.stream.start_stream()
+        logger.debug("Audio output engine started")
+
+    def _callback(self, in_data, frame_count, time_info, status):
+        n = frame_count * self.frame_size
+        with self.condition:
+            had_audio = self.ring.size > 0
+            data = self.ring.read(n)
+            if had_audio:
+                # The device plays what it was just handed after its own output latency.
+                latency = max(time_info.get('output_buffer_dac_time', 0) - time_info.get('current_time', 0), 0)
+                self.drained_at = time.monotonic() + latency + len(data) / (self.rate * self.frame_size)
+            self.condition.notify_all()
+        if len(data) < n:
+            data += b'\x00' * (n - len(data))
+        return data, pyaudio.paContinue
+
+    def write(self, data, cancelled=None):
+        # Blocks while the ring is full. `cancelled` is polled meanwhile so a writer can give up without
+        # waiting for several seconds of queued audio to play; returns False in that case.
+        # Odd byte counts would shift every following sample, so writes are trimmed to whole frames.
+        if self.stream is None:
+            self._start()
+        view = memoryview(data)[:len(data) - len(data) % self.frame_size]
+        while len(view):
+            with self.condition:
+                while self.ring.free() == 0:
+                    if cancelled is not None and cancelled():
+                        return False
+                    self.condition.wait(0.05)
+                n = min(len(view), self.ring.free())
+                self.ring.write(view[:n])
+            view = view[n:]
+        return True
+
+    def flush(self):
+        with self.condition:
+            self.ring.clear()
+            self.drained_at = time.monotonic()
+            self.condition.notify_all()
+
+    def buffered_until(self):
+        # Monotonic time at which everything queued so far will have been handed to the device.
+        with self.condition:
+            return time.monotonic() + self.ring.size / (self.rate * self.frame_size)
+
+    def is_playing(self):
+        with self.condition:
+            return self.ring.size > 0 or time.monotonic() < self.drained_at
+
+    def wait_drained(self, timeout=None):
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self.condition:
+            while self.ring.size > 0:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self.condition.wait(remaining)
+            drained_at = self.drained_at
+
+        delay = drained_at - time.monotonic()
+        if deadline is not None:
+            delay = min(delay, deadline - time.monotonic())
+        if delay > 0:
+            time.sleep(delay)
+        return time.monotonic() >= drained_at
+
+    def close(self):
+        self.flush()
+        if self.stream is not None:
+            self.stream.stop_stream()
+            self.stream.close()
+
+
+class NullAudioOutput:
+    # Same interface as AudioOutputEngine, but plays into nothing at real-time speed, so drain times and
+    # playback gaps behave as they would on a device. Used by the offline benchmark.
+
+    def __init__(self, rate=16000, channels=1):
+        self.rate = rate
+        self.frame_size = channels * 2
+        self.condition = threading.Condition()
+        self.playing_until = 0.0
+        self.bytes_played = 0
+
+    def write(self, data, cancelled=None):
+        with self.condition:
+            start = max(time.monotonic(), self.playing_until)
+            self.playing_until = start + len(data) / (self.rate * self.frame_size)
+            self.bytes_played += len(data)
+        return True
+
+    def flush(self):
+        with self.condition:
+            self.playing_until = time.monotonic()
+            self.condition.notify_all()
+
+    def buffered_until(self):
+        with self.condition:
+            return max(time.monotonic(), self.playing_until)
+
+    def is_playing(self):
+        with self.condition:
+            return time.monotonic() < self.playing_until
+
+    def wait_drained(self, timeout=None):
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self.condition:
+            while True:
+                now = time.monotonic()
+                if now >= self.playing_until:
+                    return True
+                wait = self.playing_until - now
+                if deadline is not None:
+                    if now >= deadline:
+                        return False
+                    wait = min(wait, deadline - now)
+                self.condition.wait(wait)
+
+    def close(self):
+        self.flush()
@@ -0,0 +1,135 @@
+import threading
+import time
+from config import config
+from logger import logger
+
+# The one place AWS clients are made. botocore clients are thread-safe, so every service has a single client
+# shared by all threads and sessions. Its connection pool is sized for the threads that call the service at
+# the same time, and can be warmed up front so the first turn does not pay for TCP and TLS handshakes.
+
+_lock = threading.Lock()
+_session = None
+_clients = {}
+_overrides = {}
+_sessions = 1
+_warm_failures = set()
+
+
+def pool_size(service_name, sessions=1):
+    # Most requests each service can have in flight, from the worker pools that call it.
+    if service_name == 'bedrock-runtime':
+        # Preparation stages and the streamed answer of every session, plus query embeddings on the KB pool.
+        return sessions * (config['agent']['max_parallel_stages'] + 1) + config['knowledge_base']['max_parallel_queries']
+    if service_name == 'polly':
+        return sessions * (config['tts_pipeline']['lookahead'] + 1)
+    if service_name == 'bedrock-agent-runtime':
+        # One KB pool serves every session.
+        return config['knowledge_base']['max_parallel_queries']
+    return 10  # botocore's default
+
+
+def client(service_name):
+    with _lock:
+        existing = _overrides.get(service_name) or _clients.get(service_name)
+        if existing is None:
+            existing = _clients[service_name] = _create(service_name)
+        return existing
+
+
+def _create(service_name):
+    global _session
+    # boto3 takes a good part of startup to import, so it is imported with the first client.
+    import boto3
+    from botocore.config import Config
+    if _session is None:
+        # Sessions are not thread-safe; clients are only created under _lock.
+        _session = boto3.session.Session(region_name=config['region'])
+    settings = config['aws_clients']
+    size = pool_size(service_name, _sessions)
+    logger.debug(f"Creating {service_name} client with {size} pooled connections")
+    return _session.client(service_name, config=Config(
+        max_pool_connections=size,
+        tcp_keepalive=True,
+        connect_timeout=settings['connect_timeout_s'],
+        read_timeout=settings['read_timeout_s'],
+        retries={'max_attempts': settings['max_attempts'], 'mode': 'standard'},
+    ))
+
+
+def override(service_name, replacement):
+    # Every later client(service_name) returns `replacement`; used by the offline benchmarks.
+    with _lock:
+        _overrides[service_name] = replacement
+
+
+def plan_sessions(sessions):
+    # Sizes the pools for `sessions` concurrent conversations. Clients already handed out keep working with
+    # their pools; later client() calls get new ones with larger pools.
+    global _sessions
+    with _lock:
+        if sessions <= _sessions:
+            return
+        _sessions = sessions
+        _clients.clear()
+
+
+def _warm(service_name, connections):
+    # Opens up to `connections` connections to the service endpoint and parks them in the client's pool.
+    # botocore has no public API for this; the internals used here were checked against botocore 1.35.99 with
+    # urllib3 2.8. Clients that are not botocore's (the benchmark fakes) are skipped, and so is a botocore
+    # whose internals changed, with one warning per service.
+    try:
+        aws_client = client(service_name)
+        if not hasattr(aws_client, '_endpoint'):
+            logger.debug(f"Cannot pre-warm {service_name}: not a botocore client")
+            return
+        endpoint = aws_client._endpoint
+        http = endpoint.http_session
+        url = endpoint.host
+        pool = http._get_connection_manager(url, http._proxy_config.proxy_url_for(url)).connection_from_url(url)
+        http._setup_ssl_cert(pool, url, http._verify)
+    except Exception as e:
+        if service_name not in _warm_failures:
+            _warm_failures.add(service_name)
+            logger.warning(f"Cannot pre-warm {service_name} connections, skipping: {e!r}")
+        return
+
+    start = time.perf_counter()
+    taken = []
+    opened = 0
+    try:
+        for _ in range(min(connections, pool_size(service_name, _sessions))):
+            connection = pool._get_conn()
+            taken.append(connection)
+            if not connection.is_connected:
+                connection.connect()
+                opened += 1
+    except Exception as e:
+        logger.warning(f"Could not pre-warm {service_name} connections: {e}")
+    finally:
+        for connection in taken:
+            pool._put_conn(connection)
+    if opened:
+        logger.debug(f"Opened {opened} {service_name} connections in {(time.perf_counter() - start) * 1000:.0f}ms")
+
+
+def warm_up():
+    # Pre-warms every configured service in the background, and keeps doing so periodically: idle connections
+    # are closed by the endpoints after a while, and reopening them here keeps that off the turn's path.
+    settings = config['aws_clients']
+    if not settings['prewarm_connections']:
+        return
+
+    def warm_all():
+        for service_name, connections in settings['prewarm_connections'].items():
+            threading.Thread(target=_warm, args=(service_name, connections), daemon=True,
+                             name=f'warm-{service_name}').start()
+
+    def keep_warm():
+        while True:
+            warm_all()
+            if not settings['keep_warm_interval_s']:
+                return
+            time.sleep(settings['keep_warm_interval_s'])
+
+    threading.Thread(target=keep_warm, daemon=True, name='keep-warm').start()
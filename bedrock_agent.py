@@ -1,45 +1,244 @@
 import json
-from bedrock_models_wrapper import BedrockModelsWrapper
+from bedrock_models_wrapper import BedrockModelsWrapper, model_descriptor
+from stream_codecs import decode_stream
 from conversation_context import ConversationContext
 from logger import logger
 from config import config
 from bedrock_knowledge_base import BedrockKnowledgeBase
+from stage_scheduler import StageScheduler
+from champion_corrector import ChampionNameCorrector
+from intent_classifier import IntentClassifier
+from lol_vocabulary import CHAMPION_NAMES
+from preprocess_result import PreprocessResult, PreparedTurn
+from kb_cache import RetrievalCache
+from kb_context import KBContextBuilder
+from kb_router import KBRouter
+from concurrent.futures import ThreadPoolExecutor
+import atexit
+import os
 import queue
-import threading
+import remote_calls as remote_call_log
+
+class AgentServices:
+    # Everything the agent uses that holds no conversation state: clients, indexes, caches and the stage pool.
+    # One instance can back the agents of many sessions; all of it is safe to use from several threads.
+    def __init__(self, bedrock_runtime, max_parallel_stages=None):
+        self.bedrock_runtime = bedrock_runtime
+        self.knowledge_base = BedrockKnowledgeBase(
+            cache=self._create_kb_cache(),
+            max_workers=config['knowledge_base']['max_parallel_queries'],
+            deadline=config['knowledge_base']['deadline_ms'] / 1000,
+            **self._create_local_kb_backend(),
+        )
+        self.kb_router = KBRouter(**config['kb_router'])
+        self.kb_context_builder = KBContextBuilder(**config['kb_context'])
+        self.champion_corrector = ChampionNameCorrector()
+        self.intent_classifier = IntentClassifier()
+        self.executor = ThreadPoolExecutor(max_workers=max_parallel_stages or config['agent']['max_parallel_stages'])
+
+    @staticmethod
+    def _create_kb_cache():
+        settings = config['kb_cache']
+        if not settings['enabled']:
+            return None
+        # Resolved against the repository rather than the working directory, so every run uses the same file.
+        path = settings['path'] and os.path.join(os.path.dirname(os.path.abspath(__file__)), settings['path'])
+        cache = RetrievalCache(settings['max_entries'], settings['ttl_s'], path)
+        if path:
+            atexit.register(cache.save)
+        return cache
+
+    def _create_local_kb_backend(self):
+        settings = config['knowledge_base']
+        if settings['backend'] != 'local':
+            return {}
+        # Imported here so numpy is only needed when the local backend is in use.
+        from local_vector_index import LocalVectorIndex, BedrockEmbedder
+
+        local = settings['local_index']
+        root = local['dir']
+        local_indexes = {}
+        if os.path.isdir(root):
+            for kb_id in os.listdir(root):
+                index = LocalVectorIndex(os.path.join(root, kb_id), local['nprobe'], local['reload_interval_s'])
+                if index.available():
+                    local_indexes[kb_id] = index
+        logger.info(f"Local KB backend serves: {', '.join(local_indexes) or 'nothing'}")
+        return {
+            'local_indexes': local_indexes,
+            'embedder': BedrockEmbedder(self.bedrock_runtime, local['embedding_model']),
+        }
+
 
 class BedrockAgent:
-    def __init__(self, bedrock_runtime):
+    # One conversation. Agents created with the same services share clients and caches, but never context.
+    def __init__(self, bedrock_runtime, services=None):
+        services = services or AgentServices(bedrock_runtime)
         self.bedrock_runtime = bedrock_runtime
-        self.context = ConversationContext()
-        self.knowledge_base = BedrockKnowledgeBase()
+        self.context = ConversationContext(**config['conversation'])
+        self.knowledge_base = services.knowledge_base
+        self.kb_router = services.kb_router
+        self.kb_context_builder = services.kb_context_builder
+        self.champion_corrector = services.champion_corrector
+        self.intent_classifier = services.intent_classifier
+        self.executor = services.executor
+        self.last_timings = {}
         logger.info("BedrockAgent initialized")
 
-    def process(self, text):
-        # Step 0: Fix typos in the input
-        corrected_text = self._fix_typos(text)
-
-        # Step 1: Analyze the input
-        json_content = self._analyze_input(corrected_text)
+    def process(self, text, cancel_token=None, prepared=None):
+        if prepared is None:
+            prepared = self.prepare(text)
+        return self.respond(prepared, cancel_token)
 
-        # Parse the extracted JSON content
+    def prepare(self, text):
+        # Everything before the final answer. It has no side effects on the conversation, so it can run
+        # speculatively on a partial transcript and be thrown away.
+        remote_calls = []
+        context_token = remote_call_log.current.set(remote_calls)
         try:
-            analysis = json.loads(json_content)
-        except json.JSONDecodeError as e:
-            logger.error(f"Failed to parse JSON content: {e}")
-            analysis = {"is_about_lol": False, "explanation": "Error in parsing input"}
-            print(f"An error occurred while processing your input: {e}")
-
-        if not analysis.get("is_about_lol", False):
+            prepared = None
+            if config['agent']['preprocessing_mode'] == 'fused':
+                preprocessed = self._preprocess_fused(text)
+                if preprocessed is not None:
+                    prepared = self._prepare_preprocessed(text, preprocessed)
+            if prepared is None:
+                prepared = self._prepare_staged(text)
+        finally:
+            remote_call_log.current.reset(context_token)
+
+        prepared.remote_calls = remote_calls
+        return prepared
+
+    def respond(self, prepared, cancel_token=None):
+        if not prepared.is_about_lol:
             logger.info("Processing as chat")
-            return self._chat_with_user(corrected_text)
+            return self._chat_with_user(prepared.corrected_text, cancel_token)
+
+        logger.info("Processing as question")
+        return self._solve_question(prepared.corrected_text, prepared.kb_content, cancel_token)
+
+    def _prepare_staged(self, text):
+        # The local champion corrector costs microseconds, so it runs first; when it is confident, every stage
+        # works on the corrected text. Only when the Bedrock typo fix is needed do the stages overlap with it:
+        # classification and question completion run on the raw transcript, and KB retrieval starts
+        # speculatively on the raw completed question. That retrieval is reused when the typo fix turns out to
+        # be a no-op, or thrown away and redone on the corrected text otherwise.
+        scheduler = StageScheduler(self.executor)
+        corrected_text = self._correct_locally(text)
+        if corrected_text is not None:
+            scheduler.add('analyze', lambda: self._analyze_input(corrected_text))
+            scheduler.add('complete_question', lambda: self._complete_question_for_kb(corrected_text))
+            scheduler.add('kb_retrieval', self._retrieve_for_question, depends_on=('complete_question',))
+            kb_stage = 'kb_retrieval'
+        else:
+            scheduler.add('fix_typos', lambda: self._fix_typos(text))
+            scheduler.add('analyze', lambda: self._analyze_input(text))
+            scheduler.add('complete_question', lambda: self._complete_question_for_kb(text))
+            scheduler.add('kb_retrieval', self._retrieve_for_question, depends_on=('complete_question',))
+
+            corrected_text = scheduler.result('fix_typos')
+            kb_stage = 'kb_retrieval'
+            if self._normalize(corrected_text) != self._normalize(text):
+                logger.debug("Typo fix changed the input, dropping speculative KB retrieval")
+                scheduler.discard('kb_retrieval')
+                scheduler.add('complete_corrected_question', lambda: self._complete_question_for_kb(corrected_text))
+                scheduler.add('kb_retrieval_corrected', self._retrieve_for_question,
+                              depends_on=('complete_corrected_question',))
+                kb_stage = 'kb_retrieval_corrected'
+
+        analysis = scheduler.result('analyze')
+        is_about_lol = analysis.get("is_about_lol", False)
+        if is_about_lol:
+            kb_content = scheduler.result(kb_stage)
         else:
-            logger.info("Processing as question")
-            return self._solve_question(corrected_text)
+            scheduler.discard(kb_stage)
+            kb_content = ""
+        return self._prepared(text, corrected_text, is_about_lol, kb_content, scheduler)
+
+    def _prepare_preprocessed(self, text, preprocessed):
+        scheduler = StageScheduler(self.executor)
+        kb_content = ""
+        if preprocessed.is_about_lol:
+            scheduler.add('kb_retrieval', lambda: self._retrieve_for_question(preprocessed.completed_question))
+            kb_content = scheduler.result('kb_retrieval')
+        return self._prepared(text, preprocessed.corrected_text, preprocessed.is_about_lol, kb_content, scheduler)
+
+    def _prepared(self, text, corrected_text, is_about_lol, kb_content, scheduler):
+        self.last_timings = dict(scheduler.timings)
+        logger.info(f"Stage timings: {scheduler.format_timings()}")
+        return PreparedTurn(text, corrected_text, is_about_lol, kb_content, dict(scheduler.timings))
+
+    def _preprocess_fused(self, text):
+        # The fused call only pays off when the local models cannot settle the turn on their own.
+        correction = self.champion_corrector.correct(text)
+        intent = self.intent_classifier.classify(correction.text)
+        if (correction.confidence >= config['champion_corrector']['min_confidence']
+                and intent.confidence >= config['intent_classifier']['min_confidence']):
+            logger.debug("Local models are confident, using staged preprocessing")
+            return None
+
+        prompt = f"""You prepare voice transcripts for a League of Legends assistant.
+
+Here's a list of all current League of Legends champion names for your reference:
+{', '.join(CHAMPION_NAMES)}
+
+Conversation History:
+{self.context.get_recent_history(num_turns=10)}
+
+Input: {text}
+
+Tasks:
+1. corrected_text: the input with misheard champion names replaced by the champion whose name sounds most like them. Make no other changes.
+2. is_about_lol: whether the corrected input is about League of Legends.
+3. explanation: a brief explanation of that decision.
+4. completed_question: the corrected input reformulated as a complete question using relevant context from the conversation history. Do not answer it.
+
+Output the JSON ONLY, in this format:
+{{
+    "corrected_text": string,
+    "is_about_lol": boolean,
+    "explanation": string,
+    "completed_question": string
+}}
+"""
+        try:
+            response = self._invoke_bedrock(prompt, include_context=False, turn_type="Preprocessing", system_prompt="", is_stream=False, model_id="anthropic.claude-3-5-sonnet-20240620-v1:0")
+            result = PreprocessResult.from_json(response)
+        except (ValueError, KeyError, IndexError) as e:
+            logger.error(f"Fused preprocessing failed, falling back to staged preprocessing: {e}")
+            return None
+
+        logger.debug(f"Fused preprocessing result: {result}")
+        return result
+
+    @staticmethod
+    def _normalize(text):
+        return ' '.join(text.lower().split())
+
+    def _retrieve_for_question(self, completed_question):
+        route = self.kb_router.route(completed_question)
+        logger.debug(f"KB route: {route}")
+        kb_analysis = {
+            "kb_needed": bool(route.kb_ids),
+            "kb_ids": route.kb_ids,
+        }
+        return self._fetch_from_knowledge_bases(kb_analysis, completed_question) if kb_analysis['kb_needed'] else ""
+
+    def _correct_locally(self, text):
+        # The corrected text, or None when the local corrector is off or unsure and Bedrock has to fix typos.
+        if not config['champion_corrector']['enabled']:
+            return None
+        correction = self.champion_corrector.correct(text)
+        logger.debug(f"Local spell check: {correction}")
+        if correction.confidence >= config['champion_corrector']['min_confidence']:
+            return correction.text
+        logger.debug(f"Local spell check unsure about {correction.uncertain}, falling back to Bedrock")
+        return None
 
     def _fix_typos(self, text):
         prompt = f"""
 Here's a list of all current League of Legends champion names for your reference:
-Aatrox, Ahri, Akali, Akshan, Alistar, Amumu, Anivia, Annie, Aphelios, Ashe, Aurelion Sol, Aurora, Azir, Bard, Bel'Veth, Blitzcrank, Brand, Braum, Briar, Caitlyn, Camille, Cassiopeia, Cho'Gath, Corki, Darius, Diana, Dr. Mundo, Draven, Ekko, Elise, Evelynn, Ezreal, Fiddlesticks, Fiora, Fizz, Galio, Gangplank, Garen, Gnar, Gragas, Graves, Gwen, Hecarim, Heimerdinger, Hwei, Illaoi, Irelia, Ivern, Janna, Jarvan IV, Jax, Jayce, Jhin, Jinx, Kai'Sa, Kalista, Karma, Karthus, Kassadin, Katarina, Kayle, Kayn, Kennen, Kha'Zix, Kindred, Kled, Kog'Maw, K'Sante, LeBlanc, Lee Sin, Leona, Lillia, Lissandra, Lucian, Lulu, Lux, Malphite, Malzahar, Maokai, Master Yi, Milio, Miss Fortune, Mordekaiser, Morgana, Naafiri, Nami, Nasus, Nautilus, Neeko, Nidalee, Nilah, Nocturne, Nunu & Willump, Olaf, Orianna, Ornn, Pantheon, Poppy, Pyke, Qiyana, Quinn, Rakan, Rammus, Rek'Sai, Rell, Renata Glasc, Renekton, Rengar, Riven, Rumble, Ryze, Samira, Sejuani, Senna, Seraphine, Sett, Shaco, Shen, Shyvana, Singed, Sion, Sivir, Skarner, Smolder, Sona, Soraka, Swain, Sylas, Syndra, Tahm Kench, Taliyah, Talon, Taric, Teemo, Thresh, Tristana, Trundle, Tryndamere, Twisted Fate, Twitch, Udyr, Urgot, Varus, Vayne, Veigar, Vel'Koz, Vex, Vi, Viego, Viktor, Vladimir, Volibear, Warwick, Wukong, Xayah, Xerath, Xin Zhao, Yasuo, Yone, Yorick, Yuumi, Zac, Zed, Zeri, Ziggs, Zilean, Zoe, Zyra
+{', '.join(CHAMPION_NAMES)}
 
 Task: The input is a sentence generated by TTS, due to inaccurate speech recognition, there might be misidentification of champion names as other words, you need to carefully dissect each word, find and correct the errors.
 
@@ -53,13 +252,22 @@ Instructions:
 
 Output:
 """
-        response = self._invoke_bedrock(prompt, include_context=True, turn_type="Spell Check", system_prompt="", is_stream=False, model_id="anthropic.claude-3-5-sonnet-20240620-v1:0")
+        response = self._invoke_bedrock(prompt, include_context=False, turn_type="Spell Check", system_prompt="", is_stream=False, model_id="anthropic.claude-3-5-sonnet-20240620-v1:0")
 
         logger.debug(f"Spell check input: {text}")
         logger.debug(f"Spell check response: {response}")
         return response.strip()
 
     def _analyze_input(self, text):
+        if config['intent_classifier']['enabled']:
+            # The local corrector is memoized and costs microseconds, so classification sees proper champion names
+            # without waiting for the typo-fixing stage.
+            intent = self.intent_classifier.classify(self.champion_corrector.correct(text).text)
+            logger.debug(f"Local analysis: {intent}")
+            if intent.confidence >= config['intent_classifier']['min_confidence']:
+                return intent.to_dict()
+            logger.debug("Local analysis is ambiguous, falling back to Bedrock")
+
         prompt = f"""Analyze the following input and answer two questions:
 
 1. Is it a question or a casual chat?
@@ -77,22 +285,20 @@ Example output format:
     "explanation": "A brief explanation of your analysis"
 }}
 """
-        return self._invoke_bedrock(prompt, turn_type="Analysis", system_prompt="", is_stream=False, model_id="anthropic.claude-instant-v1")
-
-    def _chat_with_user(self, text):
-        return self._invoke_bedrock_with_queue(text, turn_type="Final Ask", system_prompt="You are a friendly AI assistant.", is_stream=True)
-
-    def _solve_question(self, text):
-        kb_analysis = {
-            "kb_needed": True,
-            "kb_ids": ["FQYOEZO3D0"],
-        }
+        json_content = self._invoke_bedrock(prompt, turn_type="Analysis", system_prompt="", is_stream=False, model_id="anthropic.claude-instant-v1")
 
-        # before fetching from knowledge bases, the question should be completed with the history of the conversation
-        completed_question = self._complete_question_for_kb(text)
+        # Parse the extracted JSON content
+        try:
+            return json.loads(json_content)
+        except json.JSONDecodeError as e:
+            logger.error(f"Failed to parse JSON content: {e}")
+            print(f"An error occurred while processing your input: {e}")
+            return {"is_about_lol": False, "explanation": "Error in parsing input"}
 
-        kb_content = self._fetch_from_knowledge_bases(kb_analysis, completed_question) if kb_analysis['kb_needed'] else ""
+    def _chat_with_user(self, text, cancel_token=None):
+        return self._invoke_bedrock_with_queue(text, turn_type="Final Ask", system_prompt="You are a friendly AI assistant.", is_stream=True, cancel_token=cancel_token)
 
+    def _solve_question(self, text, kb_content, cancel_token=None):
         enhanced_prompt = f"""You're a League of Legends expert. Provide the shortest possible accurate answer:
 
 Question: {text}
@@ -109,41 +315,24 @@ Instructions:
 6. If the question cannot be answered with the given information, explain why and suggest what additional information might be needed.
 
 Answer:"""
-        return self._invoke_bedrock_with_queue(enhanced_prompt, turn_type="Final Ask", system_prompt="You are a knowledgeable and enthusiastic League of Legends expert, eager to help players understand the game better.", is_stream=True)
-
-    def _analyze_knowledge_base_need(self, text):
-        prompt = f"""Analyze if the following question requires information from knowledge bases:
-
-Question: "{text}"
-
-Output JSON only with the following structure:
-{{
-    "kb_needed": boolean,
-    "kb_ids": list of strings,
-    "explanation": string
-}}
-
-Available knowledge bases:
-1. "lol_champions": Contains information about League of Legends champions, their abilities, and stats.
-2. "lol_items": Contains information about items, runes, and other game mechanics in League of Legends.
-3. "lol_stories": Contains information about the universe of League of Legends, including champions' backstories, legends, myths, and lore.
-
-Analyze the question and choose the most appropriate knowledge base IDs, or an empty list if none are relevant.
-"""
-        response = self._invoke_bedrock(prompt, turn_type="KBAnalysis", system_prompt="You are an AI that determines if external knowledge is needed to answer questions.", is_stream=False)
-        return json.loads(response)
+        return self._invoke_bedrock_with_queue(enhanced_prompt, turn_type="Final Ask", system_prompt="You are a knowledgeable and enthusiastic League of Legends expert, eager to help players understand the game better.", is_stream=True, cancel_token=cancel_token)
 
     def _fetch_from_knowledge_bases(self, kb_analysis, question):
         if kb_analysis['kb_needed'] and kb_analysis['kb_ids']:
-            results = self.knowledge_base.query_all(kb_analysis['kb_ids'], question, max_results_per_kb=10)
-            formatted_results = self.knowledge_base.format_results(results, include_kb_id=True)
+            results = self.knowledge_base.query_all(kb_analysis['kb_ids'], question,
+                                                    max_results_per_kb=config['knowledge_base']['results_per_kb'])
+            formatted_results = self.kb_context_builder.build(results)
+            if self.knowledge_base.cache is not None:
+                logger.debug(f"KB cache stats: {self.knowledge_base.cache.stats()}")
             logger.debug(f"Knowledge base results: {formatted_results}")
             return f"Relevant Knowledge Base Information:\n{formatted_results}"
         return ""
 
     def _invoke_bedrock(self, prompt, include_context=True, turn_type="Chat", is_stream=False, system_prompt=None, model_id=None):
-        context = self.context.context if include_context else None
-        body = BedrockModelsWrapper.define_body(prompt, context=context, system_prompt=system_prompt, model_id=model_id)
+        remote_call_log.record(turn_type)
+        context = self.context.history() if include_context else None
+        model = model_descriptor(model_id)
+        body = BedrockModelsWrapper.define_body(prompt, context=context, system_prompt=system_prompt, model=model)
         body_json = json.dumps(body)
 
         logger.debug(f"Invoking Bedrock with body: {body_json}")
@@ -151,48 +340,61 @@ Analyze the question and choose the most appropriate knowledge base IDs, or an e
         if is_stream:
             response = self.bedrock_runtime.invoke_model_with_response_stream(
                 body=body_json,
-                modelId=config['bedrock']['api_request']['modelId'],
-                accept=config['bedrock']['api_request']['accept'],
-                contentType=config['bedrock']['api_request']['contentType']
+                modelId=model.model_id,
+                accept=model.accept,
+                contentType=model.content_type
             )
             bedrock_stream = response.get('body')
             return bedrock_stream
         else:
             response = self.bedrock_runtime.invoke_model(
                 body=body_json,
-                modelId=config['bedrock']['api_request']['modelId'],
-                accept=config['bedrock']['api_request']['accept'],
-                contentType=config['bedrock']['api_request']['contentType']
+                modelId=model.model_id,
+                accept=model.accept,
+                contentType=model.content_type
             )
-            full_response = self._process_non_stream_response(response)
+            full_response = self._process_non_stream_response(response, model)
 
             logger.debug(f"Bedrock response: {full_response}")
-            
-            # Add turn to context if it's not an analysis
-            if turn_type == "Final Ask":
-                self.context.add_turn(turn_type, system_prompt, prompt, full_response)
-            
+            # Final answers are streamed; the caller adds them to the context with the question, not the prompt.
             return full_response
 
-    def _invoke_bedrock_with_queue(self, text, turn_type, system_prompt, is_stream=True):
+    def _invoke_bedrock_with_queue(self, text, turn_type, system_prompt, is_stream=True, cancel_token=None, model_id=None):
         response_queue = queue.Queue()
-        
+        model = model_descriptor(model_id)
+
+        def cancelled():
+            return cancel_token is not None and cancel_token.is_cancelled()
+
         def collect_full_response(stream):
-            full_response = ""
-            for event in stream:
-                chunk = BedrockModelsWrapper.get_stream_chunk(event)
-                if chunk:
-                    text = BedrockModelsWrapper.get_stream_text(chunk)
-                    full_response += text
-                    yield event
-            response_queue.put(full_response)
-
-        response_stream = self._invoke_bedrock(text, turn_type, system_prompt, is_stream)
+            # Yields the decoded text pieces for speech and keeps them for the transcript.
+            pieces = []
+            try:
+                for text in decode_stream(stream, model.codec):
+                    if cancelled():
+                        break
+                    pieces.append(text)
+                    yield text
+            except Exception:
+                # Cancelling closes the stream under the reader, which surfaces here as a read error.
+                if not cancelled():
+                    raise
+            finally:
+                response_queue.put(''.join(pieces))
+
+        if cancelled():
+            logger.debug("Turn cancelled before the final answer was requested")
+            return collect_full_response([]), response_queue
+
+        response_stream = self._invoke_bedrock(text, turn_type=turn_type, system_prompt=system_prompt, is_stream=is_stream, model_id=model_id)
+        if cancel_token is not None:
+            # Stops Bedrock from generating (and billing) the rest of the answer.
+            cancel_token.add_callback(response_stream.close)
         return collect_full_response(response_stream), response_queue
 
-    def _process_non_stream_response(self, response):
+    def _process_non_stream_response(self, response, model):
         response_body = json.loads(response.get('body').read())
-        return BedrockModelsWrapper.get_non_stream_text(response_body)
+        return BedrockModelsWrapper.get_non_stream_text(response_body, model)
 
     def _complete_question_for_kb(self, question):
         # Get the recent conversation history
@@ -209,7 +411,8 @@ New Question: {question}
 Complete Question:"""
 
         # Use Bedrock to generate the completed question
-        completed_question = self._invoke_bedrock(prompt, turn_type="Question Completion", system_prompt="You are an AI assistant that helps to provide context to questions based on conversation history.", is_stream=False)
+        # The history is in the prompt already, so it is not replayed as messages too.
+        completed_question = self._invoke_bedrock(prompt, include_context=False, turn_type="Question Completion", system_prompt="You are an AI assistant that helps to provide context to questions based on conversation history.", is_stream=False)
 
         logger.debug(f"Original question: {question}")
         logger.debug(f"Completed question: {completed_question}")
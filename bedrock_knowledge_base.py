@@ -1,16 +1,45 @@
-import boto3
+import contextvars
+import time
 from botocore.exceptions import ClientError
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from concurrent.futures import ThreadPoolExecutor, wait
 from logger import logger
+import aws_clients
+import remote_calls
+
+# Largest numberOfResults a single retrieve call accepts.
+MAX_RESULTS_PER_REQUEST = 100
+
 
 class BedrockKnowledgeBase:
-    def __init__(self):
-        self.client = boto3.client('bedrock-agent-runtime')
+    def __init__(self, cache=None, max_workers=4, deadline=None, local_indexes=None, embedder=None):
+        self.client = aws_clients.client('bedrock-agent-runtime')
+        self.cache = cache
+        # Fan-outs across KBs share these threads for the whole session.
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='kb')
+        self.deadline = deadline
+        # kb_id -> LocalVectorIndex for KBs mirrored locally; the others are queried remotely.
+        self.local_indexes = local_indexes or {}
+        self.embedder = embedder
 
     def query(self, kb_id, query_text, max_results=20):
+        local_index = self.local_indexes.get(kb_id)
+        if local_index is not None and local_index.available():
+            try:
+                return local_index.search(self.embedder.embed(query_text), max_results)
+            except Exception as e:
+                logger.error(f"Local KB search failed for {kb_id}, querying remotely: {e}")
+
+        if self.cache is not None:
+            cached = self.cache.get(kb_id, query_text, max_results)
+            if cached is not None:
+                logger.debug(f"KB cache hit for {kb_id}: {query_text}")
+                return cached
+
         all_results = []
         next_token = None
+        failed = False
 
+        # One request normally returns everything; nextToken is only followed if the service pages anyway.
         while len(all_results) < max_results:
             try:
                 kwargs = {
@@ -20,13 +49,14 @@ class BedrockKnowledgeBase:
                     },
                     'retrievalConfiguration': {
                         'vectorSearchConfiguration': {
-                            'numberOfResults': min(5, max_results - len(all_results))
+                            'numberOfResults': min(MAX_RESULTS_PER_REQUEST, max_results - len(all_results))
                         }
                     }
                 }
                 if next_token:
                     kwargs['nextToken'] = next_token
 
+                remote_calls.record("KB Retrieval")
                 response = self.client.retrieve(**kwargs)
 
                 # Process the results
@@ -44,23 +74,38 @@ class BedrockKnowledgeBase:
 
             except ClientError as e:
                 logger.error(f"Error querying knowledge base: {e}")
+                failed = True
                 break
 
+        # Partial results from a failed query would otherwise be served until they expire.
+        if self.cache is not None and not failed:
+            self.cache.put(kb_id, query_text, max_results, all_results)
         return all_results
 
-    def query_all(self, kb_ids, query_text, max_results_per_kb=10):
-        all_results = {}
+    def query_all(self, kb_ids, query_text, max_results_per_kb=10, deadline=None):
+        # Returns whatever the KBs answered within the deadline. Queries still running keep going in the
+        # background, so their results land in the cache for the next time the question comes up.
+        deadline = self.deadline if deadline is None else deadline
+        start = time.perf_counter()
+        futures = {
+            kb_id: self.executor.submit(contextvars.copy_context().run, self.query, kb_id, query_text, max_results_per_kb)
+            for kb_id in kb_ids
+        }
+        done, not_done = wait(futures.values(), timeout=deadline)
 
-        with ThreadPoolExecutor(max_workers=len(kb_ids)) as executor:
-            future_to_kb = {executor.submit(self.query, kb_id, query_text, max_results_per_kb): kb_id for kb_id in kb_ids}
-            
-            for future in as_completed(future_to_kb):
-                kb_id = future_to_kb[future]
-                try:
-                    results = future.result()
-                    all_results[kb_id] = results
-                except Exception as exc:
-                    print(f'{kb_id} generated an exception: {exc}')
+        all_results = {}
+        for kb_id, future in futures.items():
+            if future not in done:
+                continue
+            try:
+                all_results[kb_id] = future.result()
+            except Exception as exc:
+                logger.error(f'{kb_id} generated an exception: {exc}')
+        if not_done:
+            late = ', '.join(kb_id for kb_id, future in futures.items() if future in not_done)
+            logger.warning(f"KB deadline of {deadline * 1000:.0f}ms passed with {len(all_results)} of {len(kb_ids)} KBs "
+                           f"answered, answering without: {late}")
+        logger.debug(f"Queried {len(kb_ids)} KBs in {(time.perf_counter() - start) * 1000:.0f}ms")
 
         return all_results
 
@@ -1,17 +1,42 @@
-import json
-from logger import logger
-from config import config, change_model
+from functools import lru_cache
+from types import MappingProxyType
+from typing import NamedTuple
+from api_request_schema import api_request_list
+from config import config
+from stream_codecs import StreamCodec, codec_for
+
+
+class ModelDescriptor(NamedTuple):
+    # Everything needed to call one model and read its responses. Each request carries its own, so stages
+    # and sessions using different models never share mutable state.
+    model_id: str
+    provider: str
+    accept: str
+    content_type: str
+    body: MappingProxyType
+    codec: StreamCodec
+
+
+@lru_cache(maxsize=None)
+def model_descriptor(model_id=None):
+    # None is the model configured for the session.
+    api_request = api_request_list[model_id] if model_id else config['bedrock']['api_request']
+    return ModelDescriptor(
+        model_id=api_request['modelId'],
+        provider=api_request['modelId'].split('.')[0],
+        accept=api_request['accept'],
+        content_type=api_request['contentType'],
+        body=MappingProxyType(dict(api_request['body'])),
+        codec=codec_for(api_request['modelId'].split('.')[0]),
+    )
+
 
 class BedrockModelsWrapper:
     @staticmethod
-    def define_body(text, context=None, system_prompt=None, model_id=None):
-        if model_id is not None:
-            change_model(model_id)
-            logger.info(f"Use model {model_id}, {config['bedrock']['api_request']}")
-        model_id = model_id if model_id else config['bedrock']['api_request']['modelId']
-        current_model_id = model_id
-        model_provider = current_model_id.split('.')[0]
-        body = config['bedrock']['api_request']['body'].copy()
+    def define_body(text, context=None, system_prompt=None, model=None):
+        model = model or model_descriptor()
+        model_provider = model.provider
+        body = dict(model.body)
 
         if model_provider == 'amazon':
             body['inputText'] = text
@@ -57,46 +82,9 @@ class BedrockModelsWrapper:
         return event.get('chunk')
 
     @staticmethod
-    def get_stream_text(chunk):
-        model_id = config['bedrock']['api_request']['modelId']
-        model_provider = model_id.split('.')[0]
-
-        chunk_obj = ''
-        text = ''
-        if model_provider == 'amazon':
-            chunk_obj = json.loads(chunk.get('bytes').decode())
-            text = chunk_obj['outputText']
-        elif model_provider == 'meta':
-            chunk_obj = json.loads(chunk.get('bytes').decode())
-            text = chunk_obj['generation']
-        elif model_provider == 'anthropic':
-            chunk_obj = json.loads(chunk.get('bytes').decode())
-            if 'type' in chunk_obj and chunk_obj['type'] == 'content_block_delta':
-                text = chunk_obj.get('delta', {}).get('text', '')
-            elif 'type' in chunk_obj and chunk_obj['type'] == 'message_delta':
-                text = chunk_obj.get('delta', {}).get('content', [{}])[0].get('text', '')
-            else:
-                text = ''
-        elif model_provider == 'cohere':
-            chunk_obj = json.loads(chunk.get('bytes').decode())
-            text = ' '.join([c["text"] for c in chunk_obj['generations']])
-        else:
-            raise NotImplementedError('Unknown model provider.')
-
-        return text
+    def get_stream_text(chunk, model=None):
+        return (model or model_descriptor()).codec.chunk_text(chunk.get('bytes'))
 
     @staticmethod
-    def get_non_stream_text(response_body):
-        model_id = config['bedrock']['api_request']['modelId']
-        model_provider = model_id.split('.')[0]
-
-        if model_provider == 'amazon':
-            return response_body['results'][0]['outputText']
-        elif model_provider == 'meta':
-            return response_body['generation']
-        elif model_provider == 'anthropic':
-            return response_body['content'][0]['text']
-        elif model_provider == 'cohere':
-            return ' '.join([g['text'] for g in response_body['generations']])
-        else:
-            raise NotImplementedError('Unknown model provider.')
+    def get_non_stream_text(response_body, model=None):
+        return (model or model_descriptor()).codec.response_text(response_body)
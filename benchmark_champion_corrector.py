@@ -0,0 +1,80 @@
+import statistics
+import time
+from champion_corrector import ChampionNameCorrector
+
+# Transcripts as Amazon Transcribe tends to produce them, paired with the text we expect after correction.
+CORPUS = [
+    ("How do I play jinks in bot lane?", "How do I play Jinx in bot lane?"),
+    ("what items should I build on cat arena", "what items should I build on Katarina"),
+    ("is ez real good right now", "is Ezreal good right now"),
+    ("lee sin jungle path", "Lee Sin jungle path"),
+    ("how to counter yah sue", "how to counter Yasuo"),
+    ("tell me about mordi kaiser", "tell me about Mordekaiser"),
+    ("how good is kaisa this patch", "how good is Kai'Sa this patch"),
+    ("what about tresh support", "what about Thresh support"),
+    ("vain versus draven", "Vayne versus Draven"),
+    ("best runes for ash", "best runes for Ashe"),
+    ("how do I beat darias top", "how do I beat Darius top"),
+    ("is a cali hard to learn", "is Akali hard to learn"),
+    ("what does tree stana do", "what does Tristana do"),
+    ("how to play heimer dinger", "how to play Heimerdinger"),
+    ("what is the best build for mister fortune", "what is the best build for Miss Fortune"),
+    ("how strong is tomb kench", "how strong is Tahm Kench"),
+    ("can morgana counter blitz crank", "can Morgana counter Blitzcrank"),
+    ("should I play garan or darius", "should I play Garen or Darius"),
+    ("how do you play key and", "how do you play Kayn"),
+    ("what lane is seraph een", "what lane is Seraphine"),
+    ("how to combo with reven", "how to combo with Riven"),
+    ("is twisted faith good", "is Twisted Fate good"),
+    ("tips for playing nah me", "tips for playing Nami"),
+    ("what does vel coz ultimate do", "what does Vel'Koz ultimate do"),
+    ("how to play cho gath", "how to play Cho'Gath"),
+    ("is malphite good against yasuo", "is Malphite good against Yasuo"),
+    ("how do I lane against zed", "how do I lane against Zed"),
+    ("what are the best champions for beginners", "what are the best champions for beginners"),
+    ("thank you for your help", "thank you for your help"),
+    ("how do I improve my last hitting skills", "how do I improve my last hitting skills"),
+    ("can you tell me more about one of those champions", "can you tell me more about one of those champions"),
+    ("what items should I build for that champion", "what items should I build for that champion"),
+    ("I said it was a good game", "I said it was a good game"),
+    ("how is the weather today", "how is the weather today"),
+]
+
+
+def run(iterations=200, min_confidence=0.5):
+    corrector = ChampionNameCorrector()
+    correct, fallback, wrong = 0, 0, []
+    cold, warm = [], []
+
+    for transcript, expected in CORPUS:
+        start = time.perf_counter()
+        result = corrector.correct(transcript)
+        cold.append(time.perf_counter() - start)
+        if result.confidence < min_confidence:
+            fallback += 1
+        elif result.text == expected:
+            correct += 1
+        else:
+            wrong.append((transcript, result.text, expected))
+
+        for _ in range(iterations):
+            start = time.perf_counter()
+            corrector.correct(transcript)
+            warm.append(time.perf_counter() - start)
+
+    cold.sort()
+    warm.sort()
+    total = len(CORPUS)
+    print(f"Samples:            {total}")
+    print(f"Corrected locally:  {correct} ({correct / total:.0%})")
+    print(f"LLM fallback:       {fallback} ({fallback / total:.0%})")
+    print(f"Missed or wrong:    {len(wrong)}")
+    for transcript, got, expected in wrong:
+        print(f"  {transcript!r} -> {got!r} (expected {expected!r})")
+    for label, durations in (("cold", cold), ("warm", warm)):
+        print(f"Latency {label} mean:  {statistics.mean(durations) * 1e6:.0f} us")
+        print(f"Latency {label} p95:   {durations[int(len(durations) * 0.95)] * 1e6:.0f} us")
+
+
+if __name__ == "__main__":
+    run()
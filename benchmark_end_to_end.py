@@ -0,0 +1,403 @@
+import argparse
+import asyncio
+import io
+import json
+import logging
+import random
+import struct
+import threading
+import time
+
+from amazon_transcribe.model import Alternative, Result, Transcript, TranscriptEvent
+
+import app
+import aws_clients
+from audio_output import NullAudioOutput
+from config import config
+from logger import logger
+from metrics import metrics, TURN_MARKS
+
+# Runs whole conversations through MicStream, EventHandler and BedrockWrapper without network or audio
+# devices. Transcribe, Bedrock, the knowledge base and Polly are replaced by local fakes with configurable
+# latency, and audio is played into a NullAudioOutput in real time, so the numbers include endpointing,
+# scheduling and playback exactly as the app does them.
+#
+#   python benchmark_end_to_end.py                     # synthetic speech for the built-in utterances
+#   python benchmark_end_to_end.py --pcm mic.raw --script events.json
+#
+# A recorded session is 16 kHz mono int16 PCM plus a JSON list of transcript events, each
+# {"at": <seconds into the audio>, "id": <result id>, "text": <transcript>, "partial": <bool>}.
+
+SAMPLE_RATE = 16000
+BLOCK_FRAMES = 1024
+BLOCK_SECONDS = BLOCK_FRAMES / SAMPLE_RATE
+BYTES_PER_SECOND = SAMPLE_RATE * 2
+
+UTTERANCES = [
+    "what items should I build on Katarina",
+    "how do I lane against Zed",
+    "thank you for your help",
+    "is Ezreal good right now",
+    "what are the best runes for Ashe",
+]
+
+ANSWER = ("Katarina wants early damage, so rush Hextech Rocketbelt. After that, Shadowflame and Zhonya's "
+          "Hourglass keep you alive through resets. Finish with Rabadon's Deathcap if the game goes long.")
+
+
+def _provider(model_id):
+    return model_id.split('.')[0]
+
+
+def _encode_chunk(model_id, text):
+    provider = _provider(model_id)
+    if provider == 'anthropic':
+        return {'type': 'content_block_delta', 'index': 0, 'delta': {'type': 'text_delta', 'text': text}}
+    if provider == 'amazon':
+        return {'outputText': text}
+    if provider == 'meta':
+        return {'generation': text}
+    return {'generations': [{'text': text}]}
+
+
+def _encode_response(model_id, text):
+    provider = _provider(model_id)
+    if provider == 'anthropic':
+        return {'content': [{'type': 'text', 'text': text}]}
+    if provider == 'amazon':
+        return {'results': [{'outputText': text}]}
+    if provider == 'meta':
+        return {'generation': text}
+    return {'generations': [{'text': text}]}
+
+
+def _line_after(prompt, label):
+    for line in prompt.splitlines():
+        if line.startswith(label):
+            return line[len(label):].strip().strip('"')
+    return ''
+
+
+class FakeEventStream:
+    # Streams the answer token by token. close() may come from another thread, like the botocore one.
+    def __init__(self, model_id, tokens, first_token_s, token_s):
+        self.model_id = model_id
+        self.tokens = tokens
+        self.first_token_s = first_token_s
+        self.token_s = token_s
+        self.closed = threading.Event()
+
+    def __iter__(self):
+        if self.closed.wait(self.first_token_s):
+            return
+        for token in self.tokens:
+            yield {'chunk': {'bytes': json.dumps(_encode_chunk(self.model_id, token)).encode()}}
+            if self.closed.wait(self.token_s):
+                return
+
+    def close(self):
+        self.closed.set()
+
+
+class FakeBedrockRuntime:
+    def __init__(self, call_ms=300, first_token_ms=400, tokens_per_s=60, answer=ANSWER):
+        self.call_s = call_ms / 1000
+        self.first_token_s = first_token_ms / 1000
+        self.token_s = 1 / tokens_per_s
+        # Roughly how Claude tokenizes: words with their leading space.
+        self.tokens = [word if i == 0 else ' ' + word for i, word in enumerate(answer.split(' '))]
+        self.calls = 0
+
+    @staticmethod
+    def _prompt(body):
+        if 'messages' in body:
+            return body['messages'][-1]['content']
+        return body.get('prompt') or body.get('inputText', '')
+
+    def _respond(self, prompt):
+        # Just enough understanding of BedrockAgent's prompts to keep its parsers happy.
+        if 'Complete Question:' in prompt:
+            return _line_after(prompt, 'New Question:')
+        if '"completed_question"' in prompt:
+            text = _line_after(prompt, 'Input:')
+            return json.dumps({'corrected_text': text, 'is_about_lol': True, 'explanation': 'benchmark',
+                               'completed_question': text})
+        if '"is_about_lol"' in prompt:
+            return json.dumps({'is_about_lol': True, 'explanation': 'benchmark'})
+        if 'Input:' in prompt:
+            return _line_after(prompt, 'Input:')
+        return 'OK'
+
+    def invoke_model(self, body, modelId, accept, contentType):
+        self.calls += 1
+        time.sleep(self.call_s)
+        text = self._respond(self._prompt(json.loads(body)))
+        return {'body': io.BytesIO(json.dumps(_encode_response(modelId, text)).encode())}
+
+    def invoke_model_with_response_stream(self, body, modelId, accept, contentType):
+        self.calls += 1
+        return {'body': FakeEventStream(modelId, self.tokens, self.first_token_s, self.token_s)}
+
+
+class FakeAudioStream:
+    # Silence delivered `speedup` times faster than it plays, like Polly's streamed PCM.
+    def __init__(self, size, speedup):
+        self.remaining = size
+        self.seconds_per_byte = 1 / (BYTES_PER_SECOND * speedup)
+
+    def read(self, n):
+        n = min(n, self.remaining)
+        self.remaining -= n
+        time.sleep(n * self.seconds_per_byte)
+        return b'\x00' * n
+
+    def close(self):
+        self.remaining = 0
+
+
+class FakePolly:
+    def __init__(self, first_byte_ms=150, speedup=20, chars_per_second=15):
+        self.first_byte_s = first_byte_ms / 1000
+        self.speedup = speedup
+        self.chars_per_second = chars_per_second
+        self.calls = 0
+
+    def synthesize_speech(self, Text, **kwargs):
+        self.calls += 1
+        time.sleep(self.first_byte_s)
+        size = int(len(Text) / self.chars_per_second * BYTES_PER_SECOND) & ~1
+        return {'AudioStream': FakeAudioStream(size, self.speedup)}
+
+
+class FakeKnowledgeBaseClient:
+    def __init__(self, latency_ms=250):
+        self.latency_s = latency_ms / 1000
+        self.calls = 0
+
+    def retrieve(self, knowledgeBaseId, retrievalQuery, retrievalConfiguration, nextToken=None):
+        self.calls += 1
+        time.sleep(self.latency_s)
+        count = retrievalConfiguration['vectorSearchConfiguration']['numberOfResults']
+        return {'retrievalResults': [
+            {'content': {'text': f"Passage {i} about {retrievalQuery['text']}"}, 'score': 0.8 - i * 0.02,
+             'location': {'type': 'S3'}}
+            for i in range(count)
+        ]}
+
+
+class FakeTranscribeStream:
+    # Releases scripted transcript events once the audio they describe has been sent, plus the service latency.
+    def __init__(self, loop, latency_s):
+        self.loop = loop
+        self.latency_s = latency_s
+        self.input_stream = self
+        self.output_stream = self
+        self.audio_seconds = 0.0
+        self.scheduled = []
+        self.events = asyncio.Queue()
+
+    def schedule(self, at, result_id, text, is_partial):
+        self.scheduled.append((at, result_id, text, is_partial))
+        self.scheduled.sort(key=lambda event: event[0])
+
+    async def send_audio_event(self, audio_chunk):
+        self.audio_seconds += len(audio_chunk) / BYTES_PER_SECOND
+        while self.scheduled and self.scheduled[0][0] <= self.audio_seconds:
+            _, result_id, text, is_partial = self.scheduled.pop(0)
+            event = TranscriptEvent(transcript=Transcript(results=[Result(
+                result_id=result_id, is_partial=is_partial, alternatives=[Alternative(transcript=text, items=[])])]))
+            self.loop.call_later(self.latency_s, self.events.put_nowait, event)
+
+    async def end_stream(self):
+        self.loop.call_later(self.latency_s, self.events.put_nowait, None)
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        event = await self.events.get()
+        if event is None:
+            raise StopAsyncIteration
+        return event
+
+
+class FakeTranscribeClient:
+    def __init__(self, latency_ms=300):
+        self.latency_s = latency_ms / 1000
+        self.stream = None
+
+    async def start_stream_transcription(self, language_code, media_sample_rate_hz, media_encoding):
+        self.stream = FakeTranscribeStream(asyncio.get_running_loop(), self.latency_s)
+        return self.stream
+
+
+def _noise_block(amplitude, rng):
+    return struct.pack(f'<{BLOCK_FRAMES}h', *(int(rng.gauss(0, amplitude)) for _ in range(BLOCK_FRAMES)))
+
+
+class BenchmarkMicStream(app.MicStream):
+    # Feeds the app from PCM instead of the microphone, paced in real time like the sounddevice callback.
+
+    def __init__(self, transcribe_client, utterances=None, pcm=None, script=None, words_per_second=2.5):
+        super().__init__()
+        self.transcribe_client = transcribe_client
+        self.utterances = utterances
+        self.pcm = pcm
+        self.script = script or []
+        self.words_per_second = words_per_second
+        self.completed_turns = 0
+        self._completed = threading.Condition()
+
+        invoke = self.bedrock_wrapper.invoke_bedrock_agent
+
+        def counted(*args, **kwargs):
+            try:
+                return invoke(*args, **kwargs)
+            finally:
+                with self._completed:
+                    self.completed_turns += 1
+                    self._completed.notify_all()
+
+        self.bedrock_wrapper.invoke_bedrock_agent = counted
+
+    def _wait_for_turns(self, count, timeout=60):
+        with self._completed:
+            return self._completed.wait_for(lambda: self.completed_turns >= count, timeout)
+
+    def _idle(self):
+        return not self.bedrock_wrapper.is_speaking() and not self.endpointer.pending_text()
+
+    async def _recorded_blocks(self, stream):
+        for event in self.script:
+            stream.schedule(event['at'], event['id'], event['text'], event['partial'])
+        block_bytes = BLOCK_FRAMES * 2
+        for start in range(0, len(self.pcm) - block_bytes + 1, block_bytes):
+            yield self.pcm[start:start + block_bytes]
+
+        # Keep the microphone open on silence until the last turn has been answered.
+        quiet_since = None
+        while quiet_since is None or time.monotonic() - quiet_since < 1.0:
+            yield bytes(block_bytes)
+            if not self._idle():
+                quiet_since = None
+            elif quiet_since is None:
+                quiet_since = time.monotonic()
+
+    async def _synthetic_blocks(self, stream):
+        # Speaks each utterance with partial results growing word by word, then stays quiet until the
+        # assistant has answered, so the next turn never barges in.
+        rng = random.Random(0)
+        silence_blocks = int(0.5 / BLOCK_SECONDS)
+        for _ in range(silence_blocks):
+            yield _noise_block(50, rng)
+
+        for turn, utterance in enumerate(self.utterances):
+            words = utterance.split()
+            start = stream.audio_seconds
+            for i in range(1, len(words) + 1):
+                stream.schedule(start + i / self.words_per_second, f'result-{turn}', ' '.join(words[:i]), True)
+            speech_seconds = len(words) / self.words_per_second
+            stream.schedule(start + speech_seconds + 0.2, f'result-{turn}', utterance + '?', False)
+
+            for _ in range(int(speech_seconds / BLOCK_SECONDS)):
+                yield _noise_block(3000, rng)
+
+            loop = asyncio.get_running_loop()
+            done = loop.run_in_executor(None, self._wait_for_turns, turn + 1)
+            while not done.done():
+                yield _noise_block(50, rng)
+            for _ in range(silence_blocks):
+                yield _noise_block(50, rng)
+
+    async def mic_stream(self):
+        stream = self.transcribe_client.stream
+        source = self._recorded_blocks(stream) if self.pcm is not None else self._synthetic_blocks(stream)
+
+        next_block_at = time.perf_counter()
+        async for block in source:
+            next_block_at += BLOCK_SECONDS
+            await asyncio.sleep(max(next_block_at - time.perf_counter(), 0))
+            self._process_voice_activity(block)
+            yield block, None
+
+
+def install_fakes(args):
+    bedrock = FakeBedrockRuntime(args.bedrock_call_ms, args.first_token_ms, args.tokens_per_second)
+    polly = FakePolly(args.polly_first_byte_ms, args.polly_speedup)
+    transcribe = FakeTranscribeClient(args.transcribe_latency_ms)
+    knowledge_base = FakeKnowledgeBaseClient(args.kb_latency_ms)
+    # Fake passages must never reach the file the live app reloads, and each run starts cold.
+    config['kb_cache']['path'] = None
+
+    aws_clients.override('bedrock-runtime', bedrock)
+    aws_clients.override('polly', polly)
+    aws_clients.override('bedrock-agent-runtime', knowledge_base)
+    app.transcribe_streaming = transcribe
+    app.audio_output = NullAudioOutput()
+    if not args.tts_cache:
+        app.tts_cache = None
+    return bedrock, polly, transcribe, knowledge_base
+
+
+def report(wall_seconds, turns, bedrock, polly, knowledge_base, speculation=None):
+    snapshot = metrics.snapshot()
+    print(f"Turns:              {turns} in {wall_seconds:.1f}s ({turns / wall_seconds * 60:.1f} turns/min)")
+    print(f"Remote calls:       bedrock={bedrock.calls}, polly={polly.calls}, kb={knowledge_base.calls}")
+    if speculation is not None:
+        stats = speculation.stats
+        print(f"Speculation:        started={stats['started']}, hits={stats['hits']}, misses={stats['misses']}, "
+              f"discarded={stats['discarded']}, extra calls/turn={stats['wasted_calls'] / max(turns, 1):.1f}")
+    print("Turn latency from end of speech (p50 / p95 / p99):")
+    latencies = snapshot.get('turn_latency', {})
+    for mark in TURN_MARKS:
+        if mark in latencies:
+            values = latencies[mark]
+            print(f"  {mark:<20} {values['p50'] * 1000:7.0f} {values['p95'] * 1000:7.0f} {values['p99'] * 1000:7.0f} ms")
+    print("Agent stages (p50 / p95):")
+    for stage, values in snapshot.get('agent_stage', {}).items():
+        print(f"  {stage:<28} {values['p50'] * 1000:7.0f} {values['p95'] * 1000:7.0f} ms")
+
+
+async def run(args):
+    bedrock, polly, transcribe, knowledge_base = install_fakes(args)
+
+    pcm = script = None
+    if args.pcm:
+        with open(args.pcm, 'rb') as f:
+            pcm = f.read()
+        with open(args.script) as f:
+            script = json.load(f)
+
+    mic = BenchmarkMicStream(transcribe, utterances=UTTERANCES[:args.turns], pcm=pcm, script=script)
+
+    start = time.perf_counter()
+    await mic.transcribe()
+    report(time.perf_counter() - start, mic.completed_turns, bedrock, polly, knowledge_base,
+           mic.bedrock_wrapper.speculation)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline end-to-end latency benchmark")
+    parser.add_argument('--turns', type=int, default=len(UTTERANCES), help="built-in utterances to speak")
+    parser.add_argument('--pcm', help="recorded 16 kHz mono int16 PCM to play instead of synthetic speech")
+    parser.add_argument('--script', help="JSON transcript events for --pcm")
+    parser.add_argument('--transcribe-latency-ms', type=float, default=300)
+    parser.add_argument('--bedrock-call-ms', type=float, default=300, help="latency of non-streaming calls")
+    parser.add_argument('--first-token-ms', type=float, default=400)
+    parser.add_argument('--tokens-per-second', type=float, default=60)
+    parser.add_argument('--kb-latency-ms', type=float, default=250)
+    parser.add_argument('--polly-first-byte-ms', type=float, default=150)
+    parser.add_argument('--polly-speedup', type=float, default=20, help="synthesis speed relative to playback")
+    parser.add_argument('--tts-cache', action='store_true', help="keep the TTS cache enabled")
+    parser.add_argument('--verbose', action='store_true')
+    args = parser.parse_args()
+    if args.pcm and not args.script:
+        parser.error("--pcm needs --script")
+
+    if not args.verbose:
+        logger.setLevel(logging.WARNING)
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+import argparse
+import statistics
+import tempfile
+import time
+from local_vector_index import LocalVectorIndex, build_index, _numpy
+
+# Compares the local KB index against a reference in recall@k and latency.
+#
+#   python benchmark_local_index.py
+#       Synthetic clustered embeddings; IVF search is compared with exact search. Runs offline.
+#
+#   python benchmark_local_index.py --index cache/kb_index/<kb_id> --kb-id <kb_id> --queries questions.txt
+#       Real exported index; the reference is the remote bedrock-agent-runtime retrieve call, and the
+#       local path includes embedding the question with Bedrock.
+
+
+def percentile(durations, q):
+    ordered = sorted(durations)
+    return ordered[min(int(q * len(ordered)), len(ordered) - 1)]
+
+
+def print_latency(label, durations):
+    print(f"{label:<22} mean {statistics.mean(durations) * 1000:7.2f} ms   "
+          f"p95 {percentile(durations, 0.95) * 1000:7.2f} ms")
+
+
+def recall(found, expected):
+    expected = set(expected)
+    return len(expected & set(found)) / len(expected) if expected else 1.0
+
+
+def run_synthetic(passages, dim, lists, queries, k, nprobes):
+    numpy = _numpy()
+    rng = numpy.random.default_rng(0)
+    # Passages grouped around topics, the way champion, item and lore chunks cluster.
+    topics = rng.normal(size=(max(lists, 1) * 2, dim)).astype(numpy.float32)
+    labels = rng.integers(len(topics), size=passages)
+    embeddings = topics[labels] + rng.normal(scale=0.6, size=(passages, dim)).astype(numpy.float32)
+    texts = [{'content': f"passage {i}", 'source': 'Synthetic'} for i in range(passages)]
+    query_vectors = topics[rng.integers(len(topics), size=queries)] + rng.normal(scale=0.6, size=(queries, dim))
+
+    with tempfile.TemporaryDirectory() as root:
+        start = time.perf_counter()
+        build_index(texts, embeddings, root, lists=lists)
+        print(f"Built {passages} x {dim} index with {lists} lists in {time.perf_counter() - start:.1f}s")
+
+        index = LocalVectorIndex(root)
+        version = index.version
+        exact, exact_results = [], []
+        for query in query_vectors:
+            start = time.perf_counter()
+            exact_results.append([r['content'] for r in version.search(query, k)])
+            exact.append(time.perf_counter() - start)
+        print_latency("exact", exact)
+
+        for nprobe in nprobes:
+            durations, recalls = [], []
+            for query, expected in zip(query_vectors, exact_results):
+                start = time.perf_counter()
+                found = [r['content'] for r in version.search(query, k, nprobe)]
+                durations.append(time.perf_counter() - start)
+                recalls.append(recall(found, expected))
+            print_latency(f"ivf nprobe={nprobe}", durations)
+            print(f"{'':<22} recall@{k} {statistics.mean(recalls):.3f}")
+
+
+def run_remote(index_dir, kb_id, questions, k, embedding_model):
+    import aws_clients
+    from bedrock_knowledge_base import BedrockKnowledgeBase
+    from local_vector_index import BedrockEmbedder
+
+    remote = BedrockKnowledgeBase()
+    embedder = BedrockEmbedder(aws_clients.client('bedrock-runtime'), embedding_model, cache_size=0)
+    index = LocalVectorIndex(index_dir)
+
+    remote_durations, local_durations, search_durations, recalls = [], [], [], []
+    for question in questions:
+        start = time.perf_counter()
+        expected = [r['content'] for r in remote.query(kb_id, question, k)]
+        remote_durations.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        embedding = embedder.embed(question)
+        search_start = time.perf_counter()
+        found = [r['content'] for r in index.search(embedding, k)]
+        local_durations.append(time.perf_counter() - start)
+        search_durations.append(time.perf_counter() - search_start)
+        recalls.append(recall(found, expected))
+
+    print_latency("remote retrieve", remote_durations)
+    print_latency("local (with embed)", local_durations)
+    print_latency("local search only", search_durations)
+    print(f"recall@{k} vs remote: {statistics.mean(recalls):.3f} over {len(questions)} questions")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local KB index recall and latency benchmark")
+    parser.add_argument('--index', help="index directory of one KB; omit for the synthetic benchmark")
+    parser.add_argument('--kb-id', help="remote KB to compare --index against")
+    parser.add_argument('--queries', help="text file with one question per line (with --index)")
+    parser.add_argument('--embedding-model', default='amazon.titan-embed-text-v2:0')
+    parser.add_argument('--passages', type=int, default=50000)
+    parser.add_argument('--dim', type=int, default=1024)
+    parser.add_argument('--lists', type=int, default=128)
+    parser.add_argument('--num-queries', type=int, default=200)
+    parser.add_argument('--nprobe', type=int, nargs='+', default=[4, 8, 16])
+    parser.add_argument('-k', type=int, default=10)
+    args = parser.parse_args()
+
+    if args.index:
+        if not (args.kb_id and args.queries):
+            parser.error("--index needs --kb-id and --queries")
+        with open(args.queries) as f:
+            questions = [line.strip() for line in f if line.strip()]
+        run_remote(args.index, args.kb_id, questions, args.k, args.embedding_model)
+    else:
+        run_synthetic(args.passages, args.dim, args.lists, args.num_queries, args.k, args.nprobe)
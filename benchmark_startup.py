@@ -0,0 +1,113 @@
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+# Startup cost of the app, measured in fresh interpreters:
+#
+#   import time      `python -X importtime -c "import app"`: total, and the modules app pulls in that cost most
+#   time to listen   from launching the process until the microphone stream asks for its first block
+#
+#   python benchmark_startup.py                  # headless: fake Transcribe, no audio devices
+#   python benchmark_startup.py --microphone     # opens the real microphone through sounddevice
+#
+# Headless runs also report whether PortAudio was loaded, which must never happen for them.
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+LISTEN_SCRIPT = r'''
+import asyncio
+import sys
+import time
+import app
+from audio_output import NullAudioOutput
+from benchmark_end_to_end import FakeTranscribeClient
+
+MICROPHONE = {microphone}
+
+
+class FirstListen(app.MicStream):
+    # Stops after the first block, which is when a user could start talking.
+    async def mic_stream(self):
+        if MICROPHONE:
+            async for block in super().mic_stream():
+                break
+        print(f"listening {{time.monotonic()}}", flush=True)
+        yield bytes(2048), None
+
+
+if not MICROPHONE:
+    app.transcribe_streaming = FakeTranscribeClient(0)
+    app.audio_output = NullAudioOutput()
+asyncio.run(FirstListen().transcribe())
+print(f"portaudio {{'pyaudio' in sys.modules or 'sounddevice' in sys.modules}}", flush=True)
+'''
+
+
+def run_python(args, env=None):
+    return subprocess.run([sys.executable, *args], cwd=HERE, env=env, capture_output=True, text=True, check=True)
+
+
+def import_profile():
+    # Children of each top-level import are printed before it; they are collected until their parent shows up.
+    lines = run_python(['-X', 'importtime', '-c', 'import app']).stderr.splitlines()
+    children, total, app_children = [], None, []
+    for line in lines:
+        if not line.startswith('import time:') or '|' not in line:
+            continue
+        _, cumulative, name = line.split('|')
+        if not cumulative.strip().isdigit():
+            continue
+        indent = len(name) - len(name.lstrip())
+        cumulative = int(cumulative) / 1000
+        if indent == 1:
+            if name.strip() == 'app':
+                total, app_children = cumulative, children
+            children = []
+        elif indent == 3:
+            children.append((cumulative, name.strip()))
+    return total, sorted(app_children, reverse=True)
+
+
+def import_wall_time():
+    start = time.monotonic()
+    run_python(['-c', 'import app'])
+    return time.monotonic() - start
+
+
+def time_to_listen(microphone):
+    start = time.monotonic()
+    output = run_python(['-c', LISTEN_SCRIPT.format(microphone=microphone)]).stdout
+    listening_at = portaudio = None
+    for line in output.splitlines():
+        if line.startswith('listening '):
+            listening_at = float(line.split()[1])
+        elif line.startswith('portaudio '):
+            portaudio = line.split()[1] == 'True'
+    return listening_at - start, portaudio
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Startup time benchmark")
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--top', type=int, default=10, help="most expensive imports to list")
+    parser.add_argument('--microphone', action='store_true', help="measure with the real microphone")
+    args = parser.parse_args()
+
+    total, children = import_profile()
+    print(f"import app (importtime):  {total:7.1f} ms cumulative")
+    for cumulative, name in children[:args.top]:
+        print(f"  {name:<30} {cumulative:7.1f} ms")
+
+    walls = [import_wall_time() for _ in range(args.runs)]
+    print(f"python -c 'import app':   {statistics.median(walls) * 1000:7.1f} ms median of {args.runs}")
+
+    results = [time_to_listen(args.microphone) for _ in range(args.runs)]
+    listen = statistics.median(seconds for seconds, _ in results)
+    print(f"time to first listen:     {listen * 1000:7.1f} ms median of {args.runs} "
+          f"({'microphone' if args.microphone else 'headless'})")
+    if not args.microphone:
+        loaded = any(portaudio for _, portaudio in results)
+        print(f"PortAudio loaded:         {'yes' if loaded else 'no'}")
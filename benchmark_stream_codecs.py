@@ -0,0 +1,145 @@
+import argparse
+import json
+import statistics
+import time
+import stream_codecs
+from stream_codecs import codec_for, decode_stream
+
+# Decoding cost of a streamed answer per provider: the previous path (provider lookup and json.loads per
+# event, done once for speech and again for the transcript) against the codecs, with the standard library
+# parser and, when installed, orjson.
+#
+#   python benchmark_stream_codecs.py
+#   python benchmark_stream_codecs.py --recording anthropic=stream.jsonl
+#
+# A recording is one Bedrock response stream event payload (the JSON inside chunk.bytes) per line.
+
+ANSWER = ("Katarina wants early damage, so rush Hextech Rocketbelt. After that, Shadowflame and Zhonya's "
+          "Hourglass keep you alive through resets. Finish with Rabadon's Deathcap if the game goes long. ") * 4
+
+MODEL_IDS = {
+    'anthropic': 'anthropic.claude-3-5-sonnet-20240620-v1:0',
+    'amazon': 'amazon.titan-text-express-v1',
+    'meta': 'meta.llama2-70b-chat-v1',
+    'cohere': 'cohere.command-text-v14',
+}
+
+
+def _tokens(text):
+    words = text.split(' ')
+    return [word + ' ' for word in words[:-1]] + [words[-1]]
+
+
+# Event payloads in the shapes each provider streams them, including the events that carry no text.
+def recorded_payloads(provider, text=ANSWER):
+    tokens = _tokens(text)
+    if provider == 'anthropic':
+        payloads = [{'type': 'message_start', 'message': {'id': 'msg_1', 'type': 'message', 'role': 'assistant',
+                                                          'content': [], 'usage': {'input_tokens': 412}}},
+                    {'type': 'content_block_start', 'index': 0, 'content_block': {'type': 'text', 'text': ''}},
+                    {'type': 'ping'}]
+        payloads += [{'type': 'content_block_delta', 'index': 0, 'delta': {'type': 'text_delta', 'text': token}}
+                     for token in tokens]
+        payloads += [{'type': 'content_block_stop', 'index': 0},
+                     {'type': 'message_delta', 'delta': {'stop_reason': 'end_turn'}, 'usage': {'output_tokens': 96}},
+                     {'type': 'message_stop', 'amazon-bedrock-invocationMetrics': {'inputTokenCount': 412}}]
+    elif provider == 'amazon':
+        payloads = [{'outputText': token, 'index': 0, 'totalOutputTextTokenCount': None,
+                     'completionReason': None, 'inputTextTokenCount': 412} for token in tokens]
+    elif provider == 'meta':
+        payloads = [{'generation': token, 'prompt_token_count': None, 'generation_token_count': i,
+                     'stop_reason': None} for i, token in enumerate(tokens)]
+    else:
+        payloads = [{'generations': [{'text': token, 'index': 0}], 'is_finished': False} for token in tokens]
+    return [json.dumps(payload) for payload in payloads]
+
+
+def to_events(payloads):
+    return [{'chunk': {'bytes': payload.encode()}} for payload in payloads]
+
+
+# The decoder every event went through before codecs, kept here as the baseline.
+def legacy_text(chunk, model_id):
+    model_provider = model_id.split('.')[0]
+    chunk_obj = json.loads(chunk.get('bytes').decode())
+    if model_provider == 'amazon':
+        return chunk_obj['outputText']
+    elif model_provider == 'meta':
+        return chunk_obj['generation']
+    elif model_provider == 'anthropic':
+        if 'type' in chunk_obj and chunk_obj['type'] == 'content_block_delta':
+            return chunk_obj.get('delta', {}).get('text', '')
+        elif 'type' in chunk_obj and chunk_obj['type'] == 'message_delta':
+            return chunk_obj.get('delta', {}).get('content', [{}])[0].get('text', '')
+        return ''
+    return ' '.join([c["text"] for c in chunk_obj['generations']])
+
+
+def legacy_decode(events, model_id):
+    # Once for the transcript, once more for speech.
+    full_response = ''
+    for event in events:
+        chunk = event.get('chunk')
+        if chunk:
+            full_response += legacy_text(chunk, model_id)
+    spoken = [legacy_text(event['chunk'], model_id) for event in events if event.get('chunk')]
+    return full_response, spoken
+
+
+def codec_decode(events, codec):
+    pieces = list(decode_stream(events, codec))
+    return ''.join(pieces), pieces
+
+
+def time_per_stream(decode, repeats):
+    durations = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        decode()
+        durations.append(time.perf_counter() - start)
+    return statistics.median(durations)
+
+
+def stdlib_loads(payload):
+    return json.loads(payload.decode() if isinstance(payload, bytes) else payload)
+
+
+def run(recordings, repeats):
+    fast_loads = stream_codecs.loads
+    print(f"{'provider':<10} {'events':>6} {'legacy':>10} {'codec json':>11} {'codec orjson':>13}")
+    for provider, payloads in recordings.items():
+        events = to_events(payloads)
+        codec = codec_for(provider)
+        model_id = MODEL_IDS[provider]
+        expected = legacy_decode(events, model_id)[0]
+
+        legacy = time_per_stream(lambda: legacy_decode(events, model_id), repeats)
+        stream_codecs.loads = stdlib_loads
+        try:
+            assert codec_decode(events, codec)[0] == expected
+            with_json = time_per_stream(lambda: codec_decode(events, codec), repeats)
+        finally:
+            stream_codecs.loads = fast_loads
+
+        with_orjson = '-'
+        if stream_codecs.orjson is not None:
+            assert codec_decode(events, codec)[0] == expected
+            with_orjson = f"{time_per_stream(lambda: codec_decode(events, codec), repeats) * 1e6:9.0f}us"
+        print(f"{provider:<10} {len(events):>6} {legacy * 1e6:8.0f}us {with_json * 1e6:9.0f}us {with_orjson:>13}")
+    if stream_codecs.orjson is None:
+        print("orjson is not installed; pip install orjson to compare it")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Bedrock stream decoding benchmark")
+    parser.add_argument('--recording', action='append', default=[], metavar='PROVIDER=PATH',
+                        help="recorded event payloads for a provider (anthropic, amazon, meta, cohere)")
+    parser.add_argument('--repeats', type=int, default=2000)
+    args = parser.parse_args()
+
+    recordings = {provider: recorded_payloads(provider) for provider in MODEL_IDS}
+    for recording in args.recording:
+        provider, path = recording.split('=', 1)
+        with open(path) as f:
+            recordings[provider] = [line.strip() for line in f if line.strip()]
+    run(recordings, args.repeats)
@@ -0,0 +1,253 @@
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import logging
+import math
+import random
+import time
+from array import array
+
+import websockets
+from amazon_transcribe.model import Alternative, Result, Transcript, TranscriptEvent
+
+import app
+from benchmark_end_to_end import (BLOCK_SECONDS, BYTES_PER_SECOND, UTTERANCES, FakeTranscribeStream, _noise_block,
+                                  install_fakes)
+from config import config
+from logger import logger
+from metrics import metrics
+from voice_server import VoiceServer
+
+# Load test for voice_server.py: runs the server in this process against the offline fakes of
+# benchmark_end_to_end.py and connects growing numbers of simulated speakers to it. Each speaker streams
+# real-time PCM, waits for the spoken answer and plays it at real-time speed before asking the next question.
+#
+#   python benchmark_voice_server.py --sessions 1 8 16 32 --turns 3
+#
+# A session count is sustained when every turn was answered and the p95 time from end of speech to the first
+# answer audio stays within --max-p95-increase-ms of the single-session run.
+
+
+class SpeechTranscribeStream(FakeTranscribeStream):
+    # Transcribes by energy: every stretch of loud audio is heard as the next utterance of the script, with
+    # partial results growing word by word while it lasts and the final result after a short pause.
+
+    def __init__(self, loop, latency_s, utterances, words_per_second, threshold=1000, final_after_s=0.2):
+        super().__init__(loop, latency_s)
+        self.utterances = utterances
+        self.words_per_second = words_per_second
+        self.threshold = threshold
+        self.final_after_s = final_after_s
+        self.turn = 0
+        self.speech_seconds = 0.0
+        self.silence_seconds = 0.0
+        self.words_sent = 0
+
+    def _emit(self, text, is_partial):
+        event = TranscriptEvent(transcript=Transcript(results=[Result(
+            result_id=f'result-{self.turn}', is_partial=is_partial, alternatives=[Alternative(transcript=text, items=[])])]))
+        self.loop.call_later(self.latency_s, self.events.put_nowait, event)
+
+    async def send_audio_event(self, audio_chunk):
+        seconds = len(audio_chunk) / BYTES_PER_SECOND
+        self.audio_seconds += seconds
+        samples = array('h', audio_chunk)
+        rms = math.sqrt(sum(sample * sample for sample in samples) / len(samples)) if samples else 0.0
+        words = self.utterances[self.turn % len(self.utterances)].split()
+
+        if rms > self.threshold:
+            self.speech_seconds += seconds
+            self.silence_seconds = 0.0
+            heard = min(int(self.speech_seconds * self.words_per_second) + 1, len(words))
+            if heard > self.words_sent:
+                self.words_sent = heard
+                self._emit(' '.join(words[:heard]), True)
+        elif self.speech_seconds:
+            self.silence_seconds += seconds
+            if self.silence_seconds >= self.final_after_s:
+                self._emit(' '.join(words) + '?', False)
+                self.turn += 1
+                self.speech_seconds = 0.0
+                self.words_sent = 0
+
+
+class SpeechTranscribeClient:
+    def __init__(self, latency_ms, utterances, words_per_second):
+        self.latency_s = latency_ms / 1000
+        self.utterances = utterances
+        self.words_per_second = words_per_second
+
+    async def start_stream_transcription(self, language_code, media_sample_rate_hz, media_encoding):
+        return SpeechTranscribeStream(asyncio.get_running_loop(), self.latency_s, self.utterances,
+                                      self.words_per_second)
+
+
+class Speaker:
+    # One simulated client. Speech and silence are pre-generated blocks, paced in real time.
+
+    def __init__(self, url, turns, words_per_second, rng):
+        self.url = url
+        self.turns = turns
+        self.words_per_second = words_per_second
+        self.speech = [_noise_block(3000, rng) for _ in range(8)]
+        self.silence = [_noise_block(50, rng) for _ in range(8)]
+        self.latencies = []
+        self.answered = 0
+        self.playing_until = 0.0
+        self.last_audio_at = None
+        self.first_audio_at = None
+
+    async def _receive(self, websocket):
+        async for message in websocket:
+            if isinstance(message, str):
+                if json.loads(message).get('type') == 'flush':
+                    self.playing_until = time.monotonic()
+                continue
+            now = time.monotonic()
+            if self.first_audio_at is None:
+                self.first_audio_at = now
+            self.last_audio_at = now
+            self.playing_until = max(now, self.playing_until) + len(message) / BYTES_PER_SECOND
+
+    async def _send_blocks(self, websocket, blocks, count):
+        for i in range(count):
+            self.next_block_at += BLOCK_SECONDS
+            await asyncio.sleep(max(self.next_block_at - time.perf_counter(), 0))
+            await websocket.send(blocks[i % len(blocks)])
+
+    def _answer_played(self):
+        # Done once the answer has been heard to the end and nothing more arrived for a while.
+        now = time.monotonic()
+        return (self.first_audio_at is not None and now > self.playing_until + 0.3
+                and now - self.last_audio_at > 0.5)
+
+    async def run(self, timeout=60):
+        async with websockets.connect(self.url, max_size=None) as websocket:
+            receiver = asyncio.create_task(self._receive(websocket))
+            self.next_block_at = time.perf_counter()
+            await self._send_blocks(websocket, self.silence, int(0.5 / BLOCK_SECONDS))
+            for turn in range(self.turns):
+                words = UTTERANCES[turn % len(UTTERANCES)].split()
+                self.first_audio_at = None
+                await self._send_blocks(websocket, self.speech, int(len(words) / self.words_per_second / BLOCK_SECONDS))
+                speech_end = time.monotonic()
+
+                # The microphone stays open, sending silence while the answer plays.
+                deadline = speech_end + timeout
+                while not self._answer_played() and time.monotonic() < deadline:
+                    await self._send_blocks(websocket, self.silence, 1)
+                if self.first_audio_at is None:
+                    break
+                self.answered += 1
+                self.latencies.append(self.first_audio_at - speech_end)
+                await self._send_blocks(websocket, self.silence, int(0.5 / BLOCK_SECONDS))
+            receiver.cancel()
+
+
+async def measure_loop_lag(samples, interval=0.05):
+    # How late the event loop wakes up: the first sign of a saturated server.
+    while True:
+        start = time.perf_counter()
+        await asyncio.sleep(interval)
+        samples.append(time.perf_counter() - start - interval)
+
+
+def percentile(values, q):
+    ordered = sorted(values)
+    return ordered[min(int(q * len(ordered)), len(ordered) - 1)] if ordered else float('nan')
+
+
+async def run_round(url, sessions, turns, words_per_second):
+    rng = random.Random(sessions)
+    speakers = [Speaker(url, turns, words_per_second, rng) for _ in range(sessions)]
+
+    async def staggered(speaker, delay):
+        await asyncio.sleep(delay)
+        await speaker.run()
+
+    lag = []
+    lag_task = asyncio.create_task(measure_loop_lag(lag))
+    start = time.perf_counter()
+    results = await asyncio.gather(*(staggered(speaker, rng.uniform(0, 1.0)) for speaker in speakers),
+                                   return_exceptions=True)
+    wall = time.perf_counter() - start
+    lag_task.cancel()
+
+    errors = [result for result in results if isinstance(result, Exception)]
+    for error in errors[:3]:
+        print(f"  speaker failed: {error!r}")
+    latencies = [latency for speaker in speakers for latency in speaker.latencies]
+    return {
+        'sessions': sessions,
+        'answered': sum(speaker.answered for speaker in speakers),
+        'expected': sessions * turns,
+        'p50': percentile(latencies, 0.5),
+        'p95': percentile(latencies, 0.95),
+        'lag_p95': percentile(lag, 0.95),
+        'wall': wall,
+    }
+
+
+async def run(args):
+    bedrock, polly, _, knowledge_base = install_fakes(args)
+    app.transcribe_streaming = SpeechTranscribeClient(args.transcribe_latency_ms, UTTERANCES, args.words_per_second)
+
+    settings = dict(config['server'], host='127.0.0.1', port=args.port, max_sessions=max(args.sessions))
+    server = VoiceServer(settings)
+    serving = asyncio.create_task(server.serve())
+    await asyncio.sleep(0.2)
+
+    url = f"ws://127.0.0.1:{args.port}"
+    print(f"{'sessions':>8} {'answered':>10} {'first audio p50':>16} {'p95':>8} {'loop lag p95':>13} {'wall':>7}")
+    baseline = None
+    sustained = 0
+    for sessions in args.sessions:
+        # The app echoes every answer to the console; with many sessions that is only noise.
+        with contextlib.redirect_stdout(io.StringIO()):
+            result = await run_round(url, sessions, args.turns, args.words_per_second)
+        print(f"{result['sessions']:>8} {result['answered']:>5}/{result['expected']:<4} "
+              f"{result['p50'] * 1000:13.0f} ms {result['p95'] * 1000:5.0f} ms {result['lag_p95'] * 1000:10.1f} ms "
+              f"{result['wall']:6.1f}s")
+        if baseline is None:
+            baseline = result['p95']
+        if result['answered'] == result['expected'] and result['p95'] - baseline <= args.max_p95_increase_ms / 1000:
+            sustained = max(sustained, sessions)
+
+    serving.cancel()
+    print(f"Remote calls: bedrock={bedrock.calls}, polly={polly.calls}, kb={knowledge_base.calls}")
+    print(f"Sustained: {sustained} concurrent sessions "
+          f"(p95 within {args.max_p95_increase_ms:.0f} ms of {args.sessions[0]} session(s))")
+    latencies = metrics.snapshot().get('turn_latency', {})
+    if 'first_audio_out' in latencies:
+        values = latencies['first_audio_out']
+        print(f"Server-side first_audio_out over all rounds: p50 {values['p50'] * 1000:.0f} ms, "
+              f"p95 {values['p95'] * 1000:.0f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Voice server load test")
+    parser.add_argument('--sessions', type=int, nargs='+', default=[1, 4, 8, 16, 32])
+    parser.add_argument('--turns', type=int, default=3, help="questions each speaker asks")
+    parser.add_argument('--port', type=int, default=8766)
+    parser.add_argument('--words-per-second', type=float, default=2.5)
+    parser.add_argument('--max-p95-increase-ms', type=float, default=500)
+    parser.add_argument('--transcribe-latency-ms', type=float, default=300)
+    parser.add_argument('--bedrock-call-ms', type=float, default=300, help="latency of non-streaming calls")
+    parser.add_argument('--first-token-ms', type=float, default=400)
+    parser.add_argument('--tokens-per-second', type=float, default=60)
+    parser.add_argument('--kb-latency-ms', type=float, default=250)
+    parser.add_argument('--polly-first-byte-ms', type=float, default=150)
+    parser.add_argument('--polly-speedup', type=float, default=20, help="synthesis speed relative to playback")
+    parser.add_argument('--tts-cache', action='store_true', help="keep the TTS cache enabled")
+    parser.add_argument('--verbose', action='store_true')
+    args = parser.parse_args()
+
+    if not args.verbose:
+        logger.setLevel(logging.WARNING)
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,42 @@
+import threading
+from logger import logger
+
+
+class CancellationToken:
+    # Shared by everything working on one turn. cancel() runs the registered callbacks once, which is how
+    # blocking work (an open Bedrock stream, buffered audio) gets torn down from another thread.
+
+    def __init__(self):
+        self._cancelled = threading.Event()
+        self._callbacks = []
+        self._lock = threading.Lock()
+
+    def cancel(self):
+        with self._lock:
+            if self._cancelled.is_set():
+                return
+            self._cancelled.set()
+            callbacks, self._callbacks = self._callbacks, []
+
+        for callback in callbacks:
+            self._run(callback)
+
+    def is_cancelled(self):
+        return self._cancelled.is_set()
+
+    def add_callback(self, callback):
+        with self._lock:
+            if not self._cancelled.is_set():
+                self._callbacks.append(callback)
+                return
+        self._run(callback)
+
+    def wait(self, timeout=None):
+        return self._cancelled.wait(timeout)
+
+    @staticmethod
+    def _run(callback):
+        try:
+            callback()
+        except Exception as e:
+            logger.error(f"Cancellation callback {callback} failed: {e}")
@@ -0,0 +1,241 @@
+import re
+from lol_vocabulary import CHAMPION_NAMES, COMMON_WORDS
+
+WORD_PATTERN = re.compile(r"[A-Za-z][A-Za-z']*")
+MAX_SPAN_WORDS = 3
+
+
+def normalize_name(text):
+    return re.sub(r"[^a-z]", "", text.lower())
+
+
+def phonetic_key(word):
+    # A compact Metaphone-style key: fold letters that sound alike, keep the leading vowel and drop the others.
+    word = normalize_name(word)
+    if not word:
+        return ''
+
+    for pattern, replacement in (
+            ('ph', 'f'), ('gh', 'g'), ('ck', 'k'), ('sch', 'sk'), ('sh', 'x'), ('ch', 'x'), ('th', '0'),
+            ('wh', 'w'), ('kn', 'n'), ('gn', 'n'), ('wr', 'r'), ('qu', 'kw'), ('dg', 'j'),
+    ):
+        word = word.replace(pattern, replacement)
+
+    key = []
+    for i, char in enumerate(word):
+        nxt = word[i + 1] if i + 1 < len(word) else ''
+        if char == 'y' and nxt and nxt in 'aeiou':
+            code = 'y'
+        elif char in 'aeiouy':
+            code = 'A' if i == 0 else ''
+        elif char == 'c':
+            code = 's' if nxt in ('e', 'i', 'y') else 'k'
+        elif char == 'g':
+            code = 'j' if nxt in ('e', 'i', 'y') else 'k'
+        elif char in 'qk':
+            code = 'k'
+        elif char == 'x':
+            code = 'ks'
+        elif char in 'sz':
+            code = 's'
+        elif char in 'dt':
+            code = 't'
+        elif char in 'bp':
+            code = 'p'
+        elif char in 'fv':
+            code = 'f'
+        elif char == 'h':
+            code = ''
+        elif char == 'w':
+            code = 'w' if nxt in 'aeiou' and nxt else ''
+        else:
+            code = char
+        for c in code:
+            if not key or key[-1] != c:
+                key.append(c)
+    return ''.join(key)
+
+
+def similarity(a, b, distance):
+    return 1.0 - distance / max(len(a), len(b), 1)
+
+
+def bigrams(word):
+    padded = f"${word}$"
+    return {padded[i:i + 2] for i in range(len(padded) - 1)}
+
+
+class NameIndex:
+    # Bigram inverted index over normalized champion names. A name within edit distance d of a word shares at
+    # least max(len) + 1 - 2d padded bigrams with it, so only the few names passing that count filter get a full
+    # Levenshtein computation. In pure Python this prunes far earlier than walking a letter trie.
+
+    def __init__(self, names):
+        self.normalized = {name: normalize_name(name) for name in names}
+        self.postings = {}
+        for name, normalized in self.normalized.items():
+            for gram in bigrams(normalized):
+                self.postings.setdefault(gram, []).append(name)
+
+    def search(self, word, max_distance):
+        counts = {}
+        for gram in bigrams(word):
+            for name in self.postings.get(gram, ()):
+                counts[name] = counts.get(name, 0) + 1
+
+        results = []
+        for name, shared in counts.items():
+            normalized = self.normalized[name]
+            if abs(len(normalized) - len(word)) > max_distance:
+                continue
+            if shared < max(len(normalized), len(word)) + 1 - 2 * max_distance:
+                continue
+            distance = levenshtein(word, normalized)
+            if distance <= max_distance:
+                results.append((name, distance))
+        return results
+
+
+def levenshtein(a, b):
+    previous_row = list(range(len(b) + 1))
+    for i, char_a in enumerate(a, 1):
+        current_row = [i]
+        for j, char_b in enumerate(b, 1):
+            current_row.append(min(current_row[j - 1] + 1, previous_row[j] + 1, previous_row[j - 1] + (char_a != char_b)))
+        previous_row = current_row
+    return previous_row[-1]
+
+
+class CorrectionResult:
+    def __init__(self, text, confidence, corrections, uncertain):
+        self.text = text
+        self.confidence = confidence
+        self.corrections = corrections
+        self.uncertain = uncertain
+
+    def __repr__(self):
+        return f"CorrectionResult(text={self.text!r}, confidence={self.confidence:.2f}, corrections={self.corrections})"
+
+
+class ChampionNameCorrector:
+    # Spans scoring at or above accept_score are rewritten, spans at or below reject_score are clearly not a
+    # champion name. Anything in between is ambiguous and drags the overall confidence down to 1 - score.
+    # A rewrite is only as certain as its score is clear of reject_score, so one that barely passes
+    # accept_score reports a low confidence and the caller falls back to Bedrock.
+    # Spans of up to short_span_chars letters collide with names by chance ("near" is an edit from "Gnar"), so
+    # they must sound like the name and also be spelled within short_span_similarity of it.
+
+    def __init__(self, names=CHAMPION_NAMES, accept_score=0.8, reject_score=0.65, short_span_chars=5,
+                 short_span_similarity=0.6, cache_size=4096):
+        self.accept_score = accept_score
+        self.reject_score = reject_score
+        self.short_span_chars = short_span_chars
+        self.short_span_similarity = short_span_similarity
+        self.names = list(names)
+        self.exact_index = {normalize_name(name): name for name in self.names}
+        self.phonetic_index = {}
+        for name in self.names:
+            self.phonetic_index.setdefault(phonetic_key(name), []).append(name)
+        self.index = NameIndex(self.names)
+        self._normalized_names = self.index.normalized
+        # Spoken questions reuse the same few hundred words, so span lookups are memoized.
+        self.cache_size = cache_size
+        self._match_cache = {}
+
+    def correct(self, text):
+        tokens = [(m.start(), m.end(), m.group()) for m in WORD_PATTERN.finditer(text)]
+        words = [normalize_name(token[2]) for token in tokens]
+
+        candidates = []
+        confidence = 1.0
+        uncertain = []
+        for start in range(len(tokens)):
+            for length in range(1, MAX_SPAN_WORDS + 1):
+                end = start + length
+                if end > len(tokens):
+                    break
+                span_words = words[start:end]
+                if self._skip_span(span_words):
+                    continue
+
+                span = ''.join(span_words)
+                name, score = self._best_match(span)
+                if name is None:
+                    continue
+                if score >= self.accept_score:
+                    candidates.append((score, length, start, end, name))
+                elif score > self.reject_score:
+                    uncertain.append((start, end, name, score))
+
+        corrections = []
+        taken = set()
+        for score, length, start, end, name in sorted(candidates, key=lambda c: (c[0], c[1]), reverse=True):
+            if taken.intersection(range(start, end)):
+                continue
+            taken.update(range(start, end))
+            corrections.append((tokens[start][0], tokens[end - 1][1], name, score))
+
+        uncertain = [(start, end, name, score) for start, end, name, score in uncertain
+                     if not taken.intersection(range(start, end))]
+        for start, end, name, score in uncertain:
+            confidence = min(confidence, 1.0 - score)
+
+        corrected = text
+        for begin, finish, name, score in sorted(corrections, reverse=True):
+            confidence = min(confidence, (score - self.reject_score) / (1.0 - self.reject_score))
+            corrected = corrected[:begin] + name + corrected[finish:]
+
+        applied = [(text[begin:finish], name) for begin, finish, name, _ in sorted(corrections)]
+        ambiguous = [(text[tokens[start][0]:tokens[end - 1][1]], name) for start, end, name, _ in uncertain]
+        return CorrectionResult(corrected, confidence, applied, ambiguous)
+
+    def _skip_span(self, span_words):
+        if span_words[0] in COMMON_WORDS or span_words[-1] in COMMON_WORDS:
+            return span_words[0] not in self.exact_index if len(span_words) == 1 else True
+        return len(''.join(span_words)) < 2
+
+    def _best_match(self, span):
+        cached = self._match_cache.get(span)
+        if cached is not None:
+            return cached
+        if len(self._match_cache) >= self.cache_size:
+            self._match_cache.clear()
+        match = self._match(span)
+        self._match_cache[span] = match
+        return match
+
+    def _match(self, span):
+        exact = self.exact_index.get(span)
+        if exact is not None:
+            return exact, 1.0
+        if len(span) < 3:
+            return None, 0.0
+        if len(span) <= self.short_span_chars:
+            return self._match_short(span)
+
+        best_name, best_score = None, 0.0
+        max_distance = int(len(span) * (1.0 - self.reject_score))
+        for name, distance in self.index.search(span, max_distance):
+            score = similarity(span, self._normalized_names[name], distance)
+            if score > best_score:
+                best_name, best_score = name, score
+
+        # Names that sound the same get credit for the phonetic match on top of their spelling similarity.
+        key = phonetic_key(span)
+        for name in self.phonetic_index.get(key, []):
+            normalized = self._normalized_names[name]
+            score = (2.0 + similarity(span, normalized, levenshtein(span, normalized))) / 3.0
+            if score > best_score:
+                best_name, best_score = name, score
+
+        return best_name, best_score
+
+    def _match_short(self, span):
+        best_name, best_score = None, 0.0
+        for name in self.phonetic_index.get(phonetic_key(span), []):
+            normalized = self._normalized_names[name]
+            spelling = similarity(span, normalized, levenshtein(span, normalized))
+            score = (2.0 + spelling) / 3.0
+            if spelling >= self.short_span_similarity and score > best_score:
+                best_name, best_score = name, score
+        return best_name, best_score
@@ -19,6 +19,50 @@ config = {
         'VoiceId': 'Matthew',
         'OutputFormat': 'pcm',
     },
+    'segmenter': {
+        'min_chars': 40,  # Shorter sentences are merged with the next one into a single Polly request
+        'first_clause_chars': 50,  # The first segment may end at a comma once it is this long
+        'max_chars': 300,  # Longer segments are cut at their last sentence or clause boundary
+    },
+    'tts_pipeline': {
+        'lookahead': 2,  # Sentences synthesized ahead of the one currently playing
+    },
+    'tts_cache': {
+        'enabled': True,
+        'memory_entries': 256,
+        'disk_dir': 'cache/tts',  # Relative to the repository; None keeps the cache in memory only
+        'disk_max_mb': 200,
+        'max_text_length': 300,  # Longer texts are rarely repeated and are not cached
+    },
+    'vad': {
+        'min_energy': 600,  # RMS of 16-bit samples a frame needs to count as speech
+        'threshold_ratio': 3.0,  # ...and how far above the learned noise floor it must be
+        'min_speech_ms': 200,
+        'hangover_ms': 100,
+    },
+    'barge_in': {
+        # Speaking over the assistant interrupts it. There is no echo cancellation, so through speakers the
+        # assistant's own voice reaches the microphone and cuts it off; only enable this with a headset.
+        'enabled': False,
+    },
+    'endpointing': {
+        'use_vad': True,  # Measure silence on the mic instead of from transcript updates
+        'settings': {
+            'aggressiveness': 2,  # 0 (patient) to 3 (eager)
+            'silence_ms': None,  # Overrides the preset for the chosen aggressiveness when set
+            'stability_ms': None,
+        },
+    },
+    'speculation': {
+        'enabled': True,  # Prepare the turn once the user pauses, before the endpoint fires
+        'stable_ms': None,  # Silence before preparing; None derives it from the endpointing settings
+    },
+    'metrics': {
+        'window': 1000,  # Most recent turns the percentiles are computed over
+        'prometheus_port': None,  # Serve http://127.0.0.1:<port>/metrics when set
+        'json_path': 'logs/metrics.json',  # Periodic JSON dump, None to disable
+        'json_interval_s': 60,
+    },
     'translate': {
         'SourceLanguageCode': 'en',
         'TargetLanguageCode': 'en',
@@ -26,8 +70,71 @@ config = {
     'bedrock': {
         'response_streaming': True,
         'api_request': api_request
+    },
+    'champion_corrector': {
+        'enabled': True,
+        'min_confidence': 0.5,  # Below this the local correction is discarded and Bedrock fixes the typos
+    },
+    'intent_classifier': {
+        'enabled': True,
+        'min_confidence': 0.75,  # Below this the turn is classified by Bedrock instead
+    },
+    'knowledge_base': {
+        'results_per_kb': 10,
+        'max_parallel_queries': 4,  # Long-lived threads shared by every fan-out across KBs
+        'deadline_ms': 1500,  # Answer with the KBs that responded by then; stragglers still fill the cache
+        'backend': 'remote',  # 'local' searches the mirrored KBs below and queries the others remotely
+        'local_index': {
+            'dir': 'cache/kb_index',  # One sub-directory per KB id, published with local_vector_index.py
+            'nprobe': 8,  # IVF lists searched per query; indexes without lists are searched exactly
+            'reload_interval_s': 30,
+            'embedding_model': 'amazon.titan-embed-text-v2:0',  # Must match the exported embeddings
+        },
+    },
+    'kb_router': {
+        # KB ids covering each topic; point topics at separate KBs to query only the relevant one.
+        'kb_ids': {
+            'champions': ['FQYOEZO3D0'],
+            'items': ['FQYOEZO3D0'],
+            'lore': ['FQYOEZO3D0'],
+        },
+        'min_confidence': 0.6,  # Below this share of the evidence, every topic close to the best one is queried
+    },
+    'kb_context': {
+        'token_budget': 1200,  # Most KB tokens to put into the answer prompt
+        'relative_score_cutoff': 0.75,  # Drop chunks scoring below this fraction of the best chunk
+        'duplicate_similarity': 0.7,  # Estimated Jaccard similarity above which a chunk is a near-duplicate
+    },
+    'kb_cache': {
+        'enabled': True,
+        'max_entries': 512,
+        'ttl_s': 6 * 3600,  # Re-fetch after this long so KB updates on patch day are picked up
+        # Saved on exit and reloaded on start, e.g. 'cache/kb_retrieval.json' (relative to this directory).
+        # None keeps it in memory, so runs never see each other's retrievals.
+        'path': None,
+    },
+    'conversation': {
+        'max_turns': 5,  # Turns replayed verbatim; older ones are folded into the summary
+        'token_budget': 1500,  # Most history tokens to send with a call, summary included
+        'summary_token_budget': 300,  # The summary drops its oldest lines beyond this
+        'summary_turn_tokens': 60,  # Length of the summary line of one folded turn
+    },
+    'agent': {
+        'max_parallel_stages': 4,  # Worker threads used to run BedrockAgent stages concurrently
+        'preprocessing_mode': 'staged',  # One of: staged, fused (typo fix, analysis and question completion in one call)
+    },
+    'aws_clients': {
+        # Connections opened at startup so the first turn skips the handshakes; {} disables pre-warming.
+        'prewarm_connections': {'bedrock-runtime': 4, 'polly': 2, 'bedrock-agent-runtime': 1},
+        'keep_warm_interval_s': 45,  # Reopen pre-warmed connections the endpoints closed while idle; None to warm once
+        'connect_timeout_s': 3,
+        'read_timeout_s': 60,
+        'max_attempts': 3,
+    },
+    'server': {
+        'host': '127.0.0.1',
+        'port': 8765,
+        'max_sessions': 32,  # Further connections are refused until a session ends
+        'max_audio_lead_s': 1.0,  # Speech sent ahead of the client's playback; less is wasted on interruption
     }
 }
-
-def change_model(model_id):
-    config['bedrock']['api_request'] = api_request_list[model_id]
\ No newline at end of file
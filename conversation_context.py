@@ -1,35 +1,121 @@
 from collections import deque
 import json
+import re
+import threading
+from token_estimate import estimate_tokens
+
+_FIRST_SENTENCE = re.compile(r"(.+?[.!?])(?:\s|$)", re.S)
+
+
+def clip(text, max_tokens):
+    # Cuts `text` at a word boundary so it fits `max_tokens`.
+    text = ' '.join(text.split())
+    if estimate_tokens(text) <= max_tokens:
+        return text
+    length = max_tokens * 4
+    while length > 0:
+        clipped = text[:length].rsplit(' ', 1)[0] + '...'
+        if estimate_tokens(clipped) <= max_tokens:
+            return clipped
+        length = length * 9 // 10
+    return ''
+
 
 class ConversationContext:
-    def __init__(self, max_turns=5):
-        self.context = deque(maxlen=max_turns)
+    # The turns replayed to the model, kept within a token budget. Only what was said is stored: the user's
+    # question, never the prompt it was wrapped in (KB passages, instructions). Turns past max_turns, or
+    # beyond the budget, are folded into a running summary of one short line per turn, so the prompt stops
+    # growing with the length of the session. Folding is local and happens when a turn is added. The newest
+    # turn is never folded, since follow-ups ("tell me more") refer to it; it is clipped when it alone is
+    # over the budget.
+
+    SUMMARY_QUESTION = "What have we talked about so far?"
+
+    def __init__(self, max_turns=5, token_budget=1500, summary_token_budget=300, summary_turn_tokens=60):
+        self.max_turns = max_turns
+        self.token_budget = token_budget
+        self.summary_token_budget = summary_token_budget
+        self.summary_turn_tokens = summary_turn_tokens
+        self.turns = deque()
+        self.summary = deque()  # (line, tokens), oldest first
+        # Turns are added on the turn thread while preparation stages read the history on worker threads.
+        self.lock = threading.Lock()
 
     def add_turn(self, turn_type, system_prompt, user_input, assistant_message):
-        self.context.append({
+        turn = {
             "type": turn_type,
             "system": system_prompt,
             "user": user_input,
-            "assistant": assistant_message
-        })
-
-    def get_recent_history(self, num_turns=3):
-        # Get the specified number of recent turns, or all turns if less are available
-        recent_turns = list(self.context)[-num_turns:]
-        
-        # Format the turns into a string
+            "assistant": assistant_message,
+            "tokens": estimate_tokens(user_input) + estimate_tokens(assistant_message),
+        }
+        with self.lock:
+            self.turns.append(turn)
+            self._fold()
+
+    def _fold(self):
+        while len(self.turns) > 1 and (len(self.turns) > self.max_turns or self._turn_tokens() > self.token_budget):
+            turn = self.turns.popleft()
+            answer = _FIRST_SENTENCE.match(turn['assistant'].strip())
+            line = clip(f"User asked: {turn['user']} AI said: {answer.group(1) if answer else turn['assistant']}",
+                        self.summary_turn_tokens)
+            self.summary.append((line, estimate_tokens(line)))
+        while self.summary and sum(tokens for _, tokens in self.summary) > self.summary_token_budget:
+            self.summary.popleft()
+        if self.turns:
+            self.turns[-1] = self._clipped(self.turns[-1], self.token_budget)
+
+    @staticmethod
+    def _clipped(turn, budget):
+        # The question gets up to half the budget and the answer the rest.
+        if turn['tokens'] <= budget:
+            return turn
+        user = clip(turn['user'], budget // 2)
+        assistant = clip(turn['assistant'], budget - estimate_tokens(user))
+        return dict(turn, user=user, assistant=assistant, tokens=estimate_tokens(user) + estimate_tokens(assistant))
+
+    def _turn_tokens(self):
+        return sum(turn['tokens'] for turn in self.turns)
+
+    def history(self, token_budget=None, num_turns=None):
+        # The newest turns that fit the budget, oldest first, led by the summary as a turn of its own when
+        # there is one and it fits as well. The newest turn is always included, clipped to the budget.
+        budget = self.token_budget if token_budget is None else token_budget
+        with self.lock:
+            turns = list(self.turns)[-num_turns:] if num_turns else list(self.turns)
+            summary = '\n'.join(line for line, _ in self.summary)
+        if turns:
+            turns[-1] = self._clipped(turns[-1], budget)
+        selected = []
+        for turn in reversed(turns):
+            if turn['tokens'] > budget:
+                break
+            budget -= turn['tokens']
+            selected.append(turn)
+        selected.reverse()
+        summary_tokens = estimate_tokens(summary) + estimate_tokens(self.SUMMARY_QUESTION)
+        if summary and summary_tokens <= budget:
+            selected.insert(0, {"type": "Summary", "system": "", "user": self.SUMMARY_QUESTION,
+                                "assistant": summary, "tokens": summary_tokens})
+        return selected
+
+    def get_recent_history(self, num_turns=3, token_budget=None):
         formatted_history = ""
-        for turn in recent_turns:
+        for turn in self.history(token_budget, num_turns):
             formatted_history += f"Human: {turn['user']}\n"
             formatted_history += f"AI: {turn['assistant']}\n\n"
-        
+
         return formatted_history.strip()
 
     def to_json(self):
-        return json.dumps(list(self.context))
+        with self.lock:
+            return json.dumps({"turns": list(self.turns), "summary": [line for line, _ in self.summary]})
 
     @classmethod
-    def from_json(cls, json_str):
-        context = cls()
-        context.context = deque(json.loads(json_str), maxlen=context.context.maxlen)
+    def from_json(cls, json_str, **settings):
+        context = cls(**settings)
+        state = json.loads(json_str)
+        context.summary.extend((line, estimate_tokens(line)) for line in state["summary"])
+        for turn in state["turns"]:
+            context.add_turn(turn["type"], turn["system"], turn["user"], turn["assistant"])
         return context
@@ -0,0 +1,108 @@
+import time
+from logger import logger
+
+# Aggressiveness presets: how long the user must have been silent, and how long an unfinished (partial)
+# transcript must have stayed unchanged, before the turn is handed over.
+PRESETS = {
+    0: {'silence_ms': 1500, 'stability_ms': 1200},
+    1: {'silence_ms': 1000, 'stability_ms': 800},
+    2: {'silence_ms': 700, 'stability_ms': 600},
+    3: {'silence_ms': 450, 'stability_ms': 400},
+}
+
+
+def preset_timings(aggressiveness=2, silence_ms=None, stability_ms=None):
+    # (silence_ms, stability_ms) for the endpointing settings in config.py.
+    preset = PRESETS[aggressiveness]
+    return (silence_ms if silence_ms is not None else preset['silence_ms'],
+            stability_ms if stability_ms is not None else preset['stability_ms'])
+
+
+class Endpointer:
+    # Decides when the user has finished speaking. Silence is measured on the wall clock, from local voice
+    # activity on the mic when it is available and from the last transcript change otherwise. A turn ends
+    # once the user has been silent long enough and Transcribe has either finalized everything it heard or
+    # left its partial result unchanged for stability_ms; in the latter case the partial text is used and the
+    # final result that later arrives for it is dropped.
+
+    def __init__(self, aggressiveness=2, silence_ms=None, stability_ms=None):
+        silence_ms, stability_ms = preset_timings(aggressiveness, silence_ms, stability_ms)
+        self.silence = silence_ms / 1000
+        self.stability = stability_ms / 1000
+        self.last_voice_at = None
+        self.last_latency = None
+        self.last_speech_end = None
+        self.last_transcript_at = None
+        self.reset()
+
+    def reset(self):
+        self.final_text = []
+        self.partial_id = None
+        self.partial_text = ''
+        self.partial_changed_at = None
+        self.last_change_at = None
+        self.consumed_ids = set()
+
+    def on_audio(self, silence_ms, now=None):
+        # Fed from the audio thread with the length of the current unvoiced stretch reported by the VAD.
+        now = time.monotonic() if now is None else now
+        self.last_voice_at = now - silence_ms / 1000
+
+    def on_result(self, result_id, transcript, is_partial, now=None):
+        now = time.monotonic() if now is None else now
+        if result_id in self.consumed_ids:
+            if not is_partial:
+                self.consumed_ids.discard(result_id)
+            return
+
+        if is_partial:
+            if transcript != self.partial_text or result_id != self.partial_id:
+                self.partial_id = result_id
+                self.partial_text = transcript
+                self.partial_changed_at = now
+                self.last_change_at = now
+            return
+
+        if transcript:
+            self.final_text.append(transcript)
+        if result_id == self.partial_id:
+            self.partial_id = None
+            self.partial_text = ''
+            self.partial_changed_at = None
+        self.last_change_at = now
+
+    def pending_text(self):
+        # What the user has said so far in the current turn, including the unfinished partial.
+        return ' '.join(self.final_text + ([self.partial_text] if self.partial_text else []))
+
+    def silent_since(self):
+        # When the user last made a sound: from the VAD when it runs, else from the last transcript change.
+        return self.last_voice_at if self.last_voice_at is not None else self.last_change_at
+
+    def poll(self, now=None):
+        # Returns the user's utterance once the turn has ended, None otherwise.
+        now = time.monotonic() if now is None else now
+        if not self.final_text and not self.partial_text:
+            return None
+
+        speech_end = self.silent_since()
+        if speech_end is None or now - speech_end < self.silence:
+            return None
+
+        text = list(self.final_text)
+        trigger = 'final transcript'
+        if self.partial_text:
+            if now - self.partial_changed_at < self.stability:
+                return None
+            text.append(self.partial_text)
+            self.consumed_ids.add(self.partial_id)
+            trigger = 'stable partial'
+
+        self.last_latency = now - speech_end
+        self.last_speech_end = speech_end
+        self.last_transcript_at = self.last_change_at
+        logger.info(f"Endpoint after {self.last_latency * 1000:.0f}ms of silence ({trigger})")
+        consumed_ids = self.consumed_ids
+        self.reset()
+        self.consumed_ids = consumed_ids
+        return ' '.join(text)
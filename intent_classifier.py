@@ -0,0 +1,76 @@
+import math
+import re
+from lol_vocabulary import CHAMPION_NAMES, ITEM_NAMES, RUNE_NAMES, GAME_TERMS, CHAT_MARKERS
+
+MAX_PHRASE_WORDS = 4
+
+# Weights of the logistic scoring model. Every distinct vocabulary hit adds evidence for a League of
+# Legends turn, chat markers pull towards casual chat, and the bias keeps empty or vague input undecided.
+WEIGHTS = {
+    'champion': 3.0,
+    'item': 2.5,
+    'rune': 2.5,
+    'term': 1.2,
+    'chat': -1.5,
+}
+BIAS = -0.6
+MAX_HITS_PER_FEATURE = 3
+
+
+def normalize_phrase(text):
+    return ' '.join(re.findall(r"[a-z0-9]+", text.lower().replace("'", "")))
+
+
+class IntentResult:
+    def __init__(self, is_about_lol, confidence, explanation):
+        self.is_about_lol = is_about_lol
+        self.confidence = confidence
+        self.explanation = explanation
+
+    def to_dict(self):
+        return {"is_about_lol": self.is_about_lol, "explanation": self.explanation, "confidence": self.confidence}
+
+    def __repr__(self):
+        return f"IntentResult(is_about_lol={self.is_about_lol}, confidence={self.confidence:.2f}, explanation={self.explanation!r})"
+
+
+class IntentClassifier:
+
+    def __init__(self):
+        # A single phrase -> feature index built once, so classifying a turn is a handful of dict lookups.
+        self.index = {}
+        for feature, phrases in (
+                ('term', GAME_TERMS),
+                ('chat', CHAT_MARKERS),
+                ('rune', RUNE_NAMES),
+                ('item', ITEM_NAMES),
+                ('champion', CHAMPION_NAMES),
+        ):
+            for phrase in phrases:
+                self.index[normalize_phrase(phrase)] = feature
+
+    def classify(self, text):
+        words = normalize_phrase(text).split()
+        hits = {feature: set() for feature in WEIGHTS}
+
+        # Greedy longest match, so "baron nashor" counts once rather than as "baron" plus a stray word.
+        start = 0
+        while start < len(words):
+            length = min(MAX_PHRASE_WORDS, len(words) - start)
+            while length > 0:
+                phrase = ' '.join(words[start:start + length])
+                feature = self.index.get(phrase)
+                if feature is not None:
+                    hits[feature].add(phrase)
+                    break
+                length -= 1
+            start += max(length, 1)
+
+        logit = BIAS + sum(WEIGHTS[feature] * min(len(found), MAX_HITS_PER_FEATURE) for feature, found in hits.items())
+        probability = 1.0 / (1.0 + math.exp(-logit))
+        is_about_lol = probability >= 0.5
+        confidence = probability if is_about_lol else 1.0 - probability
+
+        matched = [f"{feature}: {', '.join(sorted(found))}" for feature, found in hits.items() if found]
+        explanation = f"Local classifier matched {'; '.join(matched)}" if matched else "Local classifier found no League of Legends vocabulary"
+        return IntentResult(is_about_lol, confidence, explanation)
@@ -0,0 +1,66 @@
+import json
+import os
+import re
+import threading
+import time
+from lru_cache import LRUCache
+from logger import logger
+
+
+def normalize_query(text):
+    # Transcribe varies case and punctuation between otherwise identical questions.
+    return ' '.join(re.sub(r"[^\w\s']", ' ', text.lower()).split())
+
+
+class RetrievalCache:
+    # Knowledge base results keyed by (kb_id, normalized query, result count). Entries expire after `ttl`
+    # seconds so KB updates on patch day are picked up. With a path, the cache is saved there on exit and
+    # reloaded on start, keeping the remaining lifetime of each entry.
+
+    def __init__(self, max_entries=512, ttl=6 * 3600, path=None):
+        self.entries = LRUCache(max_entries, ttl)
+        self.path = path
+        self.save_lock = threading.Lock()
+        if path and os.path.exists(path):
+            self.load()
+
+    @staticmethod
+    def key(kb_id, query_text, max_results):
+        return kb_id, normalize_query(query_text), max_results
+
+    def get(self, kb_id, query_text, max_results):
+        return self.entries.get(self.key(kb_id, query_text, max_results))
+
+    def put(self, kb_id, query_text, max_results, results):
+        self.entries.put(self.key(kb_id, query_text, max_results), results)
+
+    def stats(self):
+        return self.entries.stats()
+
+    def save(self):
+        # Monotonic timestamps mean nothing after a restart, so entries are stored with their age.
+        now = time.monotonic()
+        records = [[*key, results, now - stored_at] for key, results, stored_at in self.entries.items()]
+        with self.save_lock:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, 'w') as f:
+                json.dump({'saved_at': time.time(), 'entries': records}, f)
+            os.replace(tmp_path, self.path)
+        logger.debug(f"Saved {len(records)} KB cache entries to {self.path}")
+
+    def load(self):
+        try:
+            with open(self.path) as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.error(f"Could not load KB cache from {self.path}: {e}")
+            return
+
+        offline = max(time.time() - data['saved_at'], 0)
+        now = time.monotonic()
+        for kb_id, query, max_results, results, age in data['entries']:
+            self.entries.put((kb_id, query, max_results), results, stored_at=now - age - offline)
+        logger.debug(f"Loaded {len(data['entries'])} KB cache entries from {self.path}")
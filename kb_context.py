@@ -0,0 +1,78 @@
+import hashlib
+import heapq
+import re
+from logger import logger
+from token_estimate import estimate_tokens
+
+
+def shingles(text, size=3):
+    words = re.findall(r"\w+", text.lower())
+    if len(words) <= size:
+        return {' '.join(words)} if words else set()
+    return {' '.join(words[i:i + size]) for i in range(len(words) - size + 1)}
+
+
+def _hash(shingle):
+    return int.from_bytes(hashlib.blake2b(shingle.encode(), digest_size=8).digest(), 'big')
+
+
+class MinHash:
+    # Bottom-k MinHash: the k smallest shingle hashes. One hash function per shingle instead of k, and the
+    # Jaccard estimate between two chunks only needs their sketches.
+
+    def __init__(self, text, k=64):
+        self.k = k
+        self.hashes = set(heapq.nsmallest(k, {_hash(shingle) for shingle in shingles(text)}))
+
+    def similarity(self, other):
+        union = heapq.nsmallest(self.k, self.hashes | other.hashes)
+        if not union:
+            return 1.0
+        both = self.hashes & other.hashes
+        return sum(1 for value in union if value in both) / len(union)
+
+
+class KBContextBuilder:
+    # Turns raw KB results into the context block of the answer prompt. Chunks scoring far below the best
+    # one are dropped, near-duplicates (the same passage indexed from several sources, or overlapping
+    # chunks) are kept once, and the best remaining passages are packed into a token budget.
+
+    def __init__(self, token_budget=1200, relative_score_cutoff=0.75, duplicate_similarity=0.7):
+        self.token_budget = token_budget
+        self.relative_score_cutoff = relative_score_cutoff
+        self.duplicate_similarity = duplicate_similarity
+
+    def build(self, results):
+        # `results` is the {kb_id: [result, ...]} mapping returned by BedrockKnowledgeBase.query_all.
+        candidates = [(result['score'], kb_id, result['content'].strip())
+                      for kb_id, kb_results in results.items() for result in kb_results if result['content'].strip()]
+        if not candidates:
+            return ""
+        # What the unpruned passages would have cost, for logging the saving.
+        baseline_tokens = sum(estimate_tokens(content) for _, _, content in candidates)
+        candidates.sort(key=lambda candidate: candidate[0], reverse=True)
+
+        cutoff = candidates[0][0] * self.relative_score_cutoff
+        kept, sketches, used_tokens = [], [], 0
+        dropped = {'score': 0, 'duplicate': 0, 'budget': 0}
+        for score, kb_id, content in candidates:
+            if score < cutoff:
+                dropped['score'] += 1
+                continue
+            sketch = MinHash(content)
+            if any(sketch.similarity(previous) >= self.duplicate_similarity for previous in sketches):
+                dropped['duplicate'] += 1
+                continue
+            passage = f"[{kb_id}] {content}"
+            tokens = estimate_tokens(passage)
+            if used_tokens + tokens > self.token_budget:
+                # A shorter passage further down may still fit.
+                dropped['budget'] += 1
+                continue
+            kept.append(passage)
+            sketches.append(sketch)
+            used_tokens += tokens
+
+        logger.info(f"KB context: kept {len(kept)}/{len(candidates)} passages, {used_tokens} tokens "
+                    f"(saved {max(baseline_tokens - used_tokens, 0)} tokens), dropped {dropped}")
+        return "\n---\n".join(kept)
@@ -0,0 +1,78 @@
+from intent_classifier import normalize_phrase, MAX_PHRASE_WORDS
+from lol_vocabulary import (CHAMPION_NAMES, ITEM_NAMES, RUNE_NAMES, CHAMPION_TOPIC_TERMS, ITEM_TOPIC_TERMS,
+                            LORE_TOPIC_TERMS)
+
+# Evidence each vocabulary contributes to a knowledge base topic. Champion names show up in every kind
+# of question, so they lean towards the champions KB without settling the route on their own.
+ROUTE_WEIGHTS = {
+    'champions': ((CHAMPION_NAMES, 1.5), (CHAMPION_TOPIC_TERMS, 2.0)),
+    'items': ((ITEM_NAMES, 3.0), (RUNE_NAMES, 3.0), (ITEM_TOPIC_TERMS, 2.0)),
+    'lore': ((LORE_TOPIC_TERMS, 3.0),),
+}
+
+
+class RouteResult:
+    def __init__(self, topics, kb_ids, confidence, scores):
+        self.topics = topics
+        self.kb_ids = kb_ids
+        self.confidence = confidence
+        self.scores = scores
+
+    def __repr__(self):
+        return f"RouteResult(topics={self.topics}, kb_ids={self.kb_ids}, confidence={self.confidence:.2f}, scores={self.scores})"
+
+
+class KBRouter:
+    # Picks the knowledge base(s) for a question from precomputed term indexes. A clear winner is queried
+    # alone; when the evidence is split, every topic close to the best one is queried, and with no
+    # evidence at all every KB is.
+
+    def __init__(self, kb_ids, min_confidence=0.6, runner_up_ratio=0.5):
+        # kb_ids maps each topic to the KB ids that cover it; several topics may share a KB.
+        self.kb_ids = kb_ids
+        self.min_confidence = min_confidence
+        self.runner_up_ratio = runner_up_ratio
+        self.index = {}
+        for topic, sources in ROUTE_WEIGHTS.items():
+            for phrases, weight in sources:
+                for phrase in phrases:
+                    weights = self.index.setdefault(normalize_phrase(phrase), {})
+                    weights[topic] = max(weights.get(topic, 0.0), weight)
+
+    def route(self, text):
+        words = normalize_phrase(text).split()
+        scores = {topic: 0.0 for topic in ROUTE_WEIGHTS}
+        seen = set()
+
+        # Greedy longest match, as in IntentClassifier; each distinct phrase counts once.
+        start = 0
+        while start < len(words):
+            length = min(MAX_PHRASE_WORDS, len(words) - start)
+            while length > 0:
+                phrase = ' '.join(words[start:start + length])
+                weights = self.index.get(phrase)
+                if weights is not None:
+                    if phrase not in seen:
+                        seen.add(phrase)
+                        for topic, weight in weights.items():
+                            scores[topic] += weight
+                    break
+                length -= 1
+            start += max(length, 1)
+
+        total = sum(scores.values())
+        best = max(scores, key=scores.get)
+        confidence = scores[best] / total if total else 0.0
+        if confidence >= self.min_confidence:
+            topics = [best]
+        elif total:
+            topics = [topic for topic, score in scores.items() if score >= scores[best] * self.runner_up_ratio]
+        else:
+            topics = list(ROUTE_WEIGHTS)
+
+        kb_ids = []
+        for topic in topics:
+            for kb_id in self.kb_ids.get(topic, ()):
+                if kb_id not in kb_ids:
+                    kb_ids.append(kb_id)
+        return RouteResult(topics, kb_ids, confidence, scores)
@@ -0,0 +1,207 @@
+import argparse
+import json
+import os
+import threading
+import time
+from logger import logger
+from lru_cache import LRUCache
+import remote_calls
+
+# numpy is only needed when the local backend is enabled, so it is imported on first use.
+np = None
+
+# Layout of an index directory (one per knowledge base):
+#
+#   <root>/<kb_id>/CURRENT               name of the active version directory
+#   <root>/<kb_id>/<version>/passages.jsonl    {"content": ..., "source": ...} per line
+#   <root>/<kb_id>/<version>/embeddings.npy    float32 (passages x dim), rows L2-normalized
+#   <root>/<kb_id>/<version>/ivf_centroids.npy optional, float32 (lists x dim)
+#   <root>/<kb_id>/<version>/ivf_lists.npy     optional, int32 list of each passage
+#
+# A new export is written to a fresh version directory and CURRENT is replaced atomically; readers notice
+# and switch over without dropping queries.
+
+
+def _numpy():
+    global np
+    if np is None:
+        try:
+            import numpy
+        except ImportError as e:
+            raise RuntimeError("The local KB backend needs numpy: pip install numpy") from e
+        np = numpy
+    return np
+
+
+class IndexVersion:
+    # One immutable, memory-mapped version of a KB index.
+
+    def __init__(self, path):
+        numpy = _numpy()
+        self.path = path
+        with open(os.path.join(path, 'passages.jsonl')) as f:
+            self.passages = [json.loads(line) for line in f if line.strip()]
+        self.embeddings = numpy.load(os.path.join(path, 'embeddings.npy'), mmap_mode='r')
+        if len(self.passages) != self.embeddings.shape[0]:
+            raise ValueError(f"{path}: {len(self.passages)} passages but {self.embeddings.shape[0]} embeddings")
+
+        self.centroids = None
+        self.lists = None
+        centroids_path = os.path.join(path, 'ivf_centroids.npy')
+        if os.path.exists(centroids_path):
+            self.centroids = numpy.load(centroids_path)
+            assignments = numpy.load(os.path.join(path, 'ivf_lists.npy'))
+            self.lists = [numpy.flatnonzero(assignments == i) for i in range(len(self.centroids))]
+
+    def search(self, query, k, nprobe=None):
+        # Top-k cosine search. With IVF lists and an nprobe, only the passages of the nprobe closest lists
+        # are scored.
+        numpy = _numpy()
+        query = numpy.asarray(query, dtype=numpy.float32)
+        query = query / (numpy.linalg.norm(query) or 1.0)
+
+        if self.centroids is not None and nprobe:
+            probes = numpy.argsort(self.centroids @ query)[::-1][:nprobe]
+            # Sorted, so the memory map is read front to back.
+            candidates = numpy.sort(numpy.concatenate([self.lists[i] for i in probes]))
+            scores = self.embeddings[candidates] @ query
+        else:
+            candidates = None
+            scores = self.embeddings @ query
+
+        k = min(k, len(scores))
+        if k == 0:
+            return []
+        top = numpy.argpartition(-scores, k - 1)[:k]
+        top = top[numpy.argsort(-scores[top])]
+        ids = top if candidates is None else candidates[top]
+        return [{
+            'content': self.passages[i]['content'],
+            'score': float(scores[j]),
+            'source': self.passages[i].get('source', 'Local'),
+        } for i, j in zip(ids, top)]
+
+
+class LocalVectorIndex:
+    # Serves one KB from its index directory and swaps in new versions as they are published.
+
+    def __init__(self, root, nprobe=8, reload_interval=30):
+        self.root = root
+        self.nprobe = nprobe
+        self.reload_interval = reload_interval
+        self.version = None
+        self.version_name = None
+        self.checked_at = 0.0
+        self.reload_lock = threading.Lock()
+        self.reload_if_changed()
+
+    def _current_name(self):
+        try:
+            with open(os.path.join(self.root, 'CURRENT')) as f:
+                return f.read().strip()
+        except OSError:
+            return None
+
+    def reload_if_changed(self):
+        self.checked_at = time.monotonic()
+        name = self._current_name()
+        if name is None or name == self.version_name:
+            return
+        with self.reload_lock:
+            if name == self.version_name:
+                return
+            start = time.perf_counter()
+            try:
+                version = IndexVersion(os.path.join(self.root, name))
+            except (OSError, ValueError) as e:
+                logger.error(f"Could not load local KB index {self.root}/{name}: {e}")
+                return
+            # Searches in flight keep the version they started with.
+            self.version, self.version_name = version, name
+            logger.info(f"Loaded local KB index {self.root}/{name}: {len(version.passages)} passages "
+                        f"in {(time.perf_counter() - start) * 1000:.0f}ms")
+
+    def available(self):
+        return self.version is not None
+
+    def search(self, query_embedding, k):
+        if time.monotonic() - self.checked_at > self.reload_interval:
+            # Loading a new version happens off the query path; this query still uses the current one.
+            self.checked_at = time.monotonic()
+            threading.Thread(target=self.reload_if_changed, daemon=True).start()
+        return self.version.search(query_embedding, k, self.nprobe)
+
+
+class BedrockEmbedder:
+    # Embeds queries with the same model the KB was built with. Repeat questions reuse the vector.
+
+    def __init__(self, client, model_id='amazon.titan-embed-text-v2:0', cache_size=1024):
+        self.client = client
+        self.model_id = model_id
+        self.cache = LRUCache(cache_size)
+
+    def embed(self, text):
+        embedding = self.cache.get(text)
+        if embedding is None:
+            remote_calls.record("Embedding")
+            response = self.client.invoke_model(
+                body=json.dumps({'inputText': text, 'normalize': True}),
+                modelId=self.model_id,
+                accept='application/json',
+                contentType='application/json',
+            )
+            embedding = json.loads(response['body'].read())['embedding']
+            self.cache.put(text, embedding)
+        return embedding
+
+
+def _kmeans(vectors, lists, iterations=10, seed=0):
+    numpy = _numpy()
+    rng = numpy.random.default_rng(seed)
+    centroids = vectors[rng.choice(len(vectors), size=lists, replace=False)].copy()
+    for _ in range(iterations):
+        assignments = numpy.argmax(vectors @ centroids.T, axis=1)
+        for i in range(lists):
+            members = vectors[assignments == i]
+            if len(members):
+                centroid = members.mean(axis=0)
+                centroids[i] = centroid / (numpy.linalg.norm(centroid) or 1.0)
+    return centroids, numpy.argmax(vectors @ centroids.T, axis=1).astype(numpy.int32)
+
+
+def build_index(passages, embeddings, root, lists=0, version=None):
+    # Writes a new version of a KB index under `root` and makes it current.
+    numpy = _numpy()
+    embeddings = numpy.asarray(embeddings, dtype=numpy.float32)
+    embeddings = embeddings / numpy.maximum(numpy.linalg.norm(embeddings, axis=1, keepdims=True), 1e-12)
+    version = version or time.strftime('%Y%m%d-%H%M%S')
+    path = os.path.join(root, version)
+    os.makedirs(path, exist_ok=False)
+
+    with open(os.path.join(path, 'passages.jsonl'), 'w') as f:
+        for passage in passages:
+            f.write(json.dumps(passage) + '\n')
+    numpy.save(os.path.join(path, 'embeddings.npy'), embeddings)
+    if lists:
+        centroids, assignments = _kmeans(embeddings, lists)
+        numpy.save(os.path.join(path, 'ivf_centroids.npy'), centroids)
+        numpy.save(os.path.join(path, 'ivf_lists.npy'), assignments)
+
+    tmp_path = os.path.join(root, 'CURRENT.tmp')
+    with open(tmp_path, 'w') as f:
+        f.write(version)
+    os.replace(tmp_path, os.path.join(root, 'CURRENT'))
+    return path
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Publish a new version of a local KB index")
+    parser.add_argument('passages', help="JSONL export of the KB passages")
+    parser.add_argument('embeddings', help=".npy matrix with one embedding per passage")
+    parser.add_argument('root', help="index directory of the KB, e.g. cache/kb_index/<kb_id>")
+    parser.add_argument('--lists', type=int, default=0, help="IVF lists; 0 for exact search only")
+    args = parser.parse_args()
+
+    with open(args.passages) as f:
+        exported = [json.loads(line) for line in f if line.strip()]
+    print(build_index(exported, _numpy().load(args.embeddings), args.root, args.lists))
@@ -3,11 +3,17 @@ from logging.handlers import RotatingFileHandler
 import os
 import sys
 
-def setup_logger():
-    # Create logs directory if it doesn't exist
-    if not os.path.exists('logs'):
-        os.makedirs('logs')
+class LazyRotatingFileHandler(RotatingFileHandler):
+    # Creates the log directory and opens the file with the first record rather than at import.
+    def __init__(self, filename, **kwargs):
+        super().__init__(filename, delay=True, **kwargs)
+
+    def _open(self):
+        os.makedirs(os.path.dirname(self.baseFilename), exist_ok=True)
+        return super()._open()
 
+
+def setup_logger():
     # Create a logger
     logger = logging.getLogger('app_logger')
     logger.setLevel(logging.DEBUG)
@@ -16,7 +22,7 @@ def setup_logger():
     formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 
     # Create a rotating file handler
-    file_handler = RotatingFileHandler(
+    file_handler = LazyRotatingFileHandler(
         'logs/app.log',
         maxBytes=1024 * 1024,  # 1MB
         backupCount=5
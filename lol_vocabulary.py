@@ -0,0 +1,129 @@
+CHAMPION_NAMES = [
+    "Aatrox", "Ahri", "Akali", "Akshan", "Alistar", "Amumu", "Anivia", "Annie", "Aphelios", "Ashe", "Aurelion Sol",
+    "Aurora", "Azir", "Bard", "Bel'Veth", "Blitzcrank", "Brand", "Braum", "Briar", "Caitlyn", "Camille", "Cassiopeia",
+    "Cho'Gath", "Corki", "Darius", "Diana", "Dr. Mundo", "Draven", "Ekko", "Elise", "Evelynn", "Ezreal", "Fiddlesticks",
+    "Fiora", "Fizz", "Galio", "Gangplank", "Garen", "Gnar", "Gragas", "Graves", "Gwen", "Hecarim", "Heimerdinger", "Hwei",
+    "Illaoi", "Irelia", "Ivern", "Janna", "Jarvan IV", "Jax", "Jayce", "Jhin", "Jinx", "Kai'Sa", "Kalista", "Karma",
+    "Karthus", "Kassadin", "Katarina", "Kayle", "Kayn", "Kennen", "Kha'Zix", "Kindred", "Kled", "Kog'Maw", "K'Sante",
+    "LeBlanc", "Lee Sin", "Leona", "Lillia", "Lissandra", "Lucian", "Lulu", "Lux", "Malphite", "Malzahar", "Maokai",
+    "Master Yi", "Milio", "Miss Fortune", "Mordekaiser", "Morgana", "Naafiri", "Nami", "Nasus", "Nautilus", "Neeko",
+    "Nidalee", "Nilah", "Nocturne", "Nunu & Willump", "Olaf", "Orianna", "Ornn", "Pantheon", "Poppy", "Pyke", "Qiyana",
+    "Quinn", "Rakan", "Rammus", "Rek'Sai", "Rell", "Renata Glasc", "Renekton", "Rengar", "Riven", "Rumble", "Ryze",
+    "Samira", "Sejuani", "Senna", "Seraphine", "Sett", "Shaco", "Shen", "Shyvana", "Singed", "Sion", "Sivir", "Skarner",
+    "Smolder", "Sona", "Soraka", "Swain", "Sylas", "Syndra", "Tahm Kench", "Taliyah", "Talon", "Taric", "Teemo",
+    "Thresh", "Tristana", "Trundle", "Tryndamere", "Twisted Fate", "Twitch", "Udyr", "Urgot", "Varus", "Vayne",
+    "Veigar", "Vel'Koz", "Vex", "Vi", "Viego", "Viktor", "Vladimir", "Volibear", "Warwick", "Wukong", "Xayah", "Xerath",
+    "Xin Zhao", "Yasuo", "Yone", "Yorick", "Yuumi", "Zac", "Zed", "Zeri", "Ziggs", "Zilean", "Zoe", "Zyra",
+]
+
+# Frequent English words that must never be rewritten into a champion name, even when they sound like one
+# (e.g. "said" -> "Zed", "van" -> "Vayne").
+COMMON_WORDS = {
+    "a", "about", "after", "again", "against", "all", "also", "am", "an", "and", "any", "are", "as", "at", "back",
+    "bad", "be", "because", "been", "before", "best", "better", "big", "but", "by", "can", "come", "could", "day",
+    "did", "do", "does", "doing", "done", "down", "each", "early", "even", "every", "few", "first", "for", "from",
+    "game", "get", "give", "go", "going", "good", "got", "great", "had", "has", "have", "he", "her", "here", "him",
+    "his", "how", "i", "if", "in", "into", "is", "it", "its", "just", "know", "late", "let", "like", "look", "lot",
+    "make", "many", "me", "more", "most", "much", "my", "need", "new", "no", "not", "now", "of", "off", "on", "one",
+    "only", "or", "other", "our", "out", "over", "play", "playing", "please", "really", "right", "said", "same", "say",
+    "see", "she", "should", "so", "some", "still", "such", "take", "tell", "than", "thank", "thanks", "that", "the",
+    "their", "them", "then", "there", "these", "they", "thing", "think", "this", "those", "time", "to", "too", "two",
+    "up", "us", "use", "very", "want", "was", "way", "we", "well", "were", "what", "when", "where", "which", "while",
+    "who", "why", "will", "win", "with", "would", "yes", "you", "your", "okay", "ok", "hey", "hi", "hello", "mid",
+    "top", "bot", "jungle", "lane", "team", "build", "item", "items", "against", "counter", "versus", "vs",
+    # Gameplay talk: short, everyday words that are a letter or two away from a champion name.
+    "near", "river", "fight", "fighting", "fought", "gank", "ganking", "roam", "farm", "wave", "waves", "minion",
+    "minions", "tower", "turret", "ward", "wards", "vision", "bush", "base", "recall", "push", "pushing", "split",
+    "kill", "kills", "killed", "die", "died", "death", "dive", "engage", "poke", "range", "ranged", "melee",
+    "damage", "tank", "carry", "support", "adc", "ult", "ultimate", "flash", "ignite", "heal", "shield", "stun",
+    "dragon", "drake", "baron", "herald", "nexus", "inhib", "objective", "level", "gold", "lead", "behind", "ahead",
+    "side", "enemy", "enemies", "ally", "allies", "solo", "duo", "queue", "rank", "ranked", "match", "round",
+}
+
+ITEM_NAMES = [
+    "Infinity Edge", "Trinity Force", "Black Cleaver", "Blade of the Ruined King", "Bloodthirster", "Guardian Angel",
+    "Rabadon's Deathcap", "Zhonya's Hourglass", "Void Staff", "Luden's Companion", "Liandry's Torment", "Morellonomicon",
+    "Lich Bane", "Nashor's Tooth", "Rylai's Crystal Scepter", "Banshee's Veil", "Shadowflame", "Horizon Focus",
+    "Kraken Slayer", "Galeforce", "Phantom Dancer", "Rapid Firecannon", "Runaan's Hurricane", "Lord Dominik's Regards",
+    "Mortal Reminder", "Navori Flickerblade", "Statikk Shiv", "Essence Reaver", "Youmuu's Ghostblade", "Duskblade",
+    "Edge of Night", "Serylda's Grudge", "Eclipse", "Sundered Sky", "Sterak's Gage", "Death's Dance", "Maw of Malmortius",
+    "Titanic Hydra", "Ravenous Hydra", "Spear of Shojin", "Hullbreaker", "Thornmail", "Randuin's Omen",
+    "Frozen Heart", "Dead Man's Plate", "Sunfire Aegis", "Heartsteel", "Warmog's Armor", "Force of Nature",
+    "Spirit Visage", "Kaenic Rookern", "Jak'Sho", "Abyssal Mask", "Gargoyle Stoneplate", "Redemption", "Locket",
+    "Mikael's Blessing", "Moonstone Renewer", "Shurelya's Battlesong", "Staff of Flowing Water", "Ardent Censer",
+    "Imperial Mandate", "Knight's Vow", "Zeke's Convergence", "Mercurial Scimitar", "Quicksilver Sash", "Wit's End",
+    "Berserker's Greaves", "Sorcerer's Shoes", "Plated Steelcaps", "Mercury's Treads", "Ionian Boots of Lucidity",
+    "Boots of Swiftness", "Mobility Boots", "Doran's Blade", "Doran's Ring", "Doran's Shield", "Long Sword",
+    "Control Ward", "Health Potion", "Refillable Potion", "Corrupting Potion", "Tear of the Goddess", "Manamune",
+    "Seraph's Embrace", "Archangel's Staff", "Muramana", "Fimbulwinter", "Hextech Rocketbelt", "Stormsurge",
+    "Riftmaker", "Cosmic Drive", "Everfrost", "Iceborn Gauntlet", "Divine Sunderer", "Goredrinker", "Stridebreaker",
+    "Mejai's Soulstealer", "Dark Seal", "Cull", "Tiamat", "Hydra", "Zhonya", "Deathcap", "Cleaver", "Botrk",
+]
+
+RUNE_NAMES = [
+    "Precision", "Domination", "Sorcery", "Resolve", "Inspiration", "Press the Attack", "Lethal Tempo", "Fleet Footwork",
+    "Conqueror", "Electrocute", "Dark Harvest", "Hail of Blades", "Predator", "Summon Aery", "Arcane Comet",
+    "Phase Rush", "Grasp of the Undying", "Aftershock", "Guardian", "Glacial Augment", "Unsealed Spellbook",
+    "First Strike", "Triumph", "Presence of Mind", "Legend: Alacrity", "Legend: Haste", "Legend: Bloodline",
+    "Coup de Grace", "Cut Down", "Last Stand", "Cheap Shot", "Taste of Blood", "Sudden Impact", "Eyeball Collection",
+    "Treasure Hunter", "Ultimate Hunter", "Relentless Hunter", "Manaflow Band", "Nimbus Cloak", "Transcendence",
+    "Celerity", "Absolute Focus", "Scorch", "Waterwalking", "Gathering Storm", "Demolish", "Font of Life",
+    "Shield Bash", "Conditioning", "Second Wind", "Bone Plating", "Overgrowth", "Revitalize", "Unflinching",
+    "Hextech Flashtraption", "Magical Footwear", "Cash Back", "Biscuit Delivery", "Cosmic Insight", "Time Warp Tonic",
+    "Approach Velocity", "Jack of All Trades",
+]
+
+GAME_TERMS = [
+    "league of legends", "league", "lol", "summoner", "summoner's rift", "rift", "aram", "ranked", "solo queue",
+    "flex queue", "normals", "elo", "mmr", "lp", "iron", "bronze", "silver", "gold", "platinum", "emerald", "diamond",
+    "master", "grandmaster", "challenger", "champion", "champions", "champ", "champs", "jungle", "jungler", "top lane",
+    "mid lane", "bot lane", "support", "adc", "carry", "marksman", "assassin", "tank", "bruiser", "mage", "enchanter",
+    "laning", "lane", "gank", "ganking", "roam", "roaming", "split push", "teamfight", "team fight", "engage",
+    "peel", "kite", "kiting", "poke", "all in", "trade", "trading", "last hit", "last hitting", "cs", "creep score",
+    "minion", "minions", "wave", "wave management", "freeze", "slow push", "fast push", "recall", "back", "ward",
+    "warding", "vision", "vision score", "dragon", "drake", "elder dragon", "baron", "baron nashor", "herald",
+    "rift herald", "void grubs", "grubs", "atakhan", "turret", "tower", "inhibitor", "nexus", "buff", "blue buff",
+    "red buff", "scuttle", "scuttle crab", "camp", "clear", "full clear", "objective", "objectives", "flash",
+    "ignite", "teleport", "smite", "exhaust", "heal", "barrier", "cleanse", "ghost", "summoner spell",
+    "summoner spells", "rune", "runes", "keystone", "item", "items", "build", "builds", "mythic", "legendary",
+    "boots", "ability", "abilities", "passive", "ultimate", "ult", "combo", "cooldown", "mana", "ability haste",
+    "attack speed", "attack damage", "ability power", "ap", "ad", "armor", "magic resist", "mr", "lethality",
+    "armor penetration", "magic penetration", "crit", "critical strike", "life steal", "omnivamp", "tenacity",
+    "crowd control", "cc", "stun", "snare", "knock up", "skin", "skins", "patch", "nerf", "buff", "meta", "tier list",
+    "counter", "counters", "matchup", "matchups", "pentakill", "penta", "first blood", "ace", "baron steal",
+    "riot", "arcane", "runeterra", "piltover", "zaun", "demacia", "noxus", "ionia", "freljord", "shurima",
+    "bilgewater", "targon", "ixtal", "shadow isles", "void", "lore", "worlds", "lck", "lec", "lcs", "lpl", "faker",
+]
+
+# Phrases that mark a turn as small talk rather than a game question.
+CHAT_MARKERS = [
+    "hello", "hi", "hey", "good morning", "good evening", "good night", "how are you", "how's it going",
+    "what's up", "thank you", "thanks", "bye", "goodbye", "see you", "nice to meet you", "who are you",
+    "your name", "weather", "joke", "tell me a joke", "what time", "today", "movie", "music", "song", "food",
+    "dinner", "lunch", "breakfast", "sleep", "tired", "bored", "love you", "feel", "feeling", "i'm fine",
+]
+
+# Topic words used to route a question to the champions, items or lore knowledge base.
+CHAMPION_TOPIC_TERMS = [
+    "ability", "abilities", "passive", "ultimate", "ult", "combo", "combos", "cooldown", "cooldowns", "skill order",
+    "max order", "counter", "counters", "countered", "matchup", "matchups", "how to play", "play against",
+    "lane against", "beat", "strong against", "weak against", "stats", "base stats", "range", "scaling",
+    "early game", "late game", "power spike", "q", "w", "e", "r", "tier", "tier list", "pick", "ban", "main",
+]
+
+ITEM_TOPIC_TERMS = [
+    "item", "items", "build", "builds", "build path", "core build", "first item", "second item", "mythic",
+    "legendary", "boots", "starter", "starting items", "buy", "rush", "gold", "cost", "rune", "runes", "keystone",
+    "rune page", "shard", "shards", "stat shards", "summoner spell", "summoner spells", "flash", "ignite",
+    "teleport", "smite", "exhaust", "heal", "barrier", "cleanse", "ghost", "armor", "magic resist", "lethality",
+    "armor penetration", "magic penetration", "crit", "critical strike", "life steal", "omnivamp", "ability haste",
+]
+
+LORE_TOPIC_TERMS = [
+    "lore", "story", "stories", "backstory", "back story", "history", "origin", "origins", "legend", "legends",
+    "myth", "myths", "universe", "runeterra", "region", "regions", "piltover", "zaun", "demacia", "noxus", "ionia",
+    "freljord", "shurima", "bilgewater", "targon", "ixtal", "shadow isles", "bandle city", "the void", "arcane",
+    "sister", "brother", "father", "mother", "family", "relationship", "rival", "rivals", "enemy of", "friend",
+    "friends", "who is", "where is", "where does", "come from", "why did", "what happened", "ruined king", "darkin",
+    "ascended", "aspect", "aspects", "watchers", "black mist", "harrowing", "rune wars",
+]
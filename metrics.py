@@ -0,0 +1,165 @@
+import json
+import os
+import threading
+import time
+from collections import deque
+from config import config
+from logger import logger
+
+QUANTILES = (0.5, 0.95, 0.99)
+
+# Events of a turn, in the order they normally happen. Each is measured from the end of the user's speech.
+TURN_MARKS = ('final_transcript', 'endpoint', 'prepared', 'first_bedrock_token', 'first_polly_byte',
+              'first_audio_out', 'drained')
+
+
+# Rolling latency distribution over the most recent `window` samples.
+class LatencyHistogram:
+    def __init__(self, window=1000):
+        self.samples = deque(maxlen=window)
+        self.count = 0
+        self.sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, seconds):
+        with self._lock:
+            self.samples.append(seconds)
+            self.count += 1
+            self.sum += seconds
+
+    def percentiles(self, quantiles=QUANTILES):
+        with self._lock:
+            ordered = sorted(self.samples)
+        if not ordered:
+            return {q: None for q in quantiles}
+        # Nearest-rank percentiles: always an observed value, never an interpolated one.
+        return {q: ordered[min(int(q * len(ordered)), len(ordered) - 1)] for q in quantiles}
+
+
+class Metrics:
+    def __init__(self, window=1000):
+        self.window = window
+        self.histograms = {}
+        self._lock = threading.Lock()
+
+    def observe(self, family, label, seconds):
+        key = (family, label)
+        with self._lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = LatencyHistogram(self.window)
+        histogram.observe(seconds)
+
+    def snapshot(self):
+        with self._lock:
+            histograms = sorted(self.histograms.items())
+        result = {}
+        for (family, label), histogram in histograms:
+            percentiles = histogram.percentiles()
+            result.setdefault(family, {})[label] = {
+                'count': histogram.count,
+                'sum': round(histogram.sum, 6),
+                **{f'p{int(q * 100)}': percentiles[q] for q in QUANTILES},
+            }
+        return result
+
+    def to_prometheus(self):
+        # Text exposition format, one summary per family with the stage as a label.
+        lines = []
+        for family, labels in self.snapshot().items():
+            name = f'voice_{family}_seconds'
+            lines.append(f'# TYPE {name} summary')
+            for label, values in labels.items():
+                for q in QUANTILES:
+                    value = values[f'p{int(q * 100)}']
+                    if value is not None:
+                        lines.append(f'{name}{{stage="{label}",quantile="{q}"}} {value:.6f}')
+                lines.append(f'{name}_sum{{stage="{label}"}} {values["sum"]:.6f}')
+                lines.append(f'{name}_count{{stage="{label}"}} {values["count"]}')
+        return '\n'.join(lines) + '\n'
+
+    def start_exporters(self, settings):
+        if settings.get('prometheus_port'):
+            self._serve_prometheus(settings['prometheus_port'])
+        if settings.get('json_path'):
+            self._dump_json_periodically(settings['json_path'], settings['json_interval_s'])
+
+    def _serve_prometheus(self, port):
+        # http.server is slow to import and only needed when the exporter is enabled.
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+        metrics = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path != '/metrics':
+                    self.send_error(404)
+                    return
+                body = metrics.to_prometheus().encode()
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/plain; version=0.0.4')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        server = ThreadingHTTPServer(('127.0.0.1', port), Handler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        logger.info(f"Serving metrics on http://127.0.0.1:{port}/metrics")
+
+    def _dump_json_periodically(self, path, interval):
+        def dump():
+            while True:
+                time.sleep(interval)
+                try:
+                    self.dump_json(path)
+                except OSError as e:
+                    logger.error(f"Could not write metrics to {path}: {e}")
+
+        threading.Thread(target=dump, daemon=True).start()
+
+    def dump_json(self, path):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f'{path}.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(self.snapshot(), f, indent=2)
+        os.replace(tmp_path, path)
+
+
+# Timestamps of one turn. Only the first occurrence of each mark counts, so the hot paths can call
+# mark() unconditionally for every chunk.
+class TurnTrace:
+    def __init__(self, speech_end=None, metrics=None):
+        self.start = time.monotonic() if speech_end is None else speech_end
+        self.metrics = metrics
+        self.marks = {}
+        self.stages = {}
+        self._lock = threading.Lock()
+
+    def mark(self, name, at=None):
+        if name in self.marks:
+            return
+        at = time.monotonic() if at is None else at
+        with self._lock:
+            self.marks.setdefault(name, at)
+
+    def add_stages(self, timings):
+        self.stages.update(timings)
+
+    def finish(self):
+        elapsed = {name: max(at - self.start, 0.0) for name, at in self.marks.items()}
+        if self.metrics is not None:
+            for name, seconds in elapsed.items():
+                self.metrics.observe('turn_latency', name, seconds)
+            for name, seconds in self.stages.items():
+                self.metrics.observe('agent_stage', name, seconds)
+
+        ordered = sorted(elapsed, key=lambda name: TURN_MARKS.index(name) if name in TURN_MARKS else len(TURN_MARKS))
+        logger.info("Turn latency: " + ', '.join(f"{name}={elapsed[name] * 1000:.0f}ms" for name in ordered))
+        return elapsed
+
+
+metrics = Metrics(config['metrics']['window'])
@@ -0,0 +1,57 @@
+import json
+
+# Fields the fused preprocessing call must return, with their expected types.
+SCHEMA = {
+    'corrected_text': str,
+    'is_about_lol': bool,
+    'explanation': str,
+    'completed_question': str,
+}
+
+
+class PreprocessResult:
+    def __init__(self, corrected_text, is_about_lol, explanation, completed_question):
+        self.corrected_text = corrected_text
+        self.is_about_lol = is_about_lol
+        self.explanation = explanation
+        self.completed_question = completed_question
+
+    def __repr__(self):
+        return (f"PreprocessResult(corrected_text={self.corrected_text!r}, is_about_lol={self.is_about_lol}, "
+                f"completed_question={self.completed_question!r})")
+
+    @classmethod
+    def from_json(cls, json_str):
+        # Models sometimes wrap the object in prose or a code fence, so only the outermost braces are parsed.
+        start, end = json_str.find('{'), json_str.rfind('}')
+        if start == -1 or end < start:
+            raise ValueError(f"No JSON object in preprocessing response: {json_str!r}")
+        data = json.loads(json_str[start:end + 1])
+
+        if not isinstance(data, dict):
+            raise ValueError(f"Preprocessing response is not a JSON object: {data!r}")
+        for field, expected_type in SCHEMA.items():
+            if field not in data:
+                raise ValueError(f"Preprocessing response is missing '{field}'")
+            if not isinstance(data[field], expected_type):
+                raise ValueError(f"Preprocessing field '{field}' should be {expected_type.__name__}, got {data[field]!r}")
+        if not data['corrected_text'].strip():
+            raise ValueError("Preprocessing response has an empty 'corrected_text'")
+
+        completed_question = data['completed_question'].strip() or data['corrected_text'].strip()
+        return cls(data['corrected_text'].strip(), data['is_about_lol'], data['explanation'], completed_question)
+
+
+class PreparedTurn:
+    # Outcome of BedrockAgent.prepare: everything the final answer needs.
+    def __init__(self, text, corrected_text, is_about_lol, kb_content, timings):
+        self.text = text
+        self.corrected_text = corrected_text
+        self.is_about_lol = is_about_lol
+        self.kb_content = kb_content
+        self.timings = timings
+        self.remote_calls = []
+
+    def __repr__(self):
+        return (f"PreparedTurn(corrected_text={self.corrected_text!r}, is_about_lol={self.is_about_lol}, "
+                f"remote_calls={self.remote_calls})")
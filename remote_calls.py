@@ -0,0 +1,12 @@
+import contextvars
+
+# Remote calls made on behalf of the turn being prepared, so discarded speculative work can be accounted for.
+# StageScheduler and the KB fan-out run their work in a copy of the caller's context, so calls made on
+# their threads are recorded too.
+current = contextvars.ContextVar('remote_calls', default=None)
+
+
+def record(name):
+    remote_calls = current.get()
+    if remote_calls is not None:
+        remote_calls.append(name)
@@ -0,0 +1,123 @@
+# Words that end with a period without ending the sentence. Single letters (initials, "e.g.", "i.e.")
+# are handled separately.
+ABBREVIATIONS = {
+    'dr', 'mr', 'mrs', 'ms', 'st', 'vs', 'jr', 'sr', 'prof', 'approx', 'lv', 'lvl', 'min', 'sec', 'max',
+}
+SENTENCE_END = '.?!;'
+CLAUSE_END = ',:'
+CLOSING = '"\')]'
+
+
+class SentenceSegmenter:
+    # Incremental splitter for streamed model output. Text is fed as it arrives and whole segments come
+    # back as soon as their end is certain. Every character is scanned once and held in a list of pieces
+    # that is only joined when a segment is cut, so buffering stays amortized O(1) per character.
+    #
+    # The first segment goes out at the first sentence end, or at a clause boundary once it is
+    # first_clause_chars long, to get audio playing early. Later segments shorter than min_chars are
+    # merged with the next one to save per-request overhead, and a segment growing past max_chars is cut
+    # at its last sentence or clause boundary, or at its last space when it has neither.
+
+    def __init__(self, min_chars=40, first_clause_chars=50, max_chars=300):
+        self.min_chars = min_chars
+        self.first_clause_chars = first_clause_chars
+        self.max_chars = max_chars
+        self._reset()
+
+    def _reset(self):
+        self.pieces = []
+        self.length = 0
+        self.base = 0
+        self.word = []
+        self.pending_end = None
+        self.pending_is_dot = False
+        self.dot_word = ''
+        self.pending_clause = None
+        self.sentence_end = None
+        self.clause_end = None
+        self.space_end = None
+        self.emitted_any = False
+
+    def feed(self, text):
+        segments = []
+        self.base = self.length
+        self.pieces.append(text)
+        self.length += len(text)
+        for i, char in enumerate(text):
+            self._scan(char, self.base + i, segments)
+        return segments
+
+    def flush(self):
+        segment = ''.join(self.pieces).strip()
+        self._reset()
+        return segment
+
+    def _scan(self, char, position, segments):
+        if self.pending_end is not None:
+            if char in SENTENCE_END or char in CLOSING:
+                # "?!", "..." and closing quotes belong to the sentence they end.
+                self.pending_is_dot = self.pending_is_dot and char not in '?!;'
+                self.pending_end = position + 1
+            elif char.isspace():
+                if not self.pending_is_dot or not self._is_abbreviation(self.dot_word):
+                    self._on_sentence_end(self.pending_end, segments)
+                self.pending_end = None
+            else:
+                # A period glued to the next character is a decimal point or part of "U.S" / "e.g".
+                if not self.pending_is_dot:
+                    self._on_sentence_end(self.pending_end, segments)
+                self.pending_end = None
+        elif char in SENTENCE_END:
+            self.pending_end = position + 1
+            self.pending_is_dot = char == '.'
+            self.dot_word = ''.join(self.word)
+
+        if self.pending_clause is not None:
+            # "2,500 gold" has no clause boundary, "Yes, but" does.
+            if char.isspace():
+                self._on_clause_end(self.pending_clause, segments)
+            self.pending_clause = None
+        elif char in CLAUSE_END:
+            self.pending_clause = position + 1
+
+        if char.isalnum() or char == "'":
+            self.word.append(char)
+        elif self.word:
+            self.word = []
+        if char.isspace():
+            self.space_end = position + 1
+
+        if position + 1 > self.max_chars:
+            self._cut(self.sentence_end or self.clause_end or self.space_end or position + 1, segments)
+
+    @staticmethod
+    def _is_abbreviation(word):
+        word = word.lower()
+        return word in ABBREVIATIONS or (len(word) == 1 and word.isalpha())
+
+    def _on_sentence_end(self, end, segments):
+        self.sentence_end = end
+        if end >= (self.min_chars if self.emitted_any else 1):
+            self._cut(end, segments)
+
+    def _on_clause_end(self, end, segments):
+        self.clause_end = end
+        if not self.emitted_any and end >= self.first_clause_chars:
+            self._cut(end, segments)
+
+    def _cut(self, end, segments):
+        text = ''.join(self.pieces)
+        segment, rest = text[:end].strip(), text[end:]
+        self.pieces = [rest] if rest else []
+        self.length = len(rest)
+        self.base -= end
+        if self.pending_end is not None:
+            self.pending_end -= end
+        if self.pending_clause is not None:
+            self.pending_clause -= end
+        self.sentence_end = None
+        self.clause_end = None
+        self.space_end = None
+        self.emitted_any = True
+        if segment:
+            segments.append(segment)
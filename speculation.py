@@ -0,0 +1,98 @@
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from endpointing import preset_timings
+from logger import logger
+
+
+def normalize_utterance(text):
+    # Transcribe often re-punctuates or re-cases a partial when it becomes final; neither changes the turn.
+    return ' '.join(re.sub(r"[^\w\s']", ' ', text.lower()).split())
+
+
+def default_stable_ms(endpointing_settings):
+    # Half of the silence that ends a turn: late enough that a pause between words rarely triggers it, early
+    # enough to give the preparation a head start on the endpoint.
+    return preset_timings(**endpointing_settings)[0] / 2
+
+
+# Prepares a turn (typo fix, classification, KB retrieval) while the user is still finishing it.
+# Once the user has been silent for stable_ms (measured like the endpointer does, from the VAD or from the
+# last transcript change), BedrockAgent.prepare runs on the pending transcript in the background. When the endpoint fires with the same utterance the prepared turn is reused, otherwise it
+# is thrown away and the remote calls it made are counted as wasted. While a speculation is running, a
+# transcript that merely continues it waits for it to finish instead of replacing it, so a user who keeps
+# talking costs one speculation at a time rather than one per pause.
+class SpeculativePreparer:
+    def __init__(self, agent, stable_ms=350):
+        self.agent = agent
+        self.stable = stable_ms / 1000
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='speculation')
+        self.stats = {'started': 0, 'hits': 0, 'misses': 0, 'discarded': 0, 'wasted_calls': 0}
+        # Re-entrant: a future that is already done runs its waste callback while the lock is held.
+        self._lock = threading.RLock()
+        self._key = None
+        self._future = None
+
+    def poll(self, text, silent_since, now=None):
+        # Called with the endpointer's pending text and the time the user went silent.
+        now = time.monotonic() if now is None else now
+        key = normalize_utterance(text)
+        if not key or silent_since is None or now - silent_since < self.stable:
+            return
+
+        with self._lock:
+            if key == self._key:
+                return
+            if (self._future is not None and not self._future.done()
+                    and key.startswith(self._key + ' ')):
+                return
+            self._drop()
+            self._key = key
+            self._future = self.executor.submit(self.agent.prepare, text)
+            self.stats['started'] += 1
+        logger.debug(f"Speculatively preparing: {text}")
+
+    def take(self, text):
+        # Returns the future of a speculation that matches the final utterance, or None.
+        with self._lock:
+            key, future = self._key, self._future
+            self._key = self._future = None
+            if future is None:
+                return None
+            if key == normalize_utterance(text):
+                self.stats['hits'] += 1
+                logger.info(f"Speculation hit ({self._format_stats()})")
+                return future
+            self.stats['misses'] += 1
+            self._waste(future)
+        logger.info(f"Speculation miss ({self._format_stats()})")
+        return None
+
+    def cancel(self):
+        with self._lock:
+            self._drop()
+            self._key = self._future = None
+
+    def _drop(self):
+        if self._future is None:
+            return
+        self.stats['discarded'] += 1
+        self._waste(self._future)
+
+    def _waste(self, future):
+        if future.cancel():
+            return
+
+        def count(done):
+            if done.exception() is None:
+                with self._lock:
+                    self.stats['wasted_calls'] += len(done.result().remote_calls)
+        future.add_done_callback(count)
+
+    def _format_stats(self):
+        return ', '.join(f"{name}={value}" for name, value in self.stats.items())
+
+    def close(self):
+        self.cancel()
+        self.executor.shutdown(wait=False)
@@ -0,0 +1,80 @@
+import contextvars
+import threading
+import time
+from concurrent.futures import Future
+from logger import logger
+
+
+# Runs named stages on an executor as soon as the stages they depend on have finished.
+# Each stage function receives the results of its dependencies as positional arguments.
+class StageScheduler:
+    def __init__(self, executor):
+        self.executor = executor
+        self.futures = {}
+        self.timings = {}
+        self._lock = threading.Lock()
+
+    def add(self, name, fn, depends_on=()):
+        if name in self.futures:
+            raise ValueError(f"Stage {name} is already scheduled")
+
+        dependencies = [self.futures[dep] for dep in depends_on]
+        future = Future()
+        self.futures[name] = future
+        pending = [len(dependencies)]
+        # Stages see the context variables of the code that scheduled them, like a direct call would.
+        context = contextvars.copy_context()
+
+        def run():
+            if not future.set_running_or_notify_cancel():
+                return
+            start = time.perf_counter()
+            try:
+                args = [dep.result() for dep in dependencies]
+                future.set_result(context.run(fn, *args))
+            except Exception as e:
+                future.set_exception(e)
+            finally:
+                self._record(name, time.perf_counter() - start)
+
+        def on_dependency_done(dep_future):
+            with self._lock:
+                pending[0] -= 1
+                ready = pending[0] == 0
+            if not ready:
+                return
+            failed = next((dep for dep in dependencies if dep.cancelled() or dep.exception() is not None), None)
+            if failed is not None:
+                if failed.cancelled():
+                    future.cancel()
+                elif future.set_running_or_notify_cancel():
+                    future.set_exception(failed.exception())
+                return
+            self.executor.submit(run)
+
+        if not dependencies:
+            self.executor.submit(run)
+        else:
+            for dep in dependencies:
+                dep.add_done_callback(on_dependency_done)
+
+        return future
+
+    def result(self, name, timeout=None):
+        return self.futures[name].result(timeout=timeout)
+
+    def discard(self, name):
+        # Speculative stages that turned out to be useless are cancelled if they have not started yet;
+        # a running stage is left to finish and its result is simply ignored.
+        future = self.futures.get(name)
+        if future is not None and future.cancel():
+            logger.debug(f"Stage {name} discarded before it started")
+
+    def _record(self, name, duration):
+        with self._lock:
+            self.timings[name] = duration
+
+    def format_timings(self):
+        with self._lock:
+            items = sorted(self.timings.items(), key=lambda item: item[1], reverse=True)
+        return ', '.join(f"{name}={duration * 1000:.0f}ms" for name, duration in items)
@@ -0,0 +1,93 @@
+import json
+
+# orjson parses the small streamed payloads several times faster; the standard library is the fallback.
+try:
+    import orjson
+    loads = orjson.loads
+except ImportError:
+    orjson = None
+
+    def loads(payload):
+        return json.loads(payload.decode() if isinstance(payload, bytes) else payload)
+
+
+# A codec knows the wire format of one model provider. It is resolved once per model, so the streaming
+# loop does no provider lookup per event.
+class StreamCodec:
+    provider = None
+
+    def chunk_text(self, payload):
+        raise NotImplementedError
+
+    def response_text(self, response_body):
+        raise NotImplementedError
+
+
+class TitanCodec(StreamCodec):
+    provider = 'amazon'
+
+    def chunk_text(self, payload):
+        return loads(payload)['outputText']
+
+    def response_text(self, response_body):
+        return response_body['results'][0]['outputText']
+
+
+class LlamaCodec(StreamCodec):
+    provider = 'meta'
+
+    def chunk_text(self, payload):
+        return loads(payload)['generation']
+
+    def response_text(self, response_body):
+        return response_body['generation']
+
+
+class AnthropicCodec(StreamCodec):
+    provider = 'anthropic'
+
+    def chunk_text(self, payload):
+        # message_start, ping, content_block_start/stop and message_stop carry no text and are skipped
+        # without parsing.
+        if b'_delta"' not in payload:
+            return ''
+        event = loads(payload)
+        if event.get('type') == 'content_block_delta':
+            return event.get('delta', {}).get('text', '')
+        if event.get('type') == 'message_delta':
+            return event.get('delta', {}).get('content', [{}])[0].get('text', '')
+        return ''
+
+    def response_text(self, response_body):
+        return response_body['content'][0]['text']
+
+
+class CohereCodec(StreamCodec):
+    provider = 'cohere'
+
+    def chunk_text(self, payload):
+        return ' '.join([g['text'] for g in loads(payload)['generations']])
+
+    def response_text(self, response_body):
+        return ' '.join([g['text'] for g in response_body['generations']])
+
+
+CODECS = {codec.provider: codec for codec in (TitanCodec(), LlamaCodec(), AnthropicCodec(), CohereCodec())}
+
+
+def codec_for(provider):
+    codec = CODECS.get(provider)
+    if codec is None:
+        raise NotImplementedError(f'Unknown model provider: {provider}')
+    return codec
+
+
+def decode_stream(stream, codec):
+    # Bedrock response stream events -> text pieces. Each event is decoded once; events without text are
+    # dropped.
+    for event in stream:
+        chunk = event.get('chunk')
+        if chunk:
+            text = codec.chunk_text(chunk['bytes'])
+            if text:
+                yield text
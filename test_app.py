@@ -0,0 +1,60 @@
+import io
+import queue
+import threading
+import app
+import aws_clients
+from audio_output import NullAudioOutput
+from conversation_context import ConversationContext
+from preprocess_result import PreparedTurn
+
+
+class FakePolly:
+    def synthesize_speech(self, Text, **kwargs):
+        return {'AudioStream': io.BytesIO(bytes(320))}
+
+
+class FakeAgent:
+    # Streams each scripted answer; an exception in the script is raised mid-stream, like a broken
+    # Bedrock connection.
+    def __init__(self, answers):
+        self.answers = list(answers)
+        self.context = ConversationContext()
+
+    def prepare(self, text):
+        return PreparedTurn(text, text, False, "", {})
+
+    def process(self, text, cancel_token=None, prepared=None):
+        answer = self.answers.pop(0)
+        response_queue = queue.Queue()
+
+        def stream():
+            pieces = []
+            try:
+                for piece in answer:
+                    if isinstance(piece, Exception):
+                        raise piece
+                    pieces.append(piece)
+                    yield piece
+            finally:
+                response_queue.put(''.join(pieces))
+        return stream(), response_queue
+
+
+def test_turn_after_a_failed_stream_still_completes(monkeypatch):
+    monkeypatch.setattr(app, 'tts_cache', None)
+    aws_clients.override('polly', FakePolly())
+    answers = [
+        ["Zed is strong early. ", "He snowballs hard. ", RuntimeError("stream reset")],
+        ["Ward the side brushes. ", "Then play safe until six."],
+    ]
+    wrapper = app.BedrockWrapper(FakeAgent(answers), NullAudioOutput(rate=16000000),
+                                 app.TurnExecutors.for_sessions(1))
+
+    wrapper.invoke_bedrock_agent("Is Zed strong?")
+    second = threading.Thread(target=wrapper.invoke_bedrock_agent, args=("How do I lane against him?",), daemon=True)
+    second.start()
+    second.join(10)
+
+    assert not second.is_alive()
+    assert not wrapper.speaking
+    assert wrapper.bedrock_agent.context.history()[-1]['assistant'] == "Ward the side brushes. Then play safe until six."
@@ -0,0 +1,79 @@
+import threading
+import types
+import audio_output
+from audio_output import AudioOutputEngine, RingBuffer
+
+
+class FakeStream:
+    def start_stream(self):
+        pass
+
+    def stop_stream(self):
+        pass
+
+    def close(self):
+        pass
+
+
+class FakePyAudio:
+    # Opens streams without a device; the test plays the part of PortAudio by calling the engine's callback.
+    def open(self, **kwargs):
+        return FakeStream()
+
+
+def engine(monkeypatch, capacity_frames):
+    monkeypatch.setattr(audio_output, 'pyaudio', types.SimpleNamespace(paInt16=8, paContinue=0))
+    output = AudioOutputEngine(pa=FakePyAudio(), rate=1, buffer_seconds=capacity_frames)
+    output._start()
+    return output
+
+
+def play(output, frames):
+    return output._callback(None, frames, {}, 0)[0]
+
+
+def test_writes_and_reads_wrap_around_the_end():
+    ring = RingBuffer(8)
+    ring.write(b"abcdef")
+    assert ring.read(4) == b"abcd"
+
+    ring.write(b"ghijkl")
+
+    assert (ring.size, ring.free()) == (8, 0)
+    assert bytes(ring.buffer) == b"ijklefgh"
+    assert ring.read(3) == b"efg"
+    assert ring.read(10) == b"hijkl"
+    assert ring.size == 0
+
+
+def test_write_blocks_while_the_ring_is_full(monkeypatch):
+    output = engine(monkeypatch, capacity_frames=4)
+    done = threading.Event()
+    writer = threading.Thread(target=lambda: (output.write(bytes(range(12))), done.set()), daemon=True)
+
+    writer.start()
+    assert not done.wait(0.2)
+    assert play(output, 2) == bytes(range(4))
+    assert done.wait(1)
+    assert play(output, 4) == bytes(range(4, 12))
+
+
+def test_cancelled_write_gives_up_while_blocked(monkeypatch):
+    output = engine(monkeypatch, capacity_frames=2)
+    cancelled = threading.Event()
+    threading.Timer(0.1, cancelled.set).start()
+
+    assert output.write(bytes(8), cancelled=cancelled.is_set) is False
+    assert output.ring.size == 4
+
+
+def test_flush_drops_queued_audio(monkeypatch):
+    output = engine(monkeypatch, capacity_frames=4)
+    output.write(b"\x01\x01" * 3)
+
+    output.flush()
+
+    assert play(output, 2) == bytes(4)
+    assert not output.is_playing()
+    output.write(b"\x02\x02\x03")
+    assert play(output, 2) == b"\x02\x02\x00\x00"
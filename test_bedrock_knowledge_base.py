@@ -0,0 +1,86 @@
+import threading
+from botocore.exceptions import ClientError
+import aws_clients
+from bedrock_knowledge_base import BedrockKnowledgeBase
+from kb_cache import RetrievalCache
+
+
+def page(*contents, next_token=None):
+    response = {'retrievalResults': [{'content': {'text': text}, 'score': 0.5, 'location': {'type': 'S3'}}
+                                     for text in contents]}
+    if next_token:
+        response['nextToken'] = next_token
+    return response
+
+
+class FakeRetrieve:
+    # Answers retrieve calls from a script per KB; an exception in the script is raised instead, and a KB
+    # listed in `blocked` waits for `release` first.
+    def __init__(self, scripts, blocked=()):
+        self.scripts = {kb_id: list(script) for kb_id, script in scripts.items()}
+        self.blocked = set(blocked)
+        self.release = threading.Event()
+        self.calls = []
+
+    def retrieve(self, **kwargs):
+        self.calls.append(kwargs)
+        kb_id = kwargs['knowledgeBaseId']
+        if kb_id in self.blocked:
+            self.release.wait(5)
+        answer = self.scripts[kb_id].pop(0)
+        if isinstance(answer, Exception):
+            raise answer
+        return answer
+
+
+def knowledge_base(client, **kwargs):
+    aws_clients.override('bedrock-agent-runtime', client)
+    return BedrockKnowledgeBase(**kwargs)
+
+
+def test_one_request_is_capped_at_the_service_limit():
+    client = FakeRetrieve({'kb1': [page("Zed is an assassin.")]})
+
+    results = knowledge_base(client).query('kb1', "Zed counters", max_results=250)
+
+    assert [result['content'] for result in results] == ["Zed is an assassin."]
+    assert len(client.calls) == 1
+    assert client.calls[0]['retrievalConfiguration']['vectorSearchConfiguration']['numberOfResults'] == 100
+    assert 'nextToken' not in client.calls[0]
+
+
+def test_next_token_is_followed_for_the_remaining_results():
+    client = FakeRetrieve({'kb1': [page("one", "two", next_token="t1"), page("three")]})
+
+    results = knowledge_base(client).query('kb1', "Zed counters", max_results=5)
+
+    assert [result['content'] for result in results] == ["one", "two", "three"]
+    assert client.calls[1]['nextToken'] == "t1"
+    assert client.calls[1]['retrievalConfiguration']['vectorSearchConfiguration']['numberOfResults'] == 3
+
+
+def test_failed_queries_are_not_cached():
+    error = ClientError({'Error': {'Code': 'ThrottlingException', 'Message': 'slow down'}}, 'Retrieve')
+    client = FakeRetrieve({'kb1': [page("partial", next_token="t1"), error, page("Zed is an assassin.")]})
+    kb = knowledge_base(client, cache=RetrievalCache())
+
+    assert [result['content'] for result in kb.query('kb1', "Zed counters", 5)] == ["partial"]
+    assert [result['content'] for result in kb.query('kb1', "Zed counters", 5)] == ["Zed is an assassin."]
+    assert [result['content'] for result in kb.query('kb1', "zed counters?", 5)] == ["Zed is an assassin."]
+    assert len(client.calls) == 3
+
+
+def test_query_all_answers_with_the_kbs_that_met_the_deadline(caplog):
+    client = FakeRetrieve({'kb1': [page("Zed is an assassin.")], 'kb2': [page("Ahri is a mage.")]},
+                          blocked={'kb2'})
+    cache = RetrievalCache()
+    kb = knowledge_base(client, cache=cache, deadline=0.05)
+
+    results = kb.query_all(['kb1', 'kb2'], "Zed counters", max_results_per_kb=5)
+
+    assert list(results) == ['kb1']
+    assert "1 of 2 KBs answered, answering without: kb2" in caplog.text
+    # The straggler still fills the cache for the next time the question comes up.
+    client.release.set()
+    kb.executor.shutdown(wait=True)
+    assert [result['content'] for result in cache.get('kb2', "Zed counters", 5)] == ["Ahri is a mage."]
@@ -0,0 +1,35 @@
+from concurrent.futures import ThreadPoolExecutor
+from bedrock_models_wrapper import BedrockModelsWrapper, model_descriptor
+from config import config
+
+
+def test_per_call_models_leave_the_default_alone():
+    default = config['bedrock']['api_request']['modelId']
+    sonnet = model_descriptor("anthropic.claude-3-5-sonnet-20240620-v1:0")
+    llama = model_descriptor("meta.llama2-70b-chat-v1")
+
+    def build(model):
+        return model, BedrockModelsWrapper.define_body("hi", model=model)
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        built = list(pool.map(build, [sonnet, llama] * 50))
+
+    for model, body in built:
+        assert ('messages' in body) == (model is sonnet)
+        assert ('prompt' in body) == (model is llama)
+    assert model_descriptor().model_id == default
+    assert config['bedrock']['api_request']['modelId'] == default
+
+
+def test_descriptor_body_is_read_only():
+    model = model_descriptor("amazon.titan-text-express-v1")
+    body = BedrockModelsWrapper.define_body("hi", model=model)
+
+    assert body['inputText'] == "hi"
+    assert model.body['inputText'] == ''
+    try:
+        model.body['inputText'] = "changed"
+    except TypeError:
+        pass
+    else:
+        raise AssertionError("descriptor body should be immutable")
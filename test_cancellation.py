@@ -0,0 +1,37 @@
+from cancellation import CancellationToken
+
+
+def test_callbacks_run_once_on_cancel():
+    calls = []
+    token = CancellationToken()
+    token.add_callback(lambda: calls.append('stream'))
+    token.add_callback(lambda: calls.append('audio'))
+
+    token.cancel()
+    token.cancel()
+
+    assert calls == ['stream', 'audio']
+    assert token.is_cancelled()
+    assert token.wait(0)
+
+
+def test_callback_added_after_cancel_runs_immediately_once():
+    calls = []
+    token = CancellationToken()
+    token.cancel()
+
+    token.add_callback(lambda: calls.append('late'))
+    token.cancel()
+
+    assert calls == ['late']
+
+
+def test_failing_callback_does_not_stop_the_others():
+    calls = []
+    token = CancellationToken()
+    token.add_callback(lambda: 1 / 0)
+    token.add_callback(lambda: calls.append('audio'))
+
+    token.cancel()
+
+    assert calls == ['audio']
@@ -0,0 +1,47 @@
+from champion_corrector import ChampionNameCorrector, phonetic_key
+
+
+def test_phonetic_key_folds_similar_sounds():
+    assert phonetic_key("jinks") == phonetic_key("Jinx")
+    assert phonetic_key("vain") == phonetic_key("Vayne")
+
+
+def test_corrects_misheard_names():
+    corrector = ChampionNameCorrector()
+
+    assert corrector.correct("How do I play jinks in bot lane?").text == "How do I play Jinx in bot lane?"
+    assert corrector.correct("what items should I build on cat arena").text == "what items should I build on Katarina"
+    assert corrector.correct("is ez real good right now").text == "is Ezreal good right now"
+
+
+def test_leaves_plain_sentences_untouched():
+    corrector = ChampionNameCorrector()
+    result = corrector.correct("I said it was a good game")
+
+    assert result.text == "I said it was a good game"
+    assert result.confidence >= 0.5
+
+
+def test_ambiguous_span_lowers_confidence():
+    corrector = ChampionNameCorrector()
+    result = corrector.correct("how strong is tomb kench")
+
+    assert result.confidence < 0.5
+    assert result.uncertain
+
+
+def test_everyday_gameplay_words_are_not_names():
+    corrector = ChampionNameCorrector()
+    result = corrector.correct("we were fighting near the river")
+
+    assert result.text == "we were fighting near the river"
+    assert result.confidence == 1.0
+    # Short words must sound like the name and be spelled close to it, even outside the vocabulary.
+    assert corrector._match("near") == (None, 0.0)
+
+
+def test_borderline_corrections_report_low_confidence():
+    corrector = ChampionNameCorrector()
+
+    assert corrector.correct("is ez real good").confidence == 1.0
+    assert corrector.correct("is vain good").confidence < corrector.correct("is ez real good").confidence
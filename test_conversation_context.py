@@ -0,0 +1,80 @@
+from conversation_context import ConversationContext, clip
+from token_estimate import estimate_tokens
+
+
+def add_turns(context, count, answer_words=10):
+    for i in range(count):
+        context.add_turn("Final Response", "", f"Question {i} about Zed?", f"Answer {i} is this. " + "more " * answer_words)
+
+
+def test_old_turns_are_folded_into_the_summary():
+    context = ConversationContext(max_turns=2)
+    add_turns(context, 4)
+
+    history = context.history()
+
+    assert [turn['user'] for turn in history[1:]] == ["Question 2 about Zed?", "Question 3 about Zed?"]
+    assert history[0]['user'] == ConversationContext.SUMMARY_QUESTION
+    assert "User asked: Question 0 about Zed? AI said: Answer 0 is this." in history[0]['assistant']
+    assert "Question 1" in history[0]['assistant']
+    assert "more" not in history[0]['assistant']
+
+
+def test_history_stays_within_the_token_budget():
+    context = ConversationContext(max_turns=50, token_budget=400, summary_token_budget=100)
+    add_turns(context, 40, answer_words=30)
+
+    history = context.history()
+
+    assert sum(estimate_tokens(turn['user']) + estimate_tokens(turn['assistant']) for turn in history) <= 400
+    assert history[-1]['user'] == "Question 39 about Zed?"
+    assert estimate_tokens(history[0]['assistant']) <= 100
+    assert len(context.history(token_budget=50)) < len(history)
+
+
+def test_history_can_be_limited_to_recent_turns():
+    context = ConversationContext()
+    add_turns(context, 4)
+
+    assert "Question 1" not in context.get_recent_history(num_turns=2)
+    assert context.get_recent_history(num_turns=2).endswith(f"AI: Answer 3 is this. {'more ' * 9}more")
+
+
+def test_round_trip_through_json():
+    context = ConversationContext(max_turns=2)
+    add_turns(context, 3)
+
+    restored = ConversationContext.from_json(context.to_json(), max_turns=2)
+
+    assert restored.history() == context.history()
+
+
+def test_clip_cuts_at_a_word_boundary():
+    text = "Death Mark makes Zed untargetable " * 20
+
+    clipped = clip(text, 10)
+
+    assert estimate_tokens(clipped) <= 10
+    assert clipped.endswith("...") and text.startswith(clipped[:-3])
+
+
+def test_latest_turn_is_kept_even_when_over_budget():
+    context = ConversationContext(token_budget=100)
+    add_turns(context, 1)
+    context.add_turn("Final Response", "", "Tell me about Zed's kit", "Zed is an assassin. " + "Detail. " * 200)
+
+    history = context.history()
+
+    assert history[-1]['user'] == "Tell me about Zed's kit"
+    assert history[-1]['assistant'].startswith("Zed is an assassin. Detail.")
+    assert sum(turn['tokens'] for turn in history) <= 100
+    assert context.history(token_budget=30)[-1]['user'] == "Tell me about Zed's kit"
+
+
+def test_summary_turn_counts_its_question():
+    context = ConversationContext(max_turns=1)
+    add_turns(context, 2)
+
+    summary = context.history()[0]
+
+    assert summary['tokens'] == estimate_tokens(summary['user']) + estimate_tokens(summary['assistant'])
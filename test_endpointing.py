@@ -0,0 +1,35 @@
+import pytest
+from endpointing import PRESETS, Endpointer
+
+
+@pytest.mark.parametrize('aggressiveness', sorted(PRESETS))
+def test_final_transcript_ends_the_turn_after_the_preset_silence(aggressiveness):
+    endpointer = Endpointer(aggressiveness)
+    silence = PRESETS[aggressiveness]['silence_ms'] / 1000
+    endpointer.on_result('r1', "how do I play Zed", False, now=10.0)
+
+    assert endpointer.poll(now=10.0 + silence - 0.01) is None
+    assert endpointer.poll(now=10.0 + silence + 0.001) == "how do I play Zed"
+    assert endpointer.last_latency == pytest.approx(silence, abs=0.002)
+
+
+def test_stable_partial_ends_the_turn_and_its_late_final_is_dropped():
+    endpointer = Endpointer(2, silence_ms=300)
+    endpointer.on_result('r1', "how do I play", True, now=10.0)
+    endpointer.on_result('r1', "how do I play Zed", True, now=10.3)
+
+    # Silent for long enough, but the partial only changed 0.5 s ago.
+    assert endpointer.poll(now=10.8) is None
+    assert endpointer.poll(now=10.91) == "how do I play Zed"
+
+    endpointer.on_result('r1', "How do I play Zed?", False, now=11.0)
+    assert endpointer.pending_text() == ""
+
+
+def test_voice_activity_holds_the_turn_open():
+    endpointer = Endpointer(2, silence_ms=500)
+    endpointer.on_result('r1', "how do I play Zed", False, now=10.0)
+    endpointer.on_audio(silence_ms=0, now=10.4)
+
+    assert endpointer.poll(now=10.8) is None
+    assert endpointer.poll(now=10.91) == "how do I play Zed"
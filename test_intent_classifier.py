@@ -0,0 +1,30 @@
+from config import config
+from intent_classifier import IntentClassifier
+
+THRESHOLD = config['intent_classifier']['min_confidence']
+
+
+def test_clear_turns_are_decided_locally():
+    classifier = IntentClassifier()
+
+    lol = classifier.classify("What should I build on Zed against Ahri in mid lane?")
+    chat = classifier.classify("What is the weather today?")
+
+    assert lol.is_about_lol and lol.confidence >= THRESHOLD
+    assert not chat.is_about_lol and chat.confidence >= THRESHOLD
+
+
+def test_vague_turns_fall_below_the_threshold():
+    result = IntentClassifier().classify("Can you explain that again?")
+
+    assert result.confidence < THRESHOLD
+    assert "no League of Legends vocabulary" in result.explanation
+
+
+def test_a_repeated_phrase_counts_once():
+    classifier = IntentClassifier()
+
+    once = classifier.classify("thanks")
+    many = classifier.classify("thanks thanks thanks thanks")
+
+    assert once.confidence == many.confidence
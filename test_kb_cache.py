@@ -0,0 +1,36 @@
+from kb_cache import RetrievalCache
+
+RESULTS = [{'content': 'Zed is an assassin.', 'score': 0.8, 'source': 'S3'}]
+
+
+def test_equivalent_questions_share_an_entry():
+    cache = RetrievalCache()
+    cache.put('kb1', 'How do I lane against Zed?', 10, RESULTS)
+
+    assert cache.get('kb1', 'how do I  lane against zed', 10) == RESULTS
+    assert cache.get('kb1', 'how do I lane against zed', 5) is None
+    assert cache.get('kb2', 'how do I lane against zed', 10) is None
+
+
+def test_entries_expire_after_ttl(monkeypatch):
+    import lru_cache
+    now = [1000.0]
+    monkeypatch.setattr(lru_cache.time, 'monotonic', lambda: now[0])
+    cache = RetrievalCache(ttl=60)
+    cache.put('kb1', 'zed counters', 10, RESULTS)
+
+    now[0] += 59
+    assert cache.get('kb1', 'zed counters', 10) == RESULTS
+    now[0] += 2
+    assert cache.get('kb1', 'zed counters', 10) is None
+    assert cache.stats()['expirations'] == 1
+
+
+def test_saved_cache_is_reloaded(tmp_path):
+    path = str(tmp_path / 'kb.json')
+    cache = RetrievalCache(path=path)
+    cache.put('kb1', 'zed counters', 10, RESULTS)
+    cache.save()
+
+    reloaded = RetrievalCache(path=path)
+    assert reloaded.get('kb1', 'Zed counters?', 10) == RESULTS
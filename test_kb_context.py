@@ -0,0 +1,50 @@
+from kb_context import KBContextBuilder, MinHash
+from token_estimate import estimate_tokens
+
+PASSAGE = ("Zed is a melee assassin who uses his shadows to burst down squishy targets. "
+           "His ultimate, Death Mark, makes him untargetable and marks an enemy champion.")
+
+
+def result(content, score):
+    return {'content': content, 'score': score, 'source': 'S3'}
+
+
+def test_near_duplicates_are_kept_once():
+    near_copy = PASSAGE.replace("squishy targets", "squishy enemies")
+    assert MinHash(PASSAGE).similarity(MinHash(near_copy)) > 0.7
+
+    context = KBContextBuilder().build({
+        'champions': [result(PASSAGE, 0.8), result("Zhonya's Hourglass counters Death Mark.", 0.7)],
+        'lore': [result(near_copy, 0.79)],
+    })
+
+    assert context.count("Death Mark, makes him untargetable") == 1
+    assert "[champions] Zhonya's Hourglass counters Death Mark." in context
+
+
+def test_low_scores_are_dropped_relative_to_the_best():
+    context = KBContextBuilder(relative_score_cutoff=0.75).build({
+        'champions': [result(PASSAGE, 0.8), result("Teemo is a yordle scout from Bandle City.", 0.5)],
+    })
+
+    assert "Teemo" not in context
+
+
+def test_passages_are_packed_into_the_token_budget():
+    passages = [result(f"Passage number {i} " + "about laning " * 20, 0.8 - i * 0.01) for i in range(10)]
+    budget = 3 * estimate_tokens("[champions] " + passages[0]['content']) + 5
+
+    context = KBContextBuilder(token_budget=budget, duplicate_similarity=1.01).build({'champions': passages})
+
+    assert context.count("[champions]") == 3
+    assert estimate_tokens(context) <= budget + 10
+    assert "Passage number 0 " in context and "Passage number 2 " in context
+
+
+def test_saving_is_logged_against_the_raw_passages(caplog):
+    teemo = "Teemo is a yordle scout from Bandle City."
+
+    KBContextBuilder().build({'champions': [result(PASSAGE, 0.8), result(teemo, 0.5)]})
+
+    saved = estimate_tokens(PASSAGE) + estimate_tokens(teemo) - estimate_tokens("[champions] " + PASSAGE)
+    assert f"kept 1/2 passages, {estimate_tokens('[champions] ' + PASSAGE)} tokens (saved {saved} tokens)" in caplog.text
@@ -0,0 +1,24 @@
+from kb_router import KBRouter
+
+KB_IDS = {'champions': ['kb-champions'], 'items': ['kb-items'], 'lore': ['kb-lore']}
+
+
+def test_clear_topic_queries_one_kb():
+    router = KBRouter(KB_IDS)
+
+    assert router.route("how do I lane against Zed").kb_ids == ['kb-champions']
+    assert router.route("what items should I build on Katarina").kb_ids == ['kb-items']
+    assert router.route("tell me the backstory of the darkin").kb_ids == ['kb-lore']
+
+
+def test_split_evidence_queries_every_close_topic():
+    route = KBRouter(KB_IDS).route("what runes for Ashe")
+
+    assert route.confidence < 0.6
+    assert route.kb_ids == ['kb-champions', 'kb-items']
+
+
+def test_no_evidence_queries_all_kbs_once():
+    router = KBRouter({'champions': ['shared'], 'items': ['shared'], 'lore': ['kb-lore']})
+
+    assert router.route("can you help me").kb_ids == ['shared', 'kb-lore']
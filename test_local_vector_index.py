@@ -0,0 +1,43 @@
+import pytest
+
+np = pytest.importorskip('numpy')
+
+from local_vector_index import LocalVectorIndex, build_index
+
+PASSAGES = [{'content': 'Zed counters', 'source': 'S3'}, {'content': 'Ahri combos', 'source': 'S3'},
+            {'content': 'Baron timer', 'source': 'S3'}]
+EMBEDDINGS = np.eye(3, 8, dtype=np.float32)
+
+
+def test_search_returns_query_result_shape(tmp_path):
+    build_index(PASSAGES, EMBEDDINGS, str(tmp_path), version='v1')
+    index = LocalVectorIndex(str(tmp_path))
+
+    results = index.search([0.1, 1.0, 0, 0, 0, 0, 0, 0], k=2)
+
+    assert [r['content'] for r in results] == ['Ahri combos', 'Zed counters']
+    assert set(results[0]) == {'content', 'score', 'source'}
+    assert results[0]['score'] > results[1]['score']
+
+
+def test_ivf_search_matches_exact_search(tmp_path):
+    rng = np.random.default_rng(1)
+    embeddings = rng.normal(size=(500, 16)).astype(np.float32)
+    passages = [{'content': str(i)} for i in range(500)]
+    build_index(passages, embeddings, str(tmp_path), lists=8, version='v1')
+    version = LocalVectorIndex(str(tmp_path)).version
+    query = embeddings[42]
+
+    assert version.search(query, 5, nprobe=8) == version.search(query, 5)
+    assert version.search(query, 1, nprobe=1)[0]['content'] == '42'
+
+
+def test_new_version_is_swapped_in(tmp_path):
+    build_index(PASSAGES, EMBEDDINGS, str(tmp_path), version='v1')
+    index = LocalVectorIndex(str(tmp_path))
+    build_index([{'content': 'Patched Zed'}] + PASSAGES[1:], EMBEDDINGS, str(tmp_path), version='v2')
+
+    index.reload_if_changed()
+
+    assert index.version_name == 'v2'
+    assert index.search([1, 0, 0, 0, 0, 0, 0, 0], k=1)[0]['content'] == 'Patched Zed'
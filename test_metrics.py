@@ -0,0 +1,44 @@
+import pytest
+from metrics import Metrics, TurnTrace
+
+
+def test_prometheus_text_format():
+    metrics = Metrics(window=10)
+    for seconds in (0.1, 0.2, 0.3, 0.4):
+        metrics.observe('turn_latency', 'first_audio_out', seconds)
+
+    lines = metrics.to_prometheus().splitlines()
+
+    assert lines == [
+        '# TYPE voice_turn_latency_seconds summary',
+        'voice_turn_latency_seconds{stage="first_audio_out",quantile="0.5"} 0.300000',
+        'voice_turn_latency_seconds{stage="first_audio_out",quantile="0.95"} 0.400000',
+        'voice_turn_latency_seconds{stage="first_audio_out",quantile="0.99"} 0.400000',
+        'voice_turn_latency_seconds_sum{stage="first_audio_out"} 1.000000',
+        'voice_turn_latency_seconds_count{stage="first_audio_out"} 4',
+    ]
+
+
+def test_percentiles_cover_the_window_and_counts_everything():
+    metrics = Metrics(window=3)
+    for seconds in (5.0, 0.1, 0.2, 0.3):
+        metrics.observe('agent_stage', 'analyze', seconds)
+
+    values = metrics.snapshot()['agent_stage']['analyze']
+
+    assert values['count'] == 4
+    assert values['p99'] == 0.3
+
+
+def test_trace_records_marks_from_speech_end_once():
+    metrics = Metrics()
+    trace = TurnTrace(speech_end=100.0, metrics=metrics)
+    trace.mark('endpoint', at=100.7)
+    trace.mark('first_audio_out', at=101.5)
+    trace.mark('first_audio_out', at=102.0)
+    trace.add_stages({'kb_retrieval': 0.25})
+
+    elapsed = trace.finish()
+
+    assert elapsed == pytest.approx({'endpoint': 0.7, 'first_audio_out': 1.5})
+    assert metrics.snapshot()['agent_stage']['kb_retrieval']['count'] == 1
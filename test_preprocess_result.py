@@ -0,0 +1,27 @@
+import pytest
+from preprocess_result import PreprocessResult
+
+VALID = ('{"corrected_text": "how do I play Jinx", "is_about_lol": true, "explanation": "Champion name", '
+         '"completed_question": ""}')
+
+
+def test_json_is_found_inside_prose_and_code_fences():
+    result = PreprocessResult.from_json(f"Here you go:\n```json\n{VALID}\n```")
+
+    assert result.corrected_text == "how do I play Jinx"
+    assert result.is_about_lol is True
+    # An empty completion falls back to the corrected text.
+    assert result.completed_question == "how do I play Jinx"
+
+
+@pytest.mark.parametrize('response', [
+    "I could not process that.",
+    '{"corrected_text": "how do I play Jinx", "is_about_lol": true',
+    '{"corrected_text": "how do I play Jinx", "is_about_lol": "yes", "explanation": "", "completed_question": ""}',
+    '{"corrected_text": "how do I play Jinx", "is_about_lol": true, "explanation": ""}',
+    '{"corrected_text": "  ", "is_about_lol": true, "explanation": "", "completed_question": ""}',
+    '[{"corrected_text": "how do I play Jinx"}]',
+])
+def test_malformed_responses_are_rejected(response):
+    with pytest.raises(ValueError):
+        PreprocessResult.from_json(response)
@@ -0,0 +1,65 @@
+from sentence_segmenter import SentenceSegmenter
+
+
+def segment(chunks, **kwargs):
+    segmenter = SentenceSegmenter(**kwargs)
+    segments = []
+    for chunk in chunks:
+        segments.extend(segmenter.feed(chunk))
+    remainder = segmenter.flush()
+    if remainder:
+        segments.append(remainder)
+    return segments
+
+
+def test_abbreviations_and_decimals_do_not_split():
+    text = "Sure! Dr. Mundo regenerates 2.5 percent health, e.g. against poke. That is his passive."
+
+    assert segment([text]) == [
+        "Sure!",
+        "Dr. Mundo regenerates 2.5 percent health, e.g. against poke.",
+        "That is his passive.",
+    ]
+
+
+def test_boundaries_split_across_chunks():
+    text = "Dr. Mundo regenerates 2.5 percent health. Is he good? Yes, he is a strong top laner!"
+    chunks = [text[i:i + 3] for i in range(0, len(text), 3)]
+
+    assert segment(chunks) == segment([text])
+
+
+def test_first_segment_flushes_early_at_clause():
+    text = "When you are playing against a very mobile champion in the mid lane, ward the side brushes."
+
+    assert segment([text]) == [
+        "When you are playing against a very mobile champion in the mid lane,",
+        "ward the side brushes.",
+    ]
+
+
+def test_short_sentences_are_merged():
+    assert segment(["Hi. ", "Yes. No. Maybe. Then a longer sentence follows here. ", "End."]) == [
+        "Hi.",
+        "Yes. No. Maybe. Then a longer sentence follows here.",
+        "End.",
+    ]
+
+
+def test_long_runs_without_punctuation_are_cut_at_spaces():
+    words = [f"word{i}" for i in range(100)]
+    text = ' '.join(words)
+    chunks = [text[i:i + 7] for i in range(0, len(text), 7)]
+
+    segments = segment(chunks, max_chars=120)
+
+    assert len(segments) > 1
+    assert all(len(s) <= 120 for s in segments)
+    assert ' '.join(segments).split() == words
+
+
+def test_no_ends_a_sentence():
+    assert segment(["No. Zed is weak early, so play safe until level six."]) == [
+        "No.",
+        "Zed is weak early, so play safe until level six.",
+    ]
@@ -0,0 +1,94 @@
+import threading
+from config import config
+from endpointing import Endpointer
+from speculation import SpeculativePreparer, default_stable_ms
+
+
+class Prepared:
+    def __init__(self, text):
+        self.text = text
+        self.remote_calls = ['Analysis', 'Question Completion']
+
+
+class FakeAgent:
+    def __init__(self):
+        self.release = threading.Event()
+        self.prepared = []
+
+    def prepare(self, text):
+        self.release.wait(5)
+        self.prepared.append(text)
+        return Prepared(text)
+
+
+def test_stale_speculation_is_discarded_and_counted():
+    agent = FakeAgent()
+    agent.release.set()
+    preparer = SpeculativePreparer(agent, stable_ms=300)
+
+    preparer.poll("how do I lane against Zed", silent_since=0.0, now=0.5)
+    preparer._future.result(5)
+    assert preparer.take("how do I build Zed") is None
+
+    assert preparer.stats['misses'] == 1
+    assert preparer.stats['wasted_calls'] == 2
+    preparer.close()
+
+
+def test_matching_speculation_is_reused_despite_punctuation():
+    agent = FakeAgent()
+    agent.release.set()
+    preparer = SpeculativePreparer(agent, stable_ms=300)
+
+    preparer.poll("how do I lane against Zed", silent_since=0.0, now=0.1)
+    assert preparer.stats['started'] == 0
+    preparer.poll("how do I lane against Zed", silent_since=0.0, now=0.5)
+
+    assert preparer.take("How do I lane against Zed?").result(5).text == "how do I lane against Zed"
+    assert preparer.stats['hits'] == 1
+    preparer.close()
+
+
+def test_continuation_waits_for_the_speculation_in_flight():
+    agent = FakeAgent()
+    preparer = SpeculativePreparer(agent, stable_ms=300)
+
+    preparer.poll("how do I lane", silent_since=0.0, now=0.5)
+    preparer.poll("how do I lane against Zed", silent_since=0.5, now=1.0)
+    assert preparer.stats['started'] == 1
+
+    agent.release.set()
+    preparer._future.result(5)
+    preparer.poll("how do I lane against Zed", silent_since=0.5, now=1.1)
+    assert preparer.stats['started'] == 2
+    assert preparer.stats['discarded'] == 1
+    preparer.close()
+
+
+def test_speculation_starts_before_the_default_endpoint():
+    # The user speaks until t=2.0; Transcribe's last partial and its final arrive after its latency.
+    agent = FakeAgent()
+    agent.release.set()
+    settings = config['endpointing']['settings']
+    endpointer = Endpointer(**settings)
+    preparer = SpeculativePreparer(agent, config['speculation']['stable_ms'] or default_stable_ms(settings))
+    events = {1.5: ("result-0", "how do I lane", True), 2.3: ("result-0", "how do I lane against Zed", True),
+              2.55: ("result-0", "How do I lane against Zed?", False)}
+
+    speculated_at = endpoint = None
+    for step in range(150, 400):
+        now = step / 100
+        endpointer.on_audio(max(now - 2.0, 0) * 1000, now=now)
+        if now in events:
+            endpointer.on_result(*events[now], now=now)
+        preparer.poll(endpointer.pending_text(), endpointer.silent_since(), now=now)
+        if speculated_at is None and preparer.stats['started']:
+            speculated_at = now
+        endpoint = endpointer.poll(now=now)
+        if endpoint:
+            break
+
+    assert speculated_at is not None and speculated_at < now
+    assert preparer.take(endpoint) is not None
+    assert preparer.stats['hits'] == 1
+    preparer.close()
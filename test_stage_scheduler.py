@@ -0,0 +1,51 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import pytest
+from stage_scheduler import StageScheduler
+
+
+def test_stage_runs_after_its_dependencies_with_their_results():
+    order = []
+    lock = threading.Lock()
+
+    def stage(name, value):
+        def run(*args):
+            with lock:
+                order.append(name)
+            return value(*args)
+        return run
+
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        scheduler = StageScheduler(executor)
+        scheduler.add('fix_typos', stage('fix_typos', lambda: "how to play Zed"))
+        scheduler.add('complete', stage('complete', lambda: "how to play Zed mid"))
+        scheduler.add('retrieve', stage('retrieve', lambda fixed, completed: f"{fixed} | {completed}"),
+                      depends_on=('fix_typos', 'complete'))
+
+        assert scheduler.result('retrieve', timeout=5) == "how to play Zed | how to play Zed mid"
+    assert order[-1] == 'retrieve'
+    assert set(scheduler.timings) == {'fix_typos', 'complete', 'retrieve'}
+
+
+def test_failure_propagates_to_dependent_stages():
+    ran = []
+
+    def fail():
+        raise RuntimeError("Bedrock throttled")
+
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        scheduler = StageScheduler(executor)
+        scheduler.add('complete', fail)
+        scheduler.add('retrieve', lambda completed: ran.append(completed), depends_on=('complete',))
+
+        with pytest.raises(RuntimeError, match="throttled"):
+            scheduler.result('retrieve', timeout=5)
+    assert ran == []
+
+
+def test_stage_names_are_unique():
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        scheduler = StageScheduler(executor)
+        scheduler.add('analyze', lambda: None)
+        with pytest.raises(ValueError):
+            scheduler.add('analyze', lambda: None)
@@ -0,0 +1,42 @@
+import json
+from stream_codecs import codec_for, decode_stream
+
+
+def event(payload):
+    return {'chunk': {'bytes': json.dumps(payload).encode()}}
+
+
+def test_each_provider_decodes_its_wire_format():
+    assert codec_for('amazon').chunk_text(event({'outputText': 'Hi', 'index': 0})['chunk']['bytes']) == 'Hi'
+    assert codec_for('meta').chunk_text(event({'generation': 'Hi', 'stop_reason': None})['chunk']['bytes']) == 'Hi'
+    assert codec_for('cohere').chunk_text(
+        event({'generations': [{'text': 'a'}, {'text': 'b'}]})['chunk']['bytes']) == 'a b'
+
+
+def test_anthropic_stream_keeps_only_text_deltas():
+    stream = [
+        event({'type': 'message_start', 'message': {'content': []}}),
+        event({'type': 'content_block_start', 'index': 0, 'content_block': {'type': 'text', 'text': ''}}),
+        event({'type': 'content_block_delta', 'index': 0, 'delta': {'type': 'text_delta', 'text': 'Hello'}}),
+        {'metadata': {}},
+        event({'type': 'content_block_delta', 'index': 0, 'delta': {'type': 'text_delta', 'text': ' there'}}),
+        event({'type': 'content_block_stop', 'index': 0}),
+        event({'type': 'message_delta', 'delta': {'stop_reason': 'end_turn'}}),
+        event({'type': 'message_stop'}),
+    ]
+
+    assert list(decode_stream(stream, codec_for('anthropic'))) == ['Hello', ' there']
+
+
+def test_each_event_is_decoded_once():
+    decoded = []
+
+    class CountingCodec:
+        def chunk_text(self, payload):
+            decoded.append(payload)
+            return payload.decode()
+
+    stream = [{'chunk': {'bytes': b'one '}}, {'chunk': {'bytes': b'two'}}]
+
+    assert ''.join(decode_stream(stream, CountingCodec())) == 'one two'
+    assert decoded == [b'one ', b'two']
@@ -0,0 +1,54 @@
+import os
+from config import config
+from tts_cache import TTSCache, normalize_text
+
+
+def test_key_ignores_whitespace_but_not_case():
+    assert normalize_text("  Ward the\n side   brushes ") == "Ward the side brushes"
+    assert TTSCache.key("Ward  the side", config['polly']) == TTSCache.key("Ward the side\n", config['polly'])
+    assert TTSCache.key("Buy US boots", config['polly']) != TTSCache.key("buy us boots", config['polly'])
+    assert TTSCache.key("Hi", config['polly']) != TTSCache.key("Hi", dict(config['polly'], VoiceId='Joanna'))
+
+
+def test_memory_miss_is_served_from_disk(tmp_path):
+    TTSCache(disk_dir=str(tmp_path)).put("a" * 64, b"audio")
+    cache = TTSCache(disk_dir=str(tmp_path))
+
+    assert cache.get("a" * 64) == b"audio"
+    assert cache.get("a" * 64) == b"audio"
+    assert cache.get("b" * 64) is None
+
+    stats = cache.stats()
+    assert (stats['hits'], stats['disk_hits'], stats['misses']) == (1, 1, 1)
+    assert (stats['disk_entries'], stats['disk_bytes']) == (1, 5)
+
+
+def test_oldest_files_are_evicted_past_the_size_limit(tmp_path):
+    writer = TTSCache(disk_dir=str(tmp_path))
+    for age, key in enumerate(["a" * 64, "b" * 64, "c" * 64]):
+        writer.put(key, bytes(10))
+        # "a" ends up the oldest file and "b" the newest.
+        mtime = 1000 + (1, 3, 2)[age]
+        os.utime(writer._path(key), (mtime, mtime))
+    cache = TTSCache(memory_entries=1, disk_dir=str(tmp_path), disk_max_bytes=25)
+
+    cache.put("d" * 64, bytes(10))
+
+    assert not os.path.exists(cache._path("a" * 64))
+    assert not os.path.exists(cache._path("c" * 64))
+    assert os.path.exists(cache._path("b" * 64))
+    stats = cache.stats()
+    assert (stats['disk_entries'], stats['disk_bytes'], stats['disk_evictions']) == (2, 20, 2)
+    assert cache.get("d" * 64) == bytes(10)
+
+
+def test_memory_only_cache_never_touches_disk(tmp_path):
+    cache = TTSCache(memory_entries=1)
+    cache.put("a" * 64, b"one")
+    cache.put("b" * 64, b"two")
+
+    assert cache.get("a" * 64) is None
+    assert cache.get("b" * 64) == b"two"
+    stats = cache.stats()
+    assert (stats['misses'], stats['disk_hits'], stats['disk_entries']) == (1, 0, 0)
+    assert os.listdir(tmp_path) == []
@@ -0,0 +1,46 @@
+import math
+import struct
+from voice_activity import VoiceActivityDetector
+
+FRAME_MS = 20
+
+
+def tone(ms, amplitude):
+    samples = 16 * ms
+    return struct.pack(f'<{samples}h', *(int(amplitude * math.sin(i / 5)) for i in range(samples)))
+
+
+def test_onset_is_reported_once_after_min_speech():
+    vad = VoiceActivityDetector(min_speech_ms=200, hangover_ms=100)
+
+    assert not vad.process(tone(500, 30))
+    assert not vad.process(tone(180, 5000))
+    assert vad.process(tone(FRAME_MS, 5000))
+    assert not vad.process(tone(300, 5000))
+    assert vad.silence_ms == 0
+
+
+def test_short_gaps_within_the_hangover_keep_the_speech():
+    vad = VoiceActivityDetector(min_speech_ms=200, hangover_ms=100)
+
+    assert not vad.process(tone(100, 5000) + tone(80, 30))
+    assert vad.process(tone(100, 5000))
+
+
+def test_silence_past_the_hangover_ends_the_speech():
+    vad = VoiceActivityDetector(min_speech_ms=200, hangover_ms=100)
+    assert vad.process(tone(300, 5000))
+
+    assert not vad.process(tone(140, 30))
+    assert not vad.in_speech
+    assert vad.silence_ms == 140
+    assert not vad.process(tone(100, 5000))
+    assert vad.process(tone(100, 5000))
+
+
+def test_frames_split_across_blocks():
+    vad = VoiceActivityDetector(min_speech_ms=40)
+    block = tone(40, 5000)
+
+    assert not vad.process(block[:500])
+    assert vad.process(block[500:])
@@ -0,0 +1,12 @@
+import re
+
+# Words, numbers and single punctuation marks. BPE tokenizers split rarer words further, which the
+# 4-characters-per-token floor accounts for.
+_PIECES = re.compile(r"\w+|[^\w\s]")
+
+
+def estimate_tokens(text):
+    # Approximate token count for budgeting prompts; cheap enough to call on every chunk of every turn.
+    if not text:
+        return 0
+    return max(len(_PIECES.findall(text)), (len(text) + 3) // 4)
@@ -0,0 +1,140 @@
+import hashlib
+import json
+import mmap
+import os
+import threading
+from lru_cache import LRUCache
+from logger import logger
+
+
+def normalize_text(text):
+    # Only whitespace is collapsed: case changes how Polly reads a text ("US" against "us").
+    return ' '.join(text.split())
+
+
+class TTSCache:
+    # Synthesized audio keyed by everything that changes the output of Polly. Recent entries live in an
+    # in-memory LRU; every entry is also written to a content-addressed PCM file that is memory-mapped on
+    # read, so the cache survives restarts.
+
+    def __init__(self, memory_entries=256, disk_dir=None, disk_max_bytes=200 * 1024 * 1024):
+        self.memory = LRUCache(memory_entries)
+        self.disk_dir = disk_dir
+        self.disk_max_bytes = disk_max_bytes
+        self.disk_lock = threading.Lock()
+        self.disk_files = {}
+        self.disk_bytes = 0
+        self.disk_hits = 0
+        self.disk_evictions = 0
+        # The directory is listed on first use rather than at startup.
+        self.scanned = not disk_dir
+
+    @staticmethod
+    def key(text, polly_config):
+        fields = [normalize_text(text), polly_config['VoiceId'], polly_config['Engine'],
+                  polly_config['LanguageCode'], polly_config['OutputFormat']]
+        return hashlib.sha256(json.dumps(fields).encode()).hexdigest()
+
+    def get(self, key):
+        audio = self.memory.get(key)
+        if audio is not None:
+            return audio
+
+        audio = self._read_disk(key)
+        if audio is not None:
+            self.memory.put(key, audio)
+        return audio
+
+    def put(self, key, audio):
+        if not audio:
+            return
+        self.memory.put(key, audio)
+        if self.disk_dir:
+            try:
+                self._write_disk(key, audio)
+            except OSError as e:
+                logger.error(f"Failed to write TTS cache entry {key}: {e}")
+
+    def stats(self):
+        stats = self.memory.stats()
+        with self.disk_lock:
+            if not self.scanned:
+                self._scan_disk()
+            stats.update({
+                'disk_entries': len(self.disk_files),
+                'disk_bytes': self.disk_bytes,
+                'disk_hits': self.disk_hits,
+                'disk_evictions': self.disk_evictions,
+            })
+        # Memory misses that were served from disk are not misses of the cache as a whole.
+        stats['misses'] -= stats['disk_hits']
+        return stats
+
+    def _path(self, key):
+        return os.path.join(self.disk_dir, key[:2], f"{key}.pcm")
+
+    def _scan_disk(self):
+        # Called with disk_lock held.
+        self.scanned = True
+        if not os.path.isdir(self.disk_dir):
+            return
+        for sub_dir in os.scandir(self.disk_dir):
+            if not sub_dir.is_dir():
+                continue
+            for entry in os.scandir(sub_dir.path):
+                if entry.name.endswith('.pcm'):
+                    stat = entry.stat()
+                    self.disk_files[entry.name[:-4]] = (stat.st_size, stat.st_mtime)
+                    self.disk_bytes += stat.st_size
+        logger.debug(f"TTS disk cache holds {len(self.disk_files)} entries, {self.disk_bytes} bytes")
+
+    def _read_disk(self, key):
+        if not self.disk_dir:
+            return None
+        with self.disk_lock:
+            if not self.scanned:
+                self._scan_disk()
+            if key not in self.disk_files:
+                return None
+        try:
+            with open(self._path(key), 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                audio = mapped[:]
+        except (OSError, ValueError):
+            with self.disk_lock:
+                self._forget(key)
+            return None
+        with self.disk_lock:
+            self.disk_hits += 1
+        return audio
+
+    def _write_disk(self, key, audio):
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(audio)
+        os.replace(tmp_path, path)
+
+        with self.disk_lock:
+            if not self.scanned:
+                self._scan_disk()
+            self._forget(key)
+            self.disk_files[key] = (len(audio), os.path.getmtime(path))
+            self.disk_bytes += len(audio)
+            if self.disk_bytes > self.disk_max_bytes:
+                for old_key, _ in sorted(self.disk_files.items(), key=lambda item: item[1][1]):
+                    if self.disk_bytes <= self.disk_max_bytes:
+                        break
+                    if old_key == key:
+                        continue
+                    self._forget(old_key)
+                    self.disk_evictions += 1
+                    try:
+                        os.remove(self._path(old_key))
+                    except OSError:
+                        pass
+
+    def _forget(self, key):
+        entry = self.disk_files.pop(key, None)
+        if entry is not None:
+            self.disk_bytes -= entry[0]
@@ -0,0 +1,60 @@
+import math
+from array import array
+
+
+class VoiceActivityDetector:
+    # Energy-based detector for 16-bit mono PCM. Audio is cut into frames of frame_ms; a frame is voiced when
+    # its RMS exceeds both min_energy and threshold_ratio times the running noise floor, which is learned from
+    # unvoiced frames. process() reports speech onset once voiced frames have lasted min_speech_ms, allowing
+    # gaps of up to hangover_ms between them.
+
+    def __init__(self, sample_rate=16000, frame_ms=20, min_energy=600, threshold_ratio=3.0, min_speech_ms=200,
+                 hangover_ms=100, noise_adaptation=0.05):
+        self.frame_bytes = sample_rate * frame_ms // 1000 * 2
+        self.frame_ms = frame_ms
+        self.min_energy = min_energy
+        self.threshold_ratio = threshold_ratio
+        self.min_speech_ms = min_speech_ms
+        self.hangover_ms = hangover_ms
+        self.noise_adaptation = noise_adaptation
+        self.noise_floor = min_energy / threshold_ratio
+        self.remainder = b''
+        self.speech_ms = 0
+        self.silence_ms = 0
+        self.in_speech = False
+
+    def reset(self):
+        self.remainder = b''
+        self.speech_ms = 0
+        self.silence_ms = 0
+        self.in_speech = False
+
+    def is_voiced(self, frame):
+        samples = array('h', frame)
+        rms = math.sqrt(sum(sample * sample for sample in samples) / len(samples)) if samples else 0.0
+        voiced = rms > max(self.min_energy, self.noise_floor * self.threshold_ratio)
+        if not voiced:
+            self.noise_floor += self.noise_adaptation * (rms - self.noise_floor)
+        return voiced
+
+    def process(self, pcm):
+        # Returns True on the frame where speech onset is confirmed, False otherwise.
+        data = self.remainder + pcm
+        usable = len(data) - len(data) % self.frame_bytes
+        self.remainder = data[usable:]
+
+        onset = False
+        for start in range(0, usable, self.frame_bytes):
+            if self.is_voiced(data[start:start + self.frame_bytes]):
+                self.speech_ms += self.frame_ms
+                self.silence_ms = 0
+            else:
+                self.silence_ms += self.frame_ms
+                if self.silence_ms > self.hangover_ms:
+                    self.speech_ms = 0
+                    self.in_speech = False
+
+            if not self.in_speech and self.speech_ms >= self.min_speech_ms:
+                self.in_speech = True
+                onset = True
+        return onset
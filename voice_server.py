@@ -0,0 +1,155 @@
+import argparse
+import asyncio
+import json
+import time
+import websockets
+
+import app
+import aws_clients
+from audio_output import NullAudioOutput
+from bedrock_agent import AgentServices, BedrockAgent
+from config import config
+from logger import logger
+from metrics import metrics
+
+# Serves many voice conversations from one process over WebSocket. Every connection is a session with its
+# own conversation context, endpointing, speculation and cancellation. The Bedrock, Polly and Transcribe
+# clients, the KB and TTS caches and the worker pools are shared by all sessions.
+#
+#   python voice_server.py [--host 0.0.0.0] [--port 8765] [--max-sessions 32]
+#
+# Per connection:
+#   client -> server   binary frames: 16 kHz mono int16 PCM from the microphone, in blocks of any size
+#                      text frame {"type": "interrupt"}: stop the current answer
+#   server -> client   binary frames: 16 kHz mono int16 PCM speech
+#                      text frame {"type": "flush"}: drop the speech received but not played yet
+
+
+class SessionAudioOutput(NullAudioOutput):
+    # Plays into a client connection. The client plays in real time, so drain times are tracked the way
+    # NullAudioOutput does. Writes are held back while more than max_lead seconds of speech are ahead of the
+    # client's playback, so an interruption wastes little audio.
+
+    def __init__(self, send, max_lead=1.0, rate=16000):
+        super().__init__(rate)
+        self.send = send
+        self.max_lead = max_lead
+
+    def write(self, data, cancelled=None):
+        with self.condition:
+            while self.playing_until - time.monotonic() > self.max_lead:
+                if cancelled is not None and cancelled():
+                    return False
+                self.condition.wait(min(self.playing_until - time.monotonic() - self.max_lead, 0.05))
+            # Sent under the lock, so a flush can never overtake audio written before it.
+            self.send(bytes(data))
+            return super().write(data, cancelled)
+
+    def flush(self):
+        with self.condition:
+            super().flush()
+            self.send(json.dumps({'type': 'flush'}))
+
+
+class VoiceSession(app.MicStream):
+    # The microphone of a MicStream, fed from a WebSocket instead of sounddevice.
+
+    def __init__(self, websocket, services, turn_executors, max_lead=1.0):
+        loop = asyncio.get_running_loop()
+        self.websocket = websocket
+        self.outgoing = asyncio.Queue()
+        self.audio_output = SessionAudioOutput(
+            lambda message: loop.call_soon_threadsafe(self.outgoing.put_nowait, message), max_lead)
+        bedrock_agent = BedrockAgent(services.bedrock_runtime, services)
+        super().__init__(app.BedrockWrapper(bedrock_agent, self.audio_output, turn_executors))
+
+    async def mic_stream(self):
+        # Ends when the client disconnects, which ends the transcription stream as well.
+        try:
+            async for message in self.websocket:
+                if isinstance(message, str):
+                    self._handle_control(message)
+                    continue
+                self._process_voice_activity(message)
+                yield message, None
+        except websockets.ConnectionClosed:
+            pass
+
+    def _handle_control(self, message):
+        try:
+            kind = json.loads(message).get('type')
+        except (ValueError, AttributeError):
+            kind = None
+        if kind == 'interrupt':
+            self.bedrock_wrapper.interrupt()
+        else:
+            logger.warning(f"Ignoring unknown control message: {message[:100]}")
+
+    async def _send_loop(self):
+        try:
+            while True:
+                await self.websocket.send(await self.outgoing.get())
+        except websockets.ConnectionClosed:
+            pass
+
+    async def run(self):
+        sender = asyncio.create_task(self._send_loop())
+        try:
+            await self.transcribe()
+        finally:
+            sender.cancel()
+            # The turn thread stops at its next cancellation check; nothing waits for it.
+            self.bedrock_wrapper.interrupt()
+            if self.bedrock_wrapper.turn_task is not None:
+                self.bedrock_wrapper.turn_task.cancel()
+            if self.bedrock_wrapper.speculation is not None:
+                self.bedrock_wrapper.speculation.close()
+
+
+class VoiceServer:
+
+    def __init__(self, settings=None):
+        self.settings = settings or config['server']
+        max_sessions = self.settings['max_sessions']
+        aws_clients.plan_sessions(max_sessions)
+        self.services = AgentServices(aws_clients.client('bedrock-runtime'),
+                                      max_sessions * config['agent']['max_parallel_stages'])
+        self.turn_executors = app.TurnExecutors.for_sessions(max_sessions)
+        self.sessions = set()
+
+    async def handle(self, websocket):
+        if len(self.sessions) >= self.settings['max_sessions']:
+            logger.warning("Refusing a session, the server is at capacity")
+            await websocket.close(1013, 'Server is at capacity')
+            return
+
+        session = VoiceSession(websocket, self.services, self.turn_executors, self.settings['max_audio_lead_s'])
+        self.sessions.add(session)
+        logger.info(f"Session from {websocket.remote_address} started, {len(self.sessions)} active")
+        try:
+            await session.run()
+        except Exception:
+            logger.exception("Session failed")
+        finally:
+            self.sessions.discard(session)
+            logger.info(f"Session from {websocket.remote_address} ended, {len(self.sessions)} active")
+
+    async def serve(self):
+        host, port = self.settings['host'], self.settings['port']
+        async with websockets.serve(self.handle, host, port):
+            logger.info(f"Voice server listening on ws://{host}:{port}")
+            await asyncio.Future()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Multi-session voice server")
+    parser.add_argument('--host', default=config['server']['host'])
+    parser.add_argument('--port', type=int, default=config['server']['port'])
+    parser.add_argument('--max-sessions', type=int, default=config['server']['max_sessions'])
+    args = parser.parse_args()
+
+    settings = dict(config['server'], host=args.host, port=args.port, max_sessions=args.max_sessions)
+    metrics.start_exporters(config['metrics'])
+    server = VoiceServer(settings)
+    aws_clients.warm_up()
+    asyncio.run(server.serve())